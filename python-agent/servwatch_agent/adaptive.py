@@ -0,0 +1,150 @@
+"""
+Adaptive Sampling
+Backs off collection and suppresses transmissions while metrics stay within deadbands
+"""
+
+from typing import Dict, List, Optional, Any, Tuple, Union
+
+from servwatch_agent.alerts import Accessor, compile_field
+
+# Field path -> allowed change since the last transmitted sample, in the
+# field's units or, as a string like '10%', relative to the transmitted value
+DEFAULT_DEADBANDS = {
+    'cpu.usage': 2,
+    'memory.percentage': 1,
+    'disk.drives[*].usePercent': 1,
+    'disk.io.readBytes_sec': 1048576,
+    'disk.io.writeBytes_sec': 1048576,
+    'network.totalRx': 131072,
+    'network.totalTx': 131072,
+    'gpu.controllers[*].usage': 5,
+    'temperatures.max': 2
+}
+
+
+class AdaptiveSampler:
+    """
+    Decides the collection interval and which samples are worth sending.
+
+    Every tick is compared with the last transmitted sample. While all
+    deadband fields stay within their band, transmissions are skipped, and
+    after `quiet_ticks` such ticks the collection interval grows by
+    `backoff` per tick up to `max_interval`. A value leaving its band, a list
+    element appearing or disappearing, or an active alert brings the
+    interval straight back to the base rate and sends the sample. A
+    heartbeat sample is sent at least every `heartbeat` seconds.
+    """
+
+    def __init__(self, base_interval: float, deadbands: Optional[Dict[str, Union[float, str]]] = None,
+                 max_interval: float = 10.0, backoff: float = 2.0, quiet_ticks: int = 5,
+                 heartbeat: float = 60.0):
+        """
+        Initialize the sampler.
+
+        Args:
+            base_interval: Full-rate collection interval in seconds
+            deadbands: Field path -> absolute band, or relative band as 'N%'
+            max_interval: Longest collection interval in seconds
+            backoff: Interval growth factor per quiet tick
+            quiet_ticks: Quiet ticks at full rate before backing off
+            heartbeat: Longest time between transmissions in seconds
+        """
+        self.base_interval = base_interval
+        self.max_interval = max(base_interval, max_interval)
+        self.backoff = max(1.0, backoff)
+        self.quiet_ticks = quiet_ticks
+        self.heartbeat = heartbeat
+        self.interval = base_interval
+
+        self.fields: List[Tuple[str, Accessor, float, bool]] = []
+        for path, band in (DEFAULT_DEADBANDS if deadbands is None else deadbands).items():
+            relative = isinstance(band, str) and band.endswith('%')
+            width = float(band[:-1]) / 100 if relative else float(band)
+            self.fields.append((path, compile_field(path), width, relative))
+
+        self._reference: Optional[Dict[str, Dict[str, float]]] = None
+        self._last_sent: Optional[float] = None
+        self._quiet = 0
+        self.suppressed = 0
+        self.heartbeats = 0
+
+    def _values(self, metrics: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+        return {path: dict(access(metrics)) for path, access, _, _ in self.fields}
+
+    def _moved(self, metrics: Dict[str, Any]) -> bool:
+        """Whether any deadband field left its band since the last transmitted sample"""
+        if self._reference is None:
+            return True
+        for path, access, width, relative in self.fields:
+            reference = self._reference.get(path, {})
+            values = access(metrics)
+            if len(values) != len(reference):
+                return True
+            for instance, value in values:
+                sent = reference.get(instance)
+                if sent is None:
+                    return True
+                band = abs(sent) * width if relative else width
+                if abs(value - sent) > band:
+                    return True
+        return False
+
+    def update(self, metrics: Dict[str, Any], active: bool = False) -> bool:
+        """
+        Account for one collected sample and adjust the interval.
+
+        Args:
+            metrics: Metrics payload of the tick
+            active: Whether something outside the deadbands needs full rate,
+                e.g. an alert transition or a pending alert
+
+        Returns:
+            Whether the sample differs enough from the last transmitted one
+        """
+        moved = active or self._moved(metrics)
+        if moved:
+            self._quiet = 0
+            self.interval = self.base_interval
+        else:
+            self._quiet += 1
+            if self._quiet > self.quiet_ticks:
+                self.interval = min(self.interval * self.backoff, self.max_interval)
+        return moved
+
+    def should_send(self, moved: bool, now: float) -> bool:
+        """
+        Decide whether a sample due for transmission is sent.
+
+        Args:
+            moved: Result of update() for the sample
+            now: Monotonic time
+
+        Returns:
+            True if the sample moved or the heartbeat is due
+        """
+        if moved or self._last_sent is None:
+            return True
+        if now - self._last_sent >= self.heartbeat:
+            self.heartbeats += 1
+            return True
+        self.suppressed += 1
+        return False
+
+    def sent(self, metrics: Dict[str, Any], now: float):
+        """
+        Make a transmitted sample the new reference.
+
+        Args:
+            metrics: Transmitted metrics payload
+            now: Monotonic time
+        """
+        self._reference = self._values(metrics)
+        self._last_sent = now
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the current interval (ms) and suppressed/heartbeat counts"""
+        return {
+            'interval': int(self.interval * 1000),
+            'suppressed': self.suppressed,
+            'heartbeats': self.heartbeats
+        }
@@ -4,14 +4,28 @@ Main agent class for collecting and transmitting system metrics
 """
 
 import asyncio
+import json
 import logging
+import math
+import os
 import signal
 import sys
 import time
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
 
+from servwatch_agent.adaptive import AdaptiveSampler
+from servwatch_agent.alerts import AlertEngine
 from servwatch_agent.config import get_config
+from servwatch_agent.collectors.cgroups import CgroupCollector
+from servwatch_agent.collectors.pressure import PressureCollector
+from servwatch_agent.collectors.highres import HighResSampler
 from servwatch_agent.collectors.system import SystemCollector
+from servwatch_agent.scheduler import CollectorScheduler
+from servwatch_agent.selfstats import AgentStats
+from servwatch_agent.store import QueryServer, RingStore, series_bytes, series_samples
+from servwatch_agent.transmitters.async_websocket import AsyncWSTransmitter
+from servwatch_agent.transmitters.openmetrics import MetricsEndpoint
 from servwatch_agent.transmitters.websocket import WSTransmitter
 
 logging.basicConfig(
@@ -33,9 +47,32 @@ class Agent:
         """
         self.config = get_config(config_path)
         self.collector = None
+        self.scheduler = None
+        self.highres = None
         self.transmitter = None
+        self.endpoint = None
+        self.store = None
+        self.query_server = None
+        self.alerts = None
+        self.adaptive = None
+        self._alert_events: List[Dict[str, Any]] = []
         self.running = False
         self._system_info = None
+        self._system_info_sent = False
+        self._interfaces_version = None
+        self._interfaces_sent_at = 0.0
+        self._omit_interfaces = (
+            self.config.get('network', 'omitUnchanged', default=False)
+            # Delta frames already leave unchanged interfaces out, omitting them would delete them
+            and not self.config.get('transmitter', 'deltaEncoding', default=False)
+        )
+        self._interfaces_refresh = self.config.get('network', 'interfacesRefresh', default=60000) / 1000
+        self._next_transmit: Optional[float] = None
+        self._collect_interval = self.config.get('agent', 'collectInterval', default=1000) / 1000
+        self._transmit_interval = self.config.get('agent', 'transmitInterval', default=1000) / 1000
+        self._stop_event: Optional[asyncio.Event] = None
+        self.stats = AgentStats()
+        self._report_stats = self.config.get('metrics', 'agent', default=True)
 
         # Setup logging
         log_level = self.config.get('logging', 'level', default='INFO')
@@ -45,72 +82,440 @@ class Agent:
         """Start the agent"""
         logger.info("Starting ServWatch Python Agent")
         logger.info(f"Agent ID: {self.config.get('agent', 'id')}")
-        logger.info(f"Server: {self.config.get('server', 'url')}")
+        logger.info(f"Server: {self.config.get('server', 'url') or 'none, pull mode only'}")
 
-        # Initialize collector
-        enable_gpu = self.config.get('agent', 'enableGPU', default=True)
-        self.collector = SystemCollector(enable_gpu=enable_gpu)
+        self._setup_collection()
 
-        # Get system info once
-        self._system_info = self.collector.get_system_info()
-        logger.info(f"Hostname: {self._system_info.get('hostname', 'Unknown')}")
-        logger.info(f"Platform: {self._system_info.get('platform', 'Unknown')}")
-        logger.info(f"CPU Cores: {self._system_info.get('cpu', {}).get('cores', 'Unknown')}")
+        if self.config.get('agent', 'mode', default='thread') == 'asyncio':
+            asyncio.run(self._run_async())
+            return
 
-        # Initialize transmitter
-        server_url = self.config.get('server', 'url')
-        agent_id = self.config.get('agent', 'id')
-        self.transmitter = WSTransmitter(server_url, agent_id)
+        if self.config.get('server', 'url'):
+            # Initialize transmitter
+            self.transmitter = WSTransmitter(*self._transmitter_args())
+            self.transmitter.on('connected', self._on_connected)
+            self.transmitter.on('registered', self._on_registered)
+            self.transmitter.on('alertRules', self._on_alert_rules)
 
-        # Connect to server
-        self.transmitter.connect()
+            # Connect to server
+            self.transmitter.connect()
 
         # Register signal handlers
         signal.signal(signal.SIGINT, self._signal_handler)
         signal.signal(signal.SIGTERM, self._signal_handler)
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, lambda *args: self.dump_stats())
 
         # Start collection loop
         self.running = True
         self._run()
 
-    def _run(self):
-        """Main collection loop"""
+    def _setup_collection(self):
+        """Initialize the collectors and the scheduler"""
+        enable_gpu = self.config.get('agent', 'enableGPU', default=True)
+        self.collector = SystemCollector(
+            enable_gpu=enable_gpu,
+            interface_include=self.config.get('network', 'include', default=None),
+            interface_exclude=self.config.get('network', 'exclude', default=None),
+            partition_options=self.config.get('partitions', default={}),
+            disk_io_options=self.config.get('diskIO', default={}),
+            on_error=self.stats.record_error
+        )
+        self.scheduler = self._create_scheduler()
+
+        # Sub-second sampling of cheap metrics, summarized per transmit window
+        if self.config.get('highResolution', 'enabled', default=False):
+            self.highres = HighResSampler(
+                interval=self.config.get('highResolution', 'interval', default=100) / 1000,
+                gpu_engine=self.collector.gpu_engine,
+                on_error=self.stats.record_error
+            )
+            self.highres.start()
+
+        # Pull-mode endpoint serving the latest sample to scrapers
+        if self.config.get('exporter', 'enabled', default=False):
+            self.endpoint = MetricsEndpoint(
+                host=self.config.get('exporter', 'host', default='127.0.0.1'),
+                port=self.config.get('exporter', 'port', default=9464),
+                path=self.config.get('exporter', 'path', default='/metrics'),
+                agent_stats=lambda: self.stats.view(self.transmitter) if self._report_stats else None
+            )
+            self.endpoint.start()
+
+        # Alert rules evaluated on every tick, transitions sent as alert:event
+        if self.config.get('alerts', 'enabled', default=False):
+            self.alerts = AlertEngine(self.config.get('alerts', 'rules', default=[]) or [])
+
+        # Slower collection and send-on-change while metrics stay within their deadbands
+        if self.config.get('adaptive', 'enabled', default=False):
+            self.adaptive = AdaptiveSampler(
+                self._collect_interval,
+                deadbands=self.config.get('adaptive', 'deadbands', default=None),
+                max_interval=self.config.get('adaptive', 'maxInterval', default=10000) / 1000,
+                backoff=self.config.get('adaptive', 'backoff', default=2.0),
+                quiet_ticks=self.config.get('adaptive', 'quietTicks', default=5),
+                heartbeat=self.config.get('adaptive', 'heartbeat', default=60000) / 1000
+            )
+
+        # Local history of the collected series
+        if self.config.get('store', 'enabled', default=False):
+            tiers = (
+                (1, self.config.get('store', 'rawRetention', default=3600)),
+                (10, self.config.get('store', 'rollup10Retention', default=21600)),
+                (60, self.config.get('store', 'rollup60Retention', default=86400))
+            )
+            self.store = RingStore(
+                tiers=tiers,
+                max_bytes=self._store_budget(tiers),
+                include=self.config.get('store', 'include', default=[])
+            )
+            self.query_server = QueryServer(
+                self.store,
+                host=self.config.get('store', 'host', default='127.0.0.1'),
+                port=self.config.get('store', 'port', default=9465),
+                socket_path=self.config.get('store', 'socket', default=None)
+            )
+            self.query_server.start()
+
+        # Get system info once
+        self._system_info = self.collector.get_system_info()
+        logger.info(f"Hostname: {self._system_info.get('hostname', 'Unknown')}")
+        logger.info(f"Platform: {self._system_info.get('platform', 'Unknown')}")
+        logger.info(f"CPU Cores: {self._system_info.get('cpu', {}).get('cores', 'Unknown')}")
+
+    # Series the store budget reserves for the families without a per-host count
+    # (scalars, memory, load, processes and a few disks, mounts and interfaces)
+    STORE_BASE_SERIES = 128
+
+    def _store_budget(self, tiers) -> int:
+        """
+        Memory budget of the metric store.
+
+        store.maxBytes when set, otherwise room for STORE_BASE_SERIES series
+        plus the families that grow with the host: one cpu_core_usage_percent
+        series per logical CPU and seven cgroup_* series per reported cgroup.
+        """
+        max_bytes = self.config.get('store', 'maxBytes', default=None)
+        if max_bytes:
+            return max_bytes
+        series = self.STORE_BASE_SERIES + (os.cpu_count() or 1)
+        if self.config.get('metrics', 'cgroups', default=True):
+            series += 7 * self.config.get('cgroups', 'maxCgroups', default=50)
+        budget = series * series_bytes(tiers)
+        logger.info(f"Metric store budget: {series} series, {budget / 1048576:.1f} MiB")
+        return budget
+
+    def _transmitter_args(self):
+        """Positional arguments for the transmitter constructor"""
+        server_url = self.config.get('server', 'url')
+        agent_id = self.config.get('agent', 'id')
+        transmitter_options = self.config.get('transmitter', default={}) or {}
+        return server_url, agent_id, transmitter_options
+
+    # Payload sections controlled by each 'metrics' config flag
+    METRIC_SECTIONS = {
+        'cpu': ('cpu',),
+        'memory': ('memory',),
+        'disk': ('partitions', 'diskIO'),
+        'network': ('interfaces', 'networkIO'),
+        'gpu': ('gpu',),
+        'temperatures': ('temperatures',),
+        'processes': ('processes',),
+        'cgroups': ('cgroups',),
+        'pressure': ('pressure',)
+    }
+
+    def _create_scheduler(self) -> CollectorScheduler:
+        """Build the collector scheduler from the metrics and schedule config"""
+        collectors = self.collector.get_section_collectors()
+
+        # Container-level metrics from the cgroup v2 hierarchy
+        if self.config.get('metrics', 'cgroups', default=True):
+            cgroup_collector = CgroupCollector(
+                root=self.config.get('cgroups', 'root', default='/sys/fs/cgroup'),
+                max_cgroups=self.config.get('cgroups', 'maxCgroups', default=50),
+                rescan_interval=self.config.get('cgroups', 'rescanInterval', default=30000) / 1000,
+                on_error=self.stats.record_error
+            )
+            if cgroup_collector.available:
+                collectors['cgroups'] = cgroup_collector.collect
+
+        # Pressure stall information, where the kernel provides it
+        if self.config.get('metrics', 'pressure', default=True):
+            pressure_collector = PressureCollector(on_error=self.stats.record_error)
+            if pressure_collector.available:
+                collectors['pressure'] = pressure_collector.collect
+
+        for metric, sections in self.METRIC_SECTIONS.items():
+            if not self.config.get('metrics', metric, default=True):
+                for section in sections:
+                    collectors.pop(section, None)
+
         collect_interval = self.config.get('agent', 'collectInterval', default=1000) / 1000
-        transmit_interval = self.config.get('agent', 'transmitInterval', default=1000) / 1000
+        schedule = self.config.get('schedule', default={}) or {}
+        intervals = {name: ms / 1000 for name, ms in schedule.items()}
+        deadlines = self.config.get('collectors', 'deadlines', default={}) or {}
+        default_deadline = self.config.get('collectors', 'deadline', default=None)
+        return CollectorScheduler(
+            collectors, intervals, default_interval=collect_interval,
+            observer=self.stats.record_collector,
+            on_error=self.stats.record_error,
+            workers=self.config.get('collectors', 'workers', default=4),
+            deadlines={name: ms / 1000 for name, ms in deadlines.items()},
+            default_deadline=default_deadline / 1000 if default_deadline else None,
+            quarantine_after=self.config.get('collectors', 'quarantineAfter', default=3),
+            quarantine_backoff=self.config.get('collectors', 'quarantineBackoff', default=30000) / 1000,
+            quarantine_max=self.config.get('collectors', 'quarantineMax', default=600000) / 1000
+        )
+
+    def _collect(self) -> Optional[Dict[str, Any]]:
+        """
+        Run the due collectors and decide whether the sample is transmitted.
 
-        last_transmit = time.time()
-        last_metrics = None
+        Returns:
+            Metrics payload to transmit, or None if the transmit interval has
+            not elapsed yet
+        """
+        sections, ages = self.scheduler.run()
+        metrics = SystemCollector.build_metrics(sections, ages, self.scheduler.status)
+        if self.endpoint:
+            self.endpoint.update(sections)
+        if self.store:
+            self.store.add(time.time(), series_samples(sections))
+        alerting = False
+        if self.alerts:
+            for event in self.alerts.evaluate(metrics):
+                alerting = True
+                instance = f" on {event['instance']}" if event['instance'] else ''
+                logger.warning(f"Alert {event['name']}{instance} {event['state']} (value {event['value']:.2f})")
+                if self.transmitter:
+                    self._alert_events.append({'agentId': self.config.get('agent', 'id'), **event})
+
+        moved = True
+        if self.adaptive:
+            active = alerting or (self.alerts is not None and self.alerts.breaching())
+            moved = self.adaptive.update(metrics, active=active)
+
+        # Transmit on the tick closest to each transmit deadline
+        now = time.monotonic()
+        if self._next_transmit is None:
+            self._next_transmit = now
+        if now + self._tick_interval() / 2 < self._next_transmit:
+            return None
+        self._next_transmit = self._next_deadline(self._next_transmit, self._transmit_interval, now)
+        heartbeat = False
+        if self.adaptive:
+            heartbeats = self.adaptive.heartbeats
+            if not self.adaptive.should_send(moved, now):
+                return None
+            self.adaptive.sent(metrics, now)
+            heartbeat = self.adaptive.heartbeats != heartbeats
+
+        # Add system info to first transmission
+        if self._system_info and not self._system_info_sent:
+            metrics['systemInfo'] = self._system_info
+            self._system_info_sent = True
+
+        if self._omit_interfaces:
+            self._omit_unchanged_interfaces(metrics, sections, now, heartbeat)
+
+        if self.highres:
+            metrics['window'] = self.highres.take_window()
+
+        if self._report_stats:
+            metrics['agent'] = self.stats.snapshot(self.transmitter)
+            if self.adaptive:
+                metrics['agent']['sampling'] = self.adaptive.stats()
+
+        # Log summary
+        cpu = metrics.get('cpu', {}).get('usage', 0)
+        mem = metrics.get('memory', {}).get('percentage', 0)
+        gpu_count = metrics.get('gpu', {}).get('count', 0)
+        logger.debug(f"Metrics - CPU: {cpu:.1f}%, Memory: {mem:.1f}%, GPUs: {gpu_count}")
+        return metrics
+
+    def _omit_unchanged_interfaces(self, metrics: Dict[str, Any], sections: Dict[str, Any],
+                                   now: float, heartbeat: bool):
+        """
+        Leave interface metadata out of a payload while it is unchanged (network.omitUnchanged).
 
-        while self.running:
-            try:
-                # Collect metrics
-                metrics = self.collector.collect_all()
+        The full list is still sent after every (re)connect, on adaptive
+        sampling heartbeats and at least every network.interfacesRefresh ms,
+        so a receiver that only keeps the latest payload recovers it.
+        """
+        network = metrics.get('network')
+        if network is None or 'interfaces' not in sections:
+            return
+        version = self.collector.interfaces.version
+        if (version == self._interfaces_version and not heartbeat
+                and now - self._interfaces_sent_at < self._interfaces_refresh):
+            del network['interfaces']
+            return
+        self._interfaces_version = version
+        self._interfaces_sent_at = now
 
-                if metrics:
-                    # Add system info to first transmission
-                    if last_metrics is None and self._system_info:
-                        metrics['systemInfo'] = self._system_info
+    def dump_stats(self) -> Dict[str, Any]:
+        """
+        Log the agent's self-instrumentation and write it to agent.debugDumpPath.
 
-                    last_metrics = metrics
+        Called on SIGUSR1. The dump has the same content as the payload's
+        'agent' section.
 
-                    # Transmit based on interval
-                    now = time.time()
-                    if now - last_transmit >= transmit_interval:
-                        self.transmitter.transmit(metrics)
-                        last_transmit = now
+        Returns:
+            The dumped statistics
+        """
+        stats = self.stats.view(self.transmitter)
+        dump = json.dumps(stats, indent=2)
+        logger.info(f"Agent statistics:\n{dump}")
 
-                        # Log summary
-                        cpu = metrics.get('cpu', {}).get('usage', 0)
-                        mem = metrics.get('memory', {}).get('percentage', 0)
-                        gpu_count = metrics.get('gpu', {}).get('count', 0)
-                        logger.debug(f"Metrics - CPU: {cpu:.1f}%, Memory: {mem:.1f}%, GPUs: {gpu_count}")
+        path = self.config.get('agent', 'debugDumpPath', default=None)
+        if path:
+            try:
+                tmp_path = f'{path}.tmp'
+                with open(tmp_path, 'w') as f:
+                    f.write(dump + '\n')
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.error(f"Error writing agent statistics to {path}: {e}")
+        return stats
+
+    def _on_connected(self, data: Any):
+        """Resend interface metadata on a new connection, the server may have restarted"""
+        self._interfaces_version = None
+
+    def _on_registered(self, data: Any):
+        """Resend interface metadata after (re)registering and load pushed alert rules"""
+        self._interfaces_version = None
+        if isinstance(data, dict) and 'alertRules' in data:
+            self._on_alert_rules(data['alertRules'])
+
+    def _on_alert_rules(self, data: Any):
+        """Replace the alert rules with a set pushed by the server, as a list or {'rules': [...]}"""
+        if not self.alerts:
+            return
+        rules = data.get('rules') if isinstance(data, dict) else data
+        if isinstance(rules, list):
+            self.alerts.load(rules)
+        else:
+            logger.warning(f"Ignoring malformed alert rule set: {type(data).__name__}")
+
+    def _take_alert_events(self) -> List[Dict[str, Any]]:
+        """Remove and return the alert transitions of the ticks since the last call"""
+        events, self._alert_events = self._alert_events, []
+        return events
+
+    def _tick_interval(self) -> float:
+        """Current collection interval in seconds, longer while adaptive sampling backs off"""
+        return self.adaptive.interval if self.adaptive else self._collect_interval
+
+    @staticmethod
+    def _next_deadline(deadline: float, interval: float, now: float) -> float:
+        """
+        Advance a tick deadline on a fixed grid.
 
-                # Sleep for collect interval
-                time.sleep(collect_interval)
+        Ticks that were missed because collection overran are skipped rather
+        than run back to back, so the cadence stays aligned to the grid.
+        """
+        deadline += interval
+        if deadline <= now:
+            deadline += math.ceil((now - deadline) / interval) * interval
+            if deadline <= now:
+                deadline += interval
+        return deadline
 
+    def _run(self):
+        """Main collection loop"""
+        deadline = time.monotonic()
+
+        while self.running:
+            start = time.monotonic()
+            try:
+                metrics = self._collect()
+                if self.transmitter:
+                    # Alert transitions go out on every tick, ahead of the sample
+                    for event in self._take_alert_events():
+                        self.transmitter.send_event('alert:event', event)
+                    if metrics:
+                        self.transmitter.transmit(metrics)
             except Exception as e:
                 logger.error(f"Error in collection loop: {e}")
-                time.sleep(collect_interval)
+
+            # Sleep until the next tick on the schedule, not for a full interval
+            collect_interval = self._tick_interval()
+            now = time.monotonic()
+            self.stats.record_tick(now - start, now >= deadline + collect_interval)
+            deadline = self._next_deadline(deadline, collect_interval, now)
+            time.sleep(max(0.0, deadline - time.monotonic()))
+
+    async def _run_async(self):
+        """Collection loop for asyncio mode"""
+        loop = asyncio.get_running_loop()
+
+        # Collectors keep per-tick state, so they run one at a time off the loop
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='collector')
+        self._stop_event = asyncio.Event()
+
+        if self.config.get('server', 'url'):
+            self.transmitter = AsyncWSTransmitter(*self._transmitter_args())
+            self.transmitter.on('connected', self._on_connected)
+            self.transmitter.on('registered', self._on_registered)
+            self.transmitter.on('alertRules', self._on_alert_rules)
+            await self.transmitter.connect()
+
+        # Register signal handlers (after connect, which installs its own)
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, self._request_stop)
+            except (NotImplementedError, RuntimeError):
+                signal.signal(signum, lambda *args: loop.call_soon_threadsafe(self._request_stop))
+        if hasattr(signal, 'SIGUSR1'):
+            try:
+                loop.add_signal_handler(signal.SIGUSR1, self.dump_stats)
+            except (NotImplementedError, RuntimeError):
+                signal.signal(signal.SIGUSR1, lambda *args: loop.call_soon_threadsafe(self.dump_stats))
+
+        self.running = True
+        deadline = loop.time()
+        try:
+            while self.running:
+                start = loop.time()
+                try:
+                    metrics = await loop.run_in_executor(executor, self._collect)
+                    if self.transmitter:
+                        for event in self._take_alert_events():
+                            await self.transmitter.send_event('alert:event', event)
+                        if metrics:
+                            await self.transmitter.transmit(metrics)
+                except Exception as e:
+                    logger.error(f"Error in collection loop: {e}")
+
+                collect_interval = self._tick_interval()
+                now = loop.time()
+                self.stats.record_tick(now - start, now >= deadline + collect_interval)
+                deadline = self._next_deadline(deadline, collect_interval, now)
+                try:
+                    await asyncio.wait_for(self._stop_event.wait(), max(0.0, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            logger.info("Stopping ServWatch Python Agent")
+            if self.highres:
+                self.highres.stop()
+            if self.endpoint:
+                self.endpoint.stop()
+            if self.query_server:
+                self.query_server.stop()
+            if self.transmitter:
+                await self.transmitter.disconnect()
+            executor.shutdown(wait=False)
+            logger.info("Agent stopped")
+
+    def _request_stop(self):
+        """Stop the asyncio collection loop after the current tick"""
+        logger.info("Received shutdown signal")
+        self.running = False
+        if self._stop_event is not None:
+            self._stop_event.set()
 
     def _signal_handler(self, signum, frame):
         """Handle shutdown signals"""
@@ -125,6 +530,15 @@ class Agent:
         logger.info("Stopping ServWatch Python Agent")
         self.running = False
 
+        if self.highres:
+            self.highres.stop()
+
+        if self.endpoint:
+            self.endpoint.stop()
+
+        if self.query_server:
+            self.query_server.stop()
+
         if self.transmitter:
             self.transmitter.disconnect()
 
@@ -160,6 +574,11 @@ def main():
         action='store_true',
         help='Disable GPU monitoring'
     )
+    parser.add_argument(
+        '--asyncio',
+        action='store_true',
+        help='Run the agent on an asyncio event loop'
+    )
 
     args = parser.parse_args()
 
@@ -176,6 +595,9 @@ def main():
     if args.no_gpu:
         agent.config.config['agent']['enableGPU'] = False
 
+    if args.asyncio:
+        agent.config.config['agent']['mode'] = 'asyncio'
+
     # Start agent
     try:
         agent.start()
@@ -0,0 +1,145 @@
+"""
+Window Aggregation
+Summarizes high-frequency samples into min/max/mean/last and sketch-based percentiles
+"""
+
+import math
+from typing import Dict, Optional, Any
+
+
+class QuantileSketch:
+    """
+    Relative-error quantile sketch (DDSketch-style).
+
+    Values are counted in logarithmic buckets whose width guarantees that any
+    reported quantile is within relative_accuracy of the true value, using a
+    few dozen integers no matter how many samples are added. Values <= 0 are
+    counted separately as zero.
+    """
+
+    __slots__ = ('_gamma_log', '_buckets', '_zero_count', 'count')
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        """
+        Initialize the sketch.
+
+        Args:
+            relative_accuracy: Maximum relative error of reported quantiles
+        """
+        gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._gamma_log = math.log(gamma)
+        self._buckets: Dict[int, int] = {}
+        self._zero_count = 0
+        self.count = 0
+
+    def add(self, value: float):
+        """Add a value to the sketch"""
+        self.count += 1
+        if value <= 0:
+            self._zero_count += 1
+            return
+        key = math.ceil(math.log(value) / self._gamma_log)
+        self._buckets[key] = self._buckets.get(key, 0) + 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate a quantile.
+
+        Args:
+            q: Quantile between 0 and 1
+
+        Returns:
+            Estimated value, or None if the sketch is empty
+        """
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self._zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self._buckets):
+            seen += self._buckets[key]
+            if rank < seen:
+                # Midpoint of the bucket (gamma^(key-1), gamma^key]
+                return 2 * math.exp(key * self._gamma_log) / (1 + math.exp(self._gamma_log))
+        return 2 * math.exp(max(self._buckets) * self._gamma_log) / (1 + math.exp(self._gamma_log))
+
+
+class MetricWindow:
+    """Running summary of one metric over a transmit window"""
+
+    __slots__ = ('min', 'max', 'sum', 'last', 'sketch')
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.min = math.inf
+        self.max = -math.inf
+        self.sum = 0.0
+        self.last = 0.0
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def add(self, value: float):
+        """Add a sample"""
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.sum += value
+        self.last = value
+        self.sketch.add(value)
+
+    def summary(self) -> Dict[str, Any]:
+        """Get the window summary"""
+        count = self.sketch.count
+        return {
+            'min': self.min,
+            'max': self.max,
+            'mean': self.sum / count,
+            'last': self.last,
+            'p95': self._clamp(self.sketch.quantile(0.95)),
+            'p99': self._clamp(self.sketch.quantile(0.99)),
+            'count': count
+        }
+
+    def _clamp(self, value: float) -> float:
+        """Keep a sketch estimate inside the exact observed range"""
+        return min(max(value, self.min), self.max)
+
+
+class WindowAggregator:
+    """Aggregates samples of several metrics until the window is taken"""
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        """
+        Initialize the aggregator.
+
+        Args:
+            relative_accuracy: Relative accuracy of the percentile sketches
+        """
+        self.relative_accuracy = relative_accuracy
+        self._windows: Dict[str, MetricWindow] = {}
+
+    def add(self, values: Dict[str, Optional[float]]):
+        """
+        Add one sample of several metrics.
+
+        Args:
+            values: Metric name to value; None values are skipped
+        """
+        windows = self._windows
+        for name, value in values.items():
+            if value is None:
+                continue
+            window = windows.get(name)
+            if window is None:
+                window = windows[name] = MetricWindow(self.relative_accuracy)
+            window.add(value)
+
+    def take(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Summarize the current window and start a new one.
+
+        Returns:
+            Metric name to summary (min, max, mean, last, p95, p99, count)
+        """
+        windows, self._windows = self._windows, {}
+        return {name: window.summary() for name, window in windows.items()}
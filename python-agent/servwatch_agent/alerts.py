@@ -0,0 +1,373 @@
+"""
+Edge Alert Evaluation
+Evaluates alert rules against each sample in the agent and reports state transitions
+"""
+
+import logging
+import math
+import operator
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Same conditions as the backend's Alert model
+CONDITIONS = {
+    'greater_than': operator.gt,
+    'less_than': operator.lt,
+    'equals': operator.eq,
+    'not_equals': operator.ne
+}
+
+FUNCTIONS = ('value', 'ewma', 'rate')
+
+# Field evaluated for rules that only name a metricType
+DEFAULT_FIELDS = {
+    'cpu': 'cpu.usage',
+    'memory': 'memory.percentage',
+    'disk': 'disk.drives[*].usePercent',
+    'gpu': 'gpu.controllers[*].usage',
+    'temperature': 'temperatures.max',
+    'network': 'network.totalRx'
+}
+
+# Keys naming the instance of a list element, in order of preference
+INSTANCE_KEYS = ('mountpoint', 'device', 'name', 'index', 'id')
+
+Accessor = Callable[[Dict[str, Any]], List[Tuple[str, float]]]
+
+
+class RuleError(ValueError):
+    """Raised for a rule that cannot be compiled"""
+
+
+def _instance_of(item: Any, index: int) -> str:
+    if isinstance(item, dict):
+        for key in INSTANCE_KEYS:
+            value = item.get(key)
+            if value is not None:
+                return str(value)
+    return str(index)
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value != value:
+        return None
+    return float(value)
+
+
+def compile_field(path: str) -> Accessor:
+    """
+    Compile a field path into an accessor.
+
+    Paths are dotted keys into the metrics payload; a `[*]` suffix expands a
+    list, e.g. 'disk.drives[*].usePercent' yields one value per drive,
+    named by its mountpoint.
+
+    Args:
+        path: Field path
+
+    Returns:
+        Function taking a metrics payload and returning (instance, value)
+        pairs; the instance is '' for paths without lists
+    """
+    if not isinstance(path, str) or not path:
+        raise RuleError(f"Invalid field: {path!r}")
+    steps = []
+    for part in path.split('.'):
+        expand = part.endswith('[*]')
+        key = part[:-3] if expand else part
+        if not key:
+            raise RuleError(f"Invalid field: {path!r}")
+        steps.append((key, expand))
+
+    if not any(expand for _, expand in steps):
+        keys = tuple(key for key, _ in steps)
+
+        def access_scalar(metrics: Dict[str, Any]) -> List[Tuple[str, float]]:
+            node = metrics
+            for key in keys:
+                if not isinstance(node, dict):
+                    return []
+                node = node.get(key)
+            value = _number(node)
+            return [] if value is None else [('', value)]
+
+        return access_scalar
+
+    def access(metrics: Dict[str, Any]) -> List[Tuple[str, float]]:
+        nodes = [('', metrics)]
+        for key, expand in steps:
+            found = []
+            for instance, node in nodes:
+                node = node.get(key) if isinstance(node, dict) else None
+                if node is None:
+                    continue
+                if not expand:
+                    found.append((instance, node))
+                elif isinstance(node, list):
+                    for index, item in enumerate(node):
+                        name = _instance_of(item, index)
+                        found.append((f'{instance}/{name}' if instance else name, item))
+            nodes = found
+        values = []
+        for instance, node in nodes:
+            value = _number(node)
+            if value is not None:
+                values.append((instance, value))
+        return values
+
+    return access
+
+
+class _Rule:
+    """A compiled alert rule"""
+
+    __slots__ = ('id', 'name', 'severity', 'field', 'condition', 'compare', 'threshold', 'function',
+                 'window', 'duration', 'cooldown', 'access', 'definition')
+
+    def __init__(self, definition: Dict[str, Any]):
+        if not isinstance(definition, dict) or definition.get('id') is None:
+            raise RuleError("Rule without id")
+        self.definition = definition
+        self.id = str(definition['id'])
+        self.name = definition.get('name') or self.id
+        self.severity = definition.get('severity', 'warning')
+
+        self.field = definition.get('field') or DEFAULT_FIELDS.get(definition.get('metricType'))
+        if not self.field:
+            raise RuleError(f"Rule {self.id}: no field for metricType {definition.get('metricType')!r}")
+        self.access = compile_field(self.field)
+
+        self.condition = definition.get('condition', 'greater_than')
+        self.compare = CONDITIONS.get(self.condition)
+        if self.compare is None:
+            raise RuleError(f"Rule {self.id}: unknown condition {self.condition!r}")
+        self.threshold = _number(definition.get('threshold'))
+        if self.threshold is None:
+            raise RuleError(f"Rule {self.id}: threshold must be a number")
+
+        self.function = definition.get('function', 'value')
+        if self.function not in FUNCTIONS:
+            raise RuleError(f"Rule {self.id}: unknown function {self.function!r}")
+        self.window = float(definition.get('window', 60))
+        if self.window <= 0:
+            raise RuleError(f"Rule {self.id}: window must be positive")
+        self.duration = float(definition.get('duration', 0))
+        self.cooldown = float(definition.get('cooldown', 0))
+
+
+class _State:
+    """Evaluation state of one rule on one instance"""
+
+    __slots__ = ('value', 'previous', 'updated', 'breached_since', 'breached_at', 'firing', 'fired_at')
+
+    def __init__(self):
+        self.value: Optional[float] = None
+        self.previous: Optional[float] = None
+        self.updated: Optional[float] = None
+        self.breached_since: Optional[float] = None
+        self.breached_at: Optional[int] = None
+        self.firing = False
+        self.fired_at: Optional[float] = None
+
+
+class AlertEngine:
+    """
+    Evaluates alert rules on every collected sample.
+
+    Rules use the backend's condition, threshold, duration, cooldown and
+    severity fields, plus a payload field path (or a metricType from
+    DEFAULT_FIELDS) and a function applied to it: the raw value, an
+    exponentially weighted moving average over `window` seconds, or the
+    per-second rate of change. Field paths are compiled once when a rule set
+    is loaded. A rule fires once its condition held for `duration` seconds
+    and resolves when it stops holding; only these transitions are returned,
+    so a steady state costs no traffic. An instance that disappears from the
+    sample (an unmounted disk, a removed interface or GPU) loses its state,
+    and is reported as 'stale' if it was firing.
+    """
+
+    def __init__(self, rules: Optional[List[Dict[str, Any]]] = None):
+        """
+        Initialize the engine.
+
+        Args:
+            rules: Optional initial rule definitions
+        """
+        self.rules: List[_Rule] = []
+        self._states: Dict[str, Dict[str, _State]] = {}
+        self._pending: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        if rules:
+            self.load(rules)
+
+    def load(self, definitions: List[Dict[str, Any]]) -> int:
+        """
+        Replace the rule set.
+
+        Rules whose definition did not change keep their state. Firing rules
+        that were removed, disabled or changed are reported as resolved by
+        the next evaluate().
+
+        Args:
+            definitions: Rule definitions; disabled and invalid rules are skipped
+
+        Returns:
+            Number of rules loaded
+        """
+        rules = []
+        for definition in definitions or []:
+            if isinstance(definition, dict) and definition.get('enabled') is False:
+                continue
+            try:
+                rules.append(_Rule(definition))
+            except (RuleError, TypeError, ValueError) as e:
+                logger.warning(f"Skipping alert rule: {e}")
+
+        with self._lock:
+            previous = {rule.id: rule for rule in self.rules}
+            kept = {}
+            for rule in rules:
+                old = previous.get(rule.id)
+                if old is not None and old.definition == rule.definition and rule.id in self._states:
+                    kept[rule.id] = self._states[rule.id]
+            for rule_id, states in self._states.items():
+                if rule_id in kept:
+                    continue
+                for instance, state in states.items():
+                    if state.firing:
+                        self._pending.append(self._event(previous[rule_id], instance, 'resolved', state.value,
+                                                         int(time.time() * 1000), state.breached_at))
+            self.rules = rules
+            self._states = kept
+        logger.info(f"Loaded {len(rules)} alert rules")
+        return len(rules)
+
+    @staticmethod
+    def _event(rule: _Rule, instance: str, state: str, value: Optional[float], timestamp: int,
+               since: Optional[int]) -> Dict[str, Any]:
+        return {
+            'ruleId': rule.id,
+            'name': rule.name,
+            'severity': rule.severity,
+            'state': state,
+            'instance': instance,
+            'field': rule.field,
+            'function': rule.function,
+            'condition': rule.condition,
+            'threshold': rule.threshold,
+            'value': value,
+            'since': since,
+            'timestamp': timestamp
+        }
+
+    def evaluate(self, metrics: Dict[str, Any], now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Evaluate all rules against one sample.
+
+        Args:
+            metrics: Metrics payload (SystemCollector.build_metrics())
+            now: Monotonic time of the sample (default time.monotonic())
+
+        Returns:
+            alert:event payloads of the rules that fired, resolved or went stale
+        """
+        if now is None:
+            now = time.monotonic()
+        timestamp = metrics.get('timestamp') or int(time.time() * 1000)
+
+        with self._lock:
+            events, self._pending = self._pending, []
+            for rule in self.rules:
+                states = self._states.get(rule.id)
+                if states is None:
+                    states = self._states[rule.id] = {}
+                seen = set()
+                for instance, raw in rule.access(metrics):
+                    seen.add(instance)
+                    state = states.get(instance)
+                    if state is None:
+                        state = states[instance] = _State()
+                    value = self._apply(rule, state, raw, now)
+                    if value is None:
+                        continue
+                    event = self._transition(rule, state, instance, value, now, timestamp)
+                    if event is not None:
+                        events.append(event)
+                if len(seen) < len(states):
+                    self._forget_missing(rule, states, seen, timestamp, events)
+        return events
+
+    def _forget_missing(self, rule: _Rule, states: Dict[str, _State], seen: set, timestamp: int,
+                        events: List[Dict[str, Any]]):
+        """Drop the state of instances missing from the sample, reporting firing ones as stale"""
+        for instance in [instance for instance in states if instance not in seen]:
+            state = states.pop(instance)
+            if state.firing:
+                events.append(self._event(rule, instance, 'stale', state.value, timestamp, state.breached_at))
+
+    @staticmethod
+    def _apply(rule: _Rule, state: _State, raw: float, now: float) -> Optional[float]:
+        """Update the rule's function of the field, None until it has a value"""
+        elapsed = now - state.updated if state.updated is not None else None
+        state.updated = now
+        if rule.function == 'ewma':
+            if state.value is None:
+                state.value = raw
+            elif elapsed > 0:
+                alpha = 1 - math.exp(-elapsed / rule.window)
+                state.value += alpha * (raw - state.value)
+            return state.value
+        if rule.function == 'rate':
+            previous, state.previous = state.previous, raw
+            if previous is None or not elapsed or elapsed <= 0:
+                return None
+            state.value = (raw - previous) / elapsed
+            return state.value
+        state.value = raw
+        return raw
+
+    def _transition(self, rule: _Rule, state: _State, instance: str, value: float, now: float,
+                    timestamp: int) -> Optional[Dict[str, Any]]:
+        """Advance the ok/pending/firing state machine, returning the event of a transition"""
+        if not rule.compare(value, rule.threshold):
+            state.breached_since = None
+            if state.firing:
+                state.firing = False
+                return self._event(rule, instance, 'resolved', value, timestamp, state.breached_at)
+            return None
+
+        if state.breached_since is None:
+            state.breached_since = now
+            state.breached_at = timestamp
+        if state.firing or now - state.breached_since < rule.duration:
+            return None
+        if state.fired_at is not None and now - state.fired_at < rule.cooldown:
+            return None
+        state.firing = True
+        state.fired_at = now
+        return self._event(rule, instance, 'firing', value, timestamp, state.breached_at)
+
+    def breaching(self) -> bool:
+        """Whether any rule's condition currently holds, firing or still within its duration"""
+        with self._lock:
+            return any(
+                state.breached_since is not None
+                for states in self._states.values() for state in states.values()
+            )
+
+    def firing(self) -> List[Dict[str, Any]]:
+        """
+        List the currently firing alerts.
+
+        Returns:
+            (ruleId, instance, since) of each firing alert as dictionaries
+        """
+        with self._lock:
+            return [
+                {'ruleId': rule_id, 'instance': instance, 'since': state.breached_at}
+                for rule_id, states in self._states.items()
+                for instance, state in states.items() if state.firing
+            ]
@@ -0,0 +1,13 @@
+"""
+Agent Benchmarks
+"""
+
+from servwatch_agent.bench.fixtures import FakeProc, SyntheticHost, fake_interfaces, fake_proc
+from servwatch_agent.bench.runner import BenchmarkSuite, compare
+from servwatch_agent.bench.server import StandInServer
+from servwatch_agent.bench.swarm import Swarm
+
+__all__ = [
+    'BenchmarkSuite', 'FakeProc', 'StandInServer', 'Swarm', 'SyntheticHost', 'compare', 'fake_interfaces',
+    'fake_proc'
+]
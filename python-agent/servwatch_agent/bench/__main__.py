@@ -0,0 +1,10 @@
+"""
+ServWatch Agent Benchmarks
+Entry point for python -m servwatch_agent.bench
+"""
+
+import sys
+
+from servwatch_agent.bench.runner import main
+
+sys.exit(main())
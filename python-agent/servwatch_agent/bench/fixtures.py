@@ -0,0 +1,330 @@
+"""
+Benchmark Fixtures
+Synthetic /proc trees, psutil fakes and metrics payloads so the benchmarks run on any Linux box
+"""
+
+import os
+import random
+import shutil
+import socket
+import tempfile
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+import psutil
+
+_snicaddr = namedtuple('snicaddr', ['family', 'address', 'netmask', 'broadcast', 'ptp'])
+_snicstats = namedtuple('snicstats', ['isup', 'duplex', 'speed', 'mtu', 'flags'])
+_snetio = namedtuple('snetio', ['bytes_sent', 'bytes_recv', 'packets_sent', 'packets_recv',
+                                'errin', 'errout', 'dropin', 'dropout'])
+
+_COMMS = ('python3', 'java', 'postgres', 'nginx', 'node', 'containerd-shim', 'kworker/0:1', 'my app')
+
+
+class FakeProc:
+    """
+    Synthetic /proc tree with num_processes processes.
+
+    Only the files the collectors read are created (<pid>/stat, <pid>/comm,
+    self/stat, stat, diskstats, pressure/*), plus a sysfs-style block/
+    directory listing the whole disks. tick() advances the CPU and IO
+    counters so rate calculations see changing values.
+    """
+
+    def __init__(self, num_processes: int, num_cpus: int = 8, num_disks: int = 4):
+        """
+        Create the tree in a temporary directory.
+
+        Args:
+            num_processes: Number of synthetic processes
+            num_cpus: Number of cpuN lines in /proc/stat
+            num_disks: Number of disks in /proc/diskstats (each with two partitions)
+        """
+        self.root = tempfile.mkdtemp(prefix='servwatch-bench-proc-')
+        self.num_processes = num_processes
+        self.num_cpus = num_cpus
+        self.num_disks = num_disks
+        self.sys_block = os.path.join(self.root, 'block')
+        self._ticks = 0
+
+        os.makedirs(os.path.join(self.root, 'self'))
+        os.makedirs(os.path.join(self.root, 'pressure'))
+        for disk in range(num_disks):
+            os.makedirs(os.path.join(self.sys_block, self._disk_name(disk)))
+        for pid in range(1, num_processes + 1):
+            os.mkdir(os.path.join(self.root, str(pid)))
+        self.tick()
+
+    @staticmethod
+    def _disk_name(disk: int) -> str:
+        return 'sd' + (chr(ord('a') + disk // 26 - 1) if disk >= 26 else '') + chr(ord('a') + disk % 26)
+
+    def _stat_line(self, pid: int) -> str:
+        """A /proc/<pid>/stat line with counters advanced by tick()"""
+        comm = _COMMS[pid % len(_COMMS)]
+        utime = pid * 3 + self._ticks * (pid % 7)
+        stime = pid + self._ticks * (pid % 3)
+        rss = 1000 + (pid * 37) % 200000
+        fields = ['S', '1', str(pid), str(pid), '0', '-1', '4194304', '0', '0', '0', '0',
+                  str(utime), str(stime), '0', '0', '20', '0', '1', '0', str(1000 + pid),
+                  str(rss * 4096), str(rss)] + ['0'] * 30
+        return f"{pid} ({comm}) {' '.join(fields)}\n"
+
+    def tick(self):
+        """Advance all counters by one tick and rewrite the files"""
+        self._ticks += 1
+        root = self.root
+        for pid in range(1, self.num_processes + 1):
+            with open(f'{root}/{pid}/stat', 'w') as f:
+                f.write(self._stat_line(pid))
+            if self._ticks == 1:
+                with open(f'{root}/{pid}/comm', 'w') as f:
+                    f.write(_COMMS[pid % len(_COMMS)] + '\n')
+        with open(f'{root}/self/stat', 'w') as f:
+            f.write(self._stat_line(1))
+
+        t = self._ticks
+        lines = []
+        total = [0] * 8
+        for cpu in range(self.num_cpus):
+            values = [t * 50 + cpu, t, t * 20, t * 400, t * 2, 0, t, 0]
+            total = [a + b for a, b in zip(total, values)]
+            lines.append(f"cpu{cpu} {' '.join(map(str, values))} 0 0\n")
+        with open(f'{root}/stat', 'w') as f:
+            f.write(f"cpu  {' '.join(map(str, total))} 0 0\n" + ''.join(lines))
+
+        with open(f'{root}/diskstats', 'w') as f:
+            for disk in range(self.num_disks):
+                name = self._disk_name(disk)
+                for part, suffix in enumerate(('', '1', '2')):
+                    n = t * (100 + disk) // (part + 1)
+                    f.write(f'   8 {disk * 16 + part} {name}{suffix} {n} 0 {n * 8} {n // 2} '
+                            f'{n} 0 {n * 16} {n} 1 {t * 10} {t * 12} 0 0 0 0 0 0\n')
+
+        for resource in ('cpu', 'memory', 'io'):
+            with open(f'{root}/pressure/{resource}', 'w') as f:
+                f.write(f'some avg10=1.00 avg60=0.50 avg300=0.20 total={t * 5000}\n'
+                        f'full avg10=0.00 avg60=0.00 avg300=0.00 total={t * 100}\n')
+
+    def cleanup(self):
+        """Remove the tree"""
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+@contextmanager
+def fake_proc(num_processes: int, **kwargs) -> Iterator[FakeProc]:
+    """Context manager creating and removing a FakeProc"""
+    proc = FakeProc(num_processes, **kwargs)
+    try:
+        yield proc
+    finally:
+        proc.cleanup()
+
+
+@contextmanager
+def fake_interfaces(count: int, prefix: str = 'veth'):
+    """
+    Replace psutil's interface functions with count synthetic interfaces.
+
+    The first interface is named eth0, the rest <prefix>N. IO counters
+    increase on every call.
+    """
+    names = ['eth0'] + [f'{prefix}{i:04x}' for i in range(1, count)]
+    addrs = {}
+    stats = {}
+    for i, name in enumerate(names):
+        addrs[name] = [
+            _snicaddr(socket.AF_INET, f'10.{i >> 8 & 255}.{i & 255}.1', '255.255.255.0', None, None),
+            _snicaddr(socket.AF_INET6, f'fe80::{i:x}', 'ffff:ffff:ffff:ffff::', None, None),
+            _snicaddr(getattr(socket, 'AF_PACKET', 17), f'02:00:00:00:{i >> 8 & 255:02x}:{i & 255:02x}',
+                      None, None, None)
+        ]
+        stats[name] = _snicstats(True, 2, 10000, 1500, 'up,broadcast,running,multicast')
+
+    calls = [0]
+
+    def net_io_counters(pernic=False, nowrap=True):
+        calls[0] += 1
+        n = calls[0]
+        counters = {
+            name: _snetio(n * 1000 * (i + 1), n * 2000 * (i + 1), n * 10, n * 20, 0, 0, 0, 0)
+            for i, name in enumerate(names)
+        }
+        if pernic:
+            return counters
+        return _snetio(*(sum(values) for values in zip(*counters.values())))
+
+    originals = (psutil.net_if_addrs, psutil.net_if_stats, psutil.net_io_counters)
+    psutil.net_if_addrs = lambda: addrs
+    psutil.net_if_stats = lambda: stats
+    psutil.net_io_counters = net_io_counters
+    try:
+        yield names
+    finally:
+        psutil.net_if_addrs, psutil.net_if_stats, psutil.net_io_counters = originals
+
+
+class SyntheticHost:
+    """
+    Metrics payloads shaped like SystemCollector.build_metrics(), without a host.
+
+    Values follow a bounded random walk per host, so consecutive payloads
+    differ the way real ones do and delta frames stay realistic. Interface
+    metadata is only included in the first payload, like the agent does.
+    """
+
+    def __init__(self, seed: int = 0, cores: int = 8, disks: int = 2, interfaces: int = 2,
+                 processes: int = 10):
+        """
+        Initialize the host.
+
+        Args:
+            seed: Random seed, one per simulated host
+            cores: CPU cores (perCore length)
+            disks: Drives and disk I/O devices
+            interfaces: Network interfaces
+            processes: Length of each top process list
+        """
+        self.random = random.Random(seed)
+        self.cores = cores
+        self.disks = disks
+        self.interfaces = interfaces
+        self.processes = processes
+        self.cpu = [self.random.uniform(2, 40) for _ in range(cores)]
+        self.memory_total = self.random.choice((8, 16, 32, 64)) << 30
+        self.memory = self.random.uniform(0.2, 0.7)
+        self.disk_used = [self.random.uniform(0.1, 0.8) for _ in range(disks)]
+        self.rx_bytes = [0] * interfaces
+        self.tx_bytes = [0] * interfaces
+        self.pids = [self.random.randrange(100, 4000000) for _ in range(processes)]
+        self.samples = 0
+
+    def _walk(self, value: float, step: float, low: float, high: float) -> float:
+        return min(high, max(low, value + self.random.uniform(-step, step)))
+
+    def sample(self) -> Dict[str, Any]:
+        """
+        Produce the next payload.
+
+        Returns:
+            Metrics payload dictionary
+        """
+        rnd = self.random
+        self.cpu = [self._walk(value, 3, 0, 100) for value in self.cpu]
+        usage = sum(self.cpu) / self.cores
+        self.memory = self._walk(self.memory, 0.005, 0.05, 0.95)
+        used = int(self.memory_total * self.memory)
+
+        drives = []
+        devices = []
+        for i in range(self.disks):
+            self.disk_used[i] = self._walk(self.disk_used[i], 0.0005, 0.01, 0.99)
+            total = 500 << 30
+            name = f'sd{chr(97 + i % 26)}'
+            drives.append({
+                'device': f'/dev/{name}1',
+                'mountpoint': '/' if i == 0 else f'/data{i}',
+                'fstype': 'ext4',
+                'total': total,
+                'used': int(total * self.disk_used[i]),
+                'free': int(total * (1 - self.disk_used[i])),
+                'usePercent': round(self.disk_used[i] * 100, 2)
+            })
+            devices.append({
+                'name': name,
+                'readIops': rnd.uniform(0, 200),
+                'writeIops': rnd.uniform(0, 400),
+                'readBytes_sec': rnd.uniform(0, 8 << 20),
+                'writeBytes_sec': rnd.uniform(0, 16 << 20),
+                'readAwait': rnd.uniform(0.1, 5),
+                'writeAwait': rnd.uniform(0.1, 10),
+                'inFlight': rnd.randrange(0, 4),
+                'avgQueue': rnd.uniform(0, 2),
+                'util': rnd.uniform(0, 60)
+            })
+
+        stats = []
+        for i in range(self.interfaces):
+            rx_sec = rnd.uniform(0, 4 << 20)
+            tx_sec = rnd.uniform(0, 2 << 20)
+            self.rx_bytes[i] += int(rx_sec)
+            self.tx_bytes[i] += int(tx_sec)
+            stats.append({
+                'iface': f'eth{i}',
+                'rx_bytes': self.rx_bytes[i],
+                'tx_bytes': self.tx_bytes[i],
+                'rx_packets': self.rx_bytes[i] // 1200,
+                'tx_packets': self.tx_bytes[i] // 1200,
+                'rx_sec': rx_sec,
+                'tx_sec': tx_sec
+            })
+
+        top = [{
+            'pid': pid,
+            'name': _COMMS[pid % len(_COMMS)],
+            'cpu': rnd.uniform(0, 50),
+            'memory': rnd.uniform(0, 10),
+            'user': 'root',
+            'status': 'running'
+        } for pid in self.pids]
+
+        metrics = {
+            'timestamp': int(time.time() * 1000),
+            'cpu': {
+                'usage': usage,
+                'perCore': self.cpu,
+                'breakdown': {
+                    'user': usage * 0.7,
+                    'system': usage * 0.25,
+                    'iowait': usage * 0.03,
+                    'irq': 0.0,
+                    'softirq': usage * 0.02,
+                    'steal': 0.0
+                },
+                'loadAverage': [usage / 100 * self.cores * f for f in (1.0, 0.9, 0.8)],
+                'cores': self.cores,
+                'physicalCores': max(1, self.cores // 2),
+                'temperature': int(40 + usage / 3)
+            },
+            'memory': {
+                'total': self.memory_total,
+                'used': used,
+                'free': self.memory_total - used,
+                'swapTotal': 4 << 30,
+                'swapUsed': 0,
+                'percentage': self.memory * 100
+            },
+            'disk': {
+                'drives': drives,
+                'io': {
+                    'readBytes_sec': sum(d['readBytes_sec'] for d in devices),
+                    'writeBytes_sec': sum(d['writeBytes_sec'] for d in devices),
+                    'devices': devices
+                }
+            },
+            'network': {
+                'stats': stats,
+                'totalRx': sum(s['rx_sec'] for s in stats),
+                'totalTx': sum(s['tx_sec'] for s in stats)
+            },
+            'temperatures': {'cpu': int(40 + usage / 3), 'max': int(45 + usage / 3)},
+            'processes': {
+                'total': 200 + self.processes,
+                'running': rnd.randrange(1, 8),
+                'topByCPU': top,
+                'topByMemory': top[::-1]
+            }
+        }
+        if self.samples == 0:
+            metrics['network']['interfaces'] = [{
+                'name': f'eth{i}',
+                'ip4': f'10.0.{i}.{rnd.randrange(2, 254)}',
+                'mac': '02:00:00:00:00:%02x' % i,
+                'speed': 10000,
+                'mtu': 1500,
+                'isup': True
+            } for i in range(self.interfaces)]
+        self.samples += 1
+        return metrics
@@ -0,0 +1,302 @@
+"""
+Benchmark Runner
+Times collectors, payload encoding and transmission and writes the results as JSON
+"""
+
+import argparse
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Any
+
+import psutil
+
+from servwatch_agent.bench.fixtures import fake_interfaces, fake_proc
+from servwatch_agent.bench.server import StandInServer
+from servwatch_agent.collectors.diskstats import DiskStatsSampler
+from servwatch_agent.collectors.pressure import PressureCollector
+from servwatch_agent.collectors.processes import ProcessScanner
+from servwatch_agent.collectors.system import SystemCollector
+from servwatch_agent.transmitters.binary import encode_frame
+from servwatch_agent.transmitters.delta import DeltaEncoder
+from servwatch_agent.transmitters.websocket import WSTransmitter
+
+# Format version of the results document
+RESULTS_VERSION = 1
+
+PROCESS_COUNTS = (1000, 10000, 50000)
+QUICK_PROCESS_COUNTS = (1000, 10000)
+INTERFACE_COUNTS = (10, 500)
+
+# Transmitter option sets benchmarked against the stand-in server
+TRANSMIT_MODES = {
+    'json': {},
+    'delta': {'deltaEncoding': True},
+    'batch': {'batching': True, 'batchMaxCount': 50},
+    'binary': {'binaryFormat': True}
+}
+
+
+class BenchmarkSuite:
+    """
+    Runs the benchmarks and collects their results.
+
+    Every result is a dictionary with a dotted 'name', a 'unit' and a
+    'value'; timing results also carry the iteration count and the mean,
+    p95, min and max of the per-iteration times. The value of a timing is
+    its median, so results from different runs can be compared by name.
+    """
+
+    def __init__(self, iterations: int = 20, quick: bool = False, only: Optional[List[str]] = None):
+        """
+        Initialize the suite.
+
+        Args:
+            iterations: Timed iterations per collector benchmark
+            quick: Skip the slowest fixtures (50k processes) and shorten transmit runs
+            only: Run only benchmarks whose name starts with one of these prefixes
+        """
+        self.iterations = iterations
+        self.quick = quick
+        self.only = only or []
+        self.results: List[Dict[str, Any]] = []
+
+    def _selected(self, name: str) -> bool:
+        return not self.only or any(name.startswith(p) or p.startswith(name) for p in self.only)
+
+    def add(self, name: str, unit: str, value: float, **extra):
+        """Record a result"""
+        if self.only and not any(name.startswith(p) for p in self.only):
+            return
+        self.results.append({'name': name, 'unit': unit, 'value': value, **extra})
+        print(f"{name:<40} {value:>14.3f} {unit}", file=sys.stderr)
+
+    def time(self, name: str, func: Callable[[], Any], iterations: Optional[int] = None, warmup: int = 2):
+        """
+        Time a function.
+
+        Args:
+            name: Result name
+            func: Function to call once per iteration
+            iterations: Timed iterations (defaults to the suite's)
+            warmup: Untimed calls first, which also prime rate-based collectors
+        """
+        if not self._selected(name):
+            return
+        iterations = iterations or self.iterations
+        for _ in range(warmup):
+            func()
+        times = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            func()
+            times.append((time.perf_counter() - start) * 1000)
+        times.sort()
+        self.add(
+            name, 'ms', statistics.median(times),
+            iterations=iterations,
+            mean=statistics.fmean(times) if hasattr(statistics, 'fmean') else statistics.mean(times),
+            p95=times[min(len(times) - 1, int(len(times) * 0.95))],
+            min=times[0],
+            max=times[-1]
+        )
+
+    def run(self):
+        """Run every benchmark"""
+        self.bench_collectors()
+        self.bench_processes()
+        self.bench_network()
+        self.bench_proc_fixtures()
+        self.bench_payload()
+        self.bench_transmit()
+
+    def bench_collectors(self):
+        """Latency of each SystemCollector section on this host"""
+        if not self._selected('collector.'):
+            return
+        collector = SystemCollector(enable_gpu=True)
+        for name, func in collector.get_section_collectors().items():
+            self.time(f'collector.{name}', func)
+        self.time('collector.collect_all', collector.collect_all)
+
+    def bench_processes(self):
+        """Process scan latency on synthetic process tables"""
+        counts = QUICK_PROCESS_COUNTS if self.quick else PROCESS_COUNTS
+        for count in counts:
+            name = f'processes.scan.{count}'
+            if not self._selected(name):
+                continue
+            with fake_proc(count) as proc:
+                scanner = ProcessScanner(proc_root=proc.root)
+                self.time(name, scanner.scan, iterations=max(3, self.iterations * 1000 // count))
+
+    def bench_network(self):
+        """Network collection latency with synthetic interfaces"""
+        for count in INTERFACE_COUNTS:
+            name = f'network.collect.{count}'
+            if not self._selected(name):
+                continue
+            with fake_interfaces(count):
+                collector = SystemCollector(enable_gpu=False)
+                self.time(name, collector.collect_network)
+
+    def bench_proc_fixtures(self):
+        """Collectors that read small /proc files, on a synthetic tree"""
+        if not (self._selected('diskstats.') or self._selected('pressure.')):
+            return
+        with fake_proc(0, num_disks=64) as proc:
+            disks = DiskStatsSampler(include_partitions=True, proc_root=proc.root, sys_block=proc.sys_block)
+            self.time('diskstats.sample.192', disks.sample)
+            pressure = PressureCollector(proc_root=proc.root)
+            self.time('pressure.collect', pressure.collect)
+
+    def _sample_payloads(self, count: int = 1) -> List[Dict[str, Any]]:
+        """Consecutive full payloads collected on this host, after a priming collection"""
+        collector = SystemCollector(enable_gpu=False)
+        collector.collect_all()
+        return [collector.collect_all() for _ in range(count)]
+
+    def bench_payload(self):
+        """Payload size in each wire format, and encoding cost"""
+        if not self._selected('payload.'):
+            return
+        metrics, following = self._sample_payloads(2)
+
+        self.add('payload.json.bytes', 'bytes', len(json.dumps(metrics, default=str).encode('utf-8')))
+
+        encoder = DeltaEncoder(keyframe_interval=30)
+        _, key_id, _ = encoder.encode(metrics)
+        encoder.acknowledge(key_id)
+        _, _, diff = encoder.encode(following)
+        self.add('payload.delta.bytes', 'bytes', len(json.dumps(diff, default=str).encode('utf-8')))
+
+        self.add('payload.binary.bytes', 'bytes', len(encode_frame(metrics)))
+
+        self.time('payload.json.encode', lambda: json.dumps(metrics, default=str))
+        self.time('payload.binary.encode', lambda: encode_frame(metrics))
+
+    def bench_transmit(self):
+        """Serialize-plus-emit throughput through WSTransmitter against the stand-in server"""
+        if not self._selected('transmit.'):
+            return
+        server = StandInServer()
+        server.start()
+        metrics = self._sample_payloads()[0]
+        count = 200 if self.quick else 1000
+        try:
+            for mode, options in TRANSMIT_MODES.items():
+                name = f'transmit.{mode}'
+                if not self._selected(name):
+                    continue
+                transmitter = WSTransmitter(server.url, f'bench-{mode}', {
+                    'reconnection': False, 'batchLinger': 50, **options
+                })
+                transmitter.connect()
+                deadline = time.monotonic() + 10
+                while not transmitter.is_connected() and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                time.sleep(0.2)  # Let the registration reply arrive
+                server.reset()
+
+                start = time.perf_counter()
+                for i in range(count):
+                    transmitter.transmit(dict(metrics, timestamp=metrics['timestamp'] + i * 1000))
+                received = server.wait_for_samples(count, timeout=30)
+                elapsed = time.perf_counter() - start
+                transmitter.disconnect()
+
+                if received:
+                    self.add(name, 'samples/s', count / elapsed, samples=count)
+                else:
+                    print(f"{name}: only {server.samples} of {count} samples arrived", file=sys.stderr)
+        finally:
+            server.stop()
+
+    def document(self) -> Dict[str, Any]:
+        """The machine-readable results document"""
+        return {
+            'version': RESULTS_VERSION,
+            'timestamp': int(time.time() * 1000),
+            'host': {
+                'platform': platform.platform(),
+                'python': platform.python_version(),
+                'cpus': psutil.cpu_count(),
+                'psutil': psutil.__version__
+            },
+            'results': self.results
+        }
+
+
+# Units where a larger value is better
+_HIGHER_IS_BETTER = {'samples/s'}
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """
+    Compare two results documents.
+
+    Args:
+        baseline: Earlier results document
+        current: New results document
+        threshold: Relative change counted as a regression (0.2 = 20% worse)
+
+    Returns:
+        One entry per benchmark present in both, with the change ratio and
+        whether it regressed
+    """
+    previous = {r['name']: r for r in baseline.get('results', [])}
+    rows = []
+    for result in current.get('results', []):
+        before = previous.get(result['name'])
+        if before is None or not before['value']:
+            continue
+        ratio = result['value'] / before['value']
+        worse = ratio < 1 - threshold if result['unit'] in _HIGHER_IS_BETTER else ratio > 1 + threshold
+        rows.append({
+            'name': result['name'],
+            'unit': result['unit'],
+            'baseline': before['value'],
+            'value': result['value'],
+            'ratio': ratio,
+            'regression': worse
+        })
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='ServWatch agent benchmarks')
+    parser.add_argument('--output', '-o', help='Write the results JSON to this file (default: stdout)')
+    parser.add_argument('--compare', help='Baseline results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Relative slowdown reported as a regression (default: 0.2)')
+    parser.add_argument('--iterations', '-n', type=int, default=20, help='Iterations per timing')
+    parser.add_argument('--quick', action='store_true', help='Skip the slowest fixtures')
+    parser.add_argument('--only', action='append', help='Run only benchmarks with this name prefix')
+    args = parser.parse_args(argv)
+
+    # Keep per-connection and per-request logging out of the timings
+    logging.getLogger().setLevel(logging.WARNING)
+    suite = BenchmarkSuite(iterations=args.iterations, quick=args.quick, only=args.only)
+    suite.run()
+    document = suite.document()
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            document['comparison'] = compare(json.load(f), document, args.threshold)
+
+    output = json.dumps(document, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    regressions = [row for row in document.get('comparison', []) if row['regression']]
+    for row in regressions:
+        print(f"REGRESSION {row['name']}: {row['baseline']:.3f} -> {row['value']:.3f} {row['unit']}",
+              file=sys.stderr)
+    return 1 if regressions else 0
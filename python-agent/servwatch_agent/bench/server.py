@@ -0,0 +1,305 @@
+"""
+Stand-in Server
+Minimal Socket.IO server that accepts agent traffic and counts it, for benchmarks and load tests
+"""
+
+import asyncio
+import json
+import socketserver
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Any
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+import socketio
+from engineio.payload import Payload
+
+from servwatch_agent.transmitters.binary import FrameError, decode_frame
+
+# Events carrying metrics samples
+METRIC_EVENTS = ('metrics:data', 'metrics:delta', 'metrics:batch', 'metrics:binary')
+
+# Other events an agent sends after registering
+AGENT_EVENTS = ('alert:event',)
+
+# HTTP routes next to the Socket.IO endpoint, for reading the counters from another process
+STATS_PATH = '/standin/stats'
+RESET_PATH = '/standin/reset'
+
+# Latencies kept for the percentiles; later samples are counted but not kept
+MAX_LATENCIES = 1_000_000
+
+
+class _ThreadingWSGIServer(socketserver.ThreadingMixIn, WSGIServer):
+    """WSGI server handling each request in its own thread, so long-polls don't block"""
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class StandInServer:
+    """
+    Socket.IO server implementing the agent side of the backend protocol.
+
+    Answers agent:register with agent:registered (accepting the newest binary
+    schema the agent offers), acknowledges every metrics event and counts
+    events, samples per agent and registrations. Sample latency is the time
+    from the sample's timestamp to its arrival, so it is only meaningful for
+    agents on the same clock. The server runs from a daemon thread so a
+    synchronous caller can start it, drive agents against it and read the
+    counters.
+
+    In 'threading' mode (WSGI, no extra dependencies) agents can only use
+    the polling transport, and every pending long-poll holds a thread. The
+    'aiohttp' mode serves the websocket transport from one event loop and
+    scales to thousands of agents, but its polling transport may truncate
+    large request bodies, so use it with websocket clients.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, async_mode: str = 'threading'):
+        """
+        Initialize the server.
+
+        Args:
+            host: Interface to listen on
+            port: Port to listen on (0 picks a free port)
+            async_mode: 'threading' or 'aiohttp'
+        """
+        self.host = host
+        self.port = port
+        self.async_mode = async_mode
+        self.agents: Dict[str, str] = {}  # sid -> agent id
+        self.events: Dict[str, int] = {}
+        self.samples = 0
+        self.per_agent: Dict[str, int] = {}
+        self.registrations = 0
+        self.peak_agents = 0
+        self.decode_errors = 0
+        self.latencies = array('d')
+        self.first_event: Optional[float] = None
+        self.last_event: Optional[float] = None
+
+        self._lock = threading.Lock()
+        self._httpd: Optional[WSGIServer] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner = None
+        self._thread: Optional[threading.Thread] = None
+
+        # A polling client packs every queued message into one request, far
+        # more than engineio's default cap of 16 packets per payload
+        Payload.max_decode_packets = max(Payload.max_decode_packets, 4096)
+        if async_mode == 'aiohttp':
+            self.sio = socketio.AsyncServer(async_mode='aiohttp', max_http_buffer_size=64 * 1024 * 1024)
+            self.sio.on('agent:register', self._on_register_async)
+        elif async_mode == 'threading':
+            self.sio = socketio.Server(async_mode='threading', max_http_buffer_size=64 * 1024 * 1024)
+            self.app = socketio.WSGIApp(self.sio, wsgi_app=self._wsgi_routes)
+            self.sio.on('agent:register', self._on_register)
+        else:
+            raise ValueError(f"Unknown async mode: {async_mode}")
+        self.sio.on('disconnect', self._on_disconnect)
+        for event in METRIC_EVENTS + AGENT_EVENTS:
+            self.sio.on(event, self._make_handler(event))
+
+    @property
+    def url(self) -> str:
+        """URL agents connect to"""
+        return f'http://{self.host}:{self.port}'
+
+    def _register(self, sid: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Record a registration and build the agent:registered reply"""
+        with self._lock:
+            self.agents[sid] = data.get('agentId', sid)
+            self.registrations += 1
+            self.peak_agents = max(self.peak_agents, len(self.agents))
+        reply = {'agentId': data.get('agentId')}
+        if data.get('binarySchemas'):
+            reply['binarySchema'] = max(data['binarySchemas'])
+        return reply
+
+    def _on_register(self, sid: str, data: Dict[str, Any]):
+        self.sio.emit('agent:registered', self._register(sid, data), to=sid)
+
+    async def _on_register_async(self, sid: str, data: Dict[str, Any]):
+        await self.sio.emit('agent:registered', self._register(sid, data), to=sid)
+
+    def _on_disconnect(self, sid: str, *args):
+        with self._lock:
+            self.agents.pop(sid, None)
+
+    def _timestamps(self, event: str, data: Dict[str, Any]) -> List[Any]:
+        """Sample timestamps (ms) carried by a metrics event"""
+        if event == 'metrics:batch':
+            return [sample.get('timestamp') for sample in data.get('samples', ())]
+        if event == 'metrics:delta':
+            diff = data.get('diff')
+            return [diff.get('timestamp') if isinstance(diff, dict) else None]
+        if event == 'metrics:binary':
+            try:
+                return [decode_frame(data['frame']).get('timestamp')]
+            except (FrameError, KeyError, TypeError):
+                self.decode_errors += 1
+                return [None]
+        return [data.get('timestamp')]
+
+    def _make_handler(self, event: str):
+        counted = event in METRIC_EVENTS
+
+        def handler(sid: str, data: Any):
+            now = time.monotonic()
+            received = time.time() * 1000
+            timestamps = self._timestamps(event, data) if counted and isinstance(data, dict) else []
+            with self._lock:
+                self.events[event] = self.events.get(event, 0) + 1
+                if counted:
+                    count = len(timestamps) or 1
+                    self.samples += count
+                    agent_id = data.get('agentId') if isinstance(data, dict) else None
+                    agent_id = agent_id or self.agents.get(sid, sid)
+                    self.per_agent[agent_id] = self.per_agent.get(agent_id, 0) + count
+                    for timestamp in timestamps:
+                        # Unchanged timestamps are left out of delta frames
+                        if isinstance(timestamp, (int, float)) and len(self.latencies) < MAX_LATENCIES:
+                            self.latencies.append(max(0.0, received - timestamp))
+                if self.first_event is None:
+                    self.first_event = now
+                self.last_event = now
+            return True
+        return handler
+
+    def _wsgi_routes(self, environ, start_response):
+        """WSGI app for the paths Socket.IO does not handle"""
+        status, body = self._route(environ.get('PATH_INFO', ''))
+        start_response(status, [('Content-Type', 'application/json'), ('Content-Length', str(len(body)))])
+        return [body]
+
+    def _route(self, path: str):
+        if path == STATS_PATH:
+            return '200 OK', json.dumps(self.stats()).encode('utf-8')
+        if path == RESET_PATH:
+            self.reset()
+            return '200 OK', b'{}'
+        return '404 Not Found', b'{"error": "Not found"}'
+
+    def start(self):
+        """Start serving in a background thread"""
+        if self.async_mode == 'aiohttp':
+            self._start_aiohttp()
+            return
+        self._httpd = make_server(self.host, self.port, self.app,
+                                  server_class=_ThreadingWSGIServer, handler_class=_QuietHandler)
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='stand-in-server', daemon=True)
+        self._thread.start()
+
+    def _start_aiohttp(self):
+        from aiohttp import web
+
+        async def route(request):
+            status, body = self._route(request.path)
+            return web.Response(status=int(status.split()[0]), body=body, content_type='application/json')
+
+        app = web.Application()
+        self.sio.attach(app)
+        app.router.add_get(STATS_PATH, route)
+        app.router.add_get(RESET_PATH, route)
+
+        self._loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        async def serve():
+            self._runner = web.AppRunner(app, access_log=None)
+            await self._runner.setup()
+            site = web.TCPSite(self._runner, self.host, self.port, backlog=4096)
+            await site.start()
+            self.port = site._server.sockets[0].getsockname()[1]
+            started.set()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(serve())
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name='stand-in-server', daemon=True)
+        self._thread.start()
+        started.wait(timeout=10)
+
+    def stop(self):
+        """Stop the server"""
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+        if self._loop is not None:
+            if self._runner is not None:
+                asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(timeout=5)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def reset(self):
+        """Reset the counters"""
+        with self._lock:
+            self.events = {}
+            self.samples = 0
+            self.per_agent = {}
+            self.registrations = 0
+            self.peak_agents = len(self.agents)
+            self.decode_errors = 0
+            self.latencies = array('d')
+            self.first_event = None
+            self.last_event = None
+
+    def wait_for_samples(self, count: int, timeout: float = 30.0) -> bool:
+        """
+        Wait until at least count samples were received.
+
+        Returns:
+            True if the count was reached before the timeout
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.samples >= count:
+                return True
+            time.sleep(0.005)
+        return self.samples >= count
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get a snapshot of the counters.
+
+        Returns:
+            Dictionary with connected and peak agents, registrations, event
+            and sample counts, samples per agent, the receive rate over the
+            span from first to last event, and latency percentiles in ms
+        """
+        with self._lock:
+            latencies = sorted(self.latencies)
+            span = (self.last_event - self.first_event) if self.first_event is not None else 0.0
+            stats = {
+                'agents': len(self.agents),
+                'peakAgents': self.peak_agents,
+                'registrations': self.registrations,
+                'events': dict(self.events),
+                'samples': self.samples,
+                'perAgent': dict(self.per_agent),
+                'samplesPerSecond': self.samples / span if span > 0 else 0.0,
+                'decodeErrors': self.decode_errors
+            }
+        if latencies:
+            stats['latency'] = {
+                'p50': _percentile(latencies, 0.50),
+                'p95': _percentile(latencies, 0.95),
+                'p99': _percentile(latencies, 0.99),
+                'max': latencies[-1],
+                'count': len(latencies)
+            }
+        return stats
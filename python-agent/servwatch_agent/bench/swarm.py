@@ -0,0 +1,340 @@
+"""
+Agent Swarm
+Load generator running many simulated agents through AsyncWSTransmitter in one asyncio process
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import random
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List, Optional, Any
+
+from servwatch_agent.bench.fixtures import SyntheticHost
+from servwatch_agent.bench.server import RESET_PATH, STATS_PATH, StandInServer
+from servwatch_agent.transmitters.async_websocket import AsyncWSTransmitter
+
+# Transmitter options of each wire encoding
+ENCODINGS = {
+    'json': {},
+    'delta': {'deltaEncoding': True},
+    'batch': {'batching': True},
+    'binary': {'binaryFormat': True}
+}
+
+
+def fetch_server_stats(url: str, path: str = STATS_PATH, timeout: float = 10.0) -> Optional[Dict[str, Any]]:
+    """
+    Read the counters of a stand-in server.
+
+    Args:
+        url: Server URL
+        path: STATS_PATH, or RESET_PATH to reset the counters
+        timeout: Request timeout in seconds
+
+    Returns:
+        Counters, or None if the server is not a stand-in server
+    """
+    try:
+        with urllib.request.urlopen(url.rstrip('/') + path, timeout=timeout) as response:
+            return json.loads(response.read())
+    except (urllib.error.URLError, OSError, ValueError):
+        return None
+
+
+class Swarm:
+    """
+    Many simulated agents in one process.
+
+    Every agent is an AsyncWSTransmitter, so registration, encoding,
+    batching, buffering and replay are the agent's own code; only the
+    collectors are replaced by a SyntheticHost. Agents connect spread over
+    the ramp-up time and then transmit at `rate` samples per second with a
+    random phase. Every `storm_every` seconds a `storm_fraction` of the
+    agents disconnects and reconnects at once, buffering samples meanwhile.
+    """
+
+    def __init__(self, url: str, agents: int = 100, rate: float = 1.0, duration: float = 30.0,
+                 ramp: float = 5.0, encoding: str = 'json', options: Optional[Dict[str, Any]] = None,
+                 host_shape: Optional[Dict[str, int]] = None, storm_every: float = 0.0,
+                 storm_fraction: float = 0.2, seed: int = 0):
+        """
+        Initialize the swarm.
+
+        Args:
+            url: Server URL
+            agents: Number of simulated agents
+            rate: Samples per second per agent
+            duration: Seconds of sending after the ramp-up
+            ramp: Seconds over which agents connect
+            encoding: Key of ENCODINGS
+            options: Extra transmitter options
+            host_shape: SyntheticHost keyword arguments (cores, disks, interfaces, processes)
+            storm_every: Seconds between reconnect storms (0 = none)
+            storm_fraction: Share of agents reconnecting in each storm
+            seed: Random seed
+        """
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown encoding: {encoding}")
+        self.url = url
+        self.agents = agents
+        self.rate = rate
+        self.duration = duration
+        self.ramp = ramp
+        self.encoding = encoding
+        self.options = {'transports': ['websocket'], **ENCODINGS[encoding], **(options or {})}
+        self.host_shape = host_shape or {}
+        self.storm_every = storm_every
+        self.storm_fraction = storm_fraction
+        self.random = random.Random(seed)
+
+        self.transmitters: List[AsyncWSTransmitter] = []
+        self.sent: Dict[str, int] = {}
+        self.storms = 0
+        self.payload_bytes = 0
+
+    async def _run_agent(self, index: int, transmitter: AsyncWSTransmitter, stop_at: float):
+        """Connect one agent after its ramp-up delay, then transmit until stop_at"""
+        loop = asyncio.get_running_loop()
+        await asyncio.sleep(self.ramp * index / max(1, self.agents))
+        await transmitter.connect()
+
+        host = SyntheticHost(seed=index, **self.host_shape)
+        interval = 1.0 / self.rate
+        deadline = loop.time() + self.random.uniform(0, interval)
+        while True:
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+            if loop.time() >= stop_at:
+                return
+            await transmitter.transmit(host.sample())
+            self.sent[transmitter.agent_id] += 1
+            deadline += interval
+
+    async def _reconnect(self, transmitter: AsyncWSTransmitter):
+        await transmitter.disconnect()
+        transmitter.should_stop = False
+        await transmitter.connect()
+
+    async def _storm_loop(self, stop_at: float):
+        """Reconnect a share of the agents all at once, every storm_every seconds"""
+        loop = asyncio.get_running_loop()
+        while loop.time() + self.storm_every < stop_at:
+            await asyncio.sleep(self.storm_every)
+            connected = [t for t in self.transmitters if t.connected]
+            victims = self.random.sample(connected, int(len(connected) * self.storm_fraction))
+            await asyncio.gather(*(self._reconnect(t) for t in victims), return_exceptions=True)
+            self.storms += 1
+
+    async def _drain(self, timeout: float = 30.0):
+        """Replay what the agents still buffer, then wait until the server count settles"""
+        await asyncio.gather(*(t.flush_buffer() for t in self.transmitters if t.connected),
+                             return_exceptions=True)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        expected = sum(self.sent.values())
+        last = None
+        while loop.time() < deadline:
+            stats = await loop.run_in_executor(None, fetch_server_stats, self.url)
+            if stats is None:
+                await asyncio.sleep(1.0)  # Not a stand-in server, give in-flight frames a moment
+                return
+            if stats['samples'] >= expected or stats['samples'] == last:
+                return
+            last = stats['samples']
+            await asyncio.sleep(0.5)
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Run the swarm.
+
+        Returns:
+            Report with the swarm settings, client-side counters and, for a
+            stand-in server, its counters with drops per agent resolved
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, fetch_server_stats, self.url, RESET_PATH)
+
+        self.payload_bytes = len(json.dumps(SyntheticHost(**self.host_shape).sample()).encode('utf-8'))
+        self.transmitters = [
+            AsyncWSTransmitter(self.url, f'swarm-{i:05d}', dict(self.options))
+            for i in range(self.agents)
+        ]
+        self.sent = {t.agent_id: 0 for t in self.transmitters}
+
+        started = loop.time()
+        stop_at = started + self.ramp + self.duration
+        tasks = [
+            asyncio.ensure_future(self._run_agent(i, t, stop_at))
+            for i, t in enumerate(self.transmitters)
+        ]
+        if self.storm_every > 0:
+            tasks.append(asyncio.ensure_future(self._storm_loop(stop_at)))
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        errors = [r for r in results if isinstance(r, Exception)]
+        elapsed = loop.time() - started
+
+        await self._drain()
+        server = await loop.run_in_executor(None, fetch_server_stats, self.url)
+        client_stats = [t.get_stats() for t in self.transmitters]
+        await asyncio.gather(*(t.disconnect() for t in self.transmitters), return_exceptions=True)
+
+        sent = sum(self.sent.values())
+        report = {
+            'settings': {
+                'url': self.url,
+                'agents': self.agents,
+                'rate': self.rate,
+                'duration': self.duration,
+                'ramp': self.ramp,
+                'encoding': self.encoding,
+                'stormEvery': self.storm_every,
+                'stormFraction': self.storm_fraction,
+                'payloadBytes': self.payload_bytes
+            },
+            'client': {
+                'elapsed': elapsed,
+                'sent': sent,
+                'samplesPerSecond': sent / elapsed if elapsed > 0 else 0.0,
+                'connected': sum(1 for s in client_stats if s['connected']),
+                'reconnects': sum(s['reconnects'] for s in client_stats),
+                'storms': self.storms,
+                'emitErrors': sum(s['emitErrors'] for s in client_stats),
+                'dropped': sum(s['dropped'] for s in client_stats),
+                'buffered': sum(s['bufferSize'] for s in client_stats),
+                'agentErrors': len(errors)
+            }
+        }
+        if server is not None:
+            received = server.pop('perAgent')
+            server['missing'] = sum(max(0, count - received.get(agent_id, 0)) for agent_id, count in self.sent.items())
+            server['duplicates'] = sum(max(0, received.get(agent_id, 0) - count) for agent_id, count in self.sent.items())
+            report['server'] = server
+        return report
+
+
+def _serve_child(host: str, port: int, async_mode: str, ready):
+    """Process entry point: run a stand-in server until the parent exits"""
+    server = StandInServer(host, port, async_mode=async_mode)
+    server.start()
+    ready.put(server.port)
+    while True:
+        time.sleep(3600)
+
+
+def spawn_server(host: str = '127.0.0.1', port: int = 0, async_mode: str = 'aiohttp'):
+    """
+    Start a stand-in server in a child process, so it does not share the GIL with the swarm.
+
+    Returns:
+        (process, url)
+    """
+    context = multiprocessing.get_context('spawn')
+    ready = context.Queue()
+    process = context.Process(target=_serve_child, args=(host, port, async_mode, ready), daemon=True)
+    process.start()
+    return process, f'http://{host}:{ready.get(timeout=30)}'
+
+
+def _serve(args) -> int:
+    """Run a stand-in server in the foreground, printing its counters periodically"""
+    server = StandInServer(args.host, args.port, async_mode=args.server_mode)
+    server.start()
+    print(f"Stand-in server listening on {server.url} (stats: {server.url}{STATS_PATH})", file=sys.stderr)
+    try:
+        while True:
+            time.sleep(args.report_every)
+            stats = server.stats()
+            latency = stats.get('latency', {})
+            print(f"agents={stats['agents']} samples={stats['samples']} "
+                  f"rate={stats['samplesPerSecond']:.0f}/s p99={latency.get('p99', 0):.1f}ms", file=sys.stderr)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='ServWatch agent swarm load generator')
+    parser.add_argument('--url', help='Server to load (default: a stand-in server in a child process)')
+    parser.add_argument('--agents', '-a', type=int, default=100, help='Simulated agents (default: 100)')
+    parser.add_argument('--rate', '-r', type=float, default=1.0, help='Samples per second per agent (default: 1)')
+    parser.add_argument('--duration', '-d', type=float, default=30.0,
+                        help='Seconds of sending after the ramp-up (default: 30)')
+    parser.add_argument('--ramp', type=float, default=5.0, help='Seconds over which agents connect (default: 5)')
+    parser.add_argument('--encoding', choices=sorted(ENCODINGS), default='json', help='Wire encoding')
+    parser.add_argument('--acknowledged', action='store_true', help='Use acknowledged delivery')
+    parser.add_argument('--polling', action='store_true', help='Use the polling transport instead of websocket')
+    parser.add_argument('--cores', type=int, default=8, help='CPU cores per synthetic host')
+    parser.add_argument('--disks', type=int, default=2, help='Disks per synthetic host')
+    parser.add_argument('--interfaces', type=int, default=2, help='Network interfaces per synthetic host')
+    parser.add_argument('--processes', type=int, default=10, help='Entries in each top process list')
+    parser.add_argument('--storm-every', type=float, default=0.0,
+                        help='Seconds between reconnect storms (default: none)')
+    parser.add_argument('--storm-fraction', type=float, default=0.2,
+                        help='Share of agents reconnecting per storm (default: 0.2)')
+    parser.add_argument('--output', '-o', help='Write the report JSON to this file (default: stdout)')
+    parser.add_argument('--serve', action='store_true', help='Only run a stand-in server in the foreground')
+    parser.add_argument('--host', default='127.0.0.1', help='Stand-in server interface')
+    parser.add_argument('--port', type=int, default=0, help='Stand-in server port (default: any free port)')
+    parser.add_argument('--server-mode', choices=('aiohttp', 'threading'), default='aiohttp',
+                        help='Stand-in server implementation (default: aiohttp)')
+    parser.add_argument('--report-every', type=float, default=5.0, help='Seconds between --serve reports')
+    args = parser.parse_args(argv)
+
+    # Per-agent connection and buffering logs would drown the report
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('servwatch_agent.transmitters').setLevel(logging.ERROR)
+
+    if args.serve:
+        return _serve(args)
+
+    process = None
+    url = args.url
+    if url is None:
+        process, url = spawn_server(args.host, args.port, args.server_mode)
+
+    options = {'acknowledged': args.acknowledged}
+    if args.polling:
+        options['transports'] = ['polling']
+    swarm = Swarm(
+        url,
+        agents=args.agents,
+        rate=args.rate,
+        duration=args.duration,
+        ramp=args.ramp,
+        encoding=args.encoding,
+        options=options,
+        host_shape={'cores': args.cores, 'disks': args.disks, 'interfaces': args.interfaces,
+                    'processes': args.processes},
+        storm_every=args.storm_every,
+        storm_fraction=args.storm_fraction
+    )
+    try:
+        report = asyncio.run(swarm.run())
+    finally:
+        if process is not None:
+            process.terminate()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    server = report.get('server')
+    if server and server['missing']:
+        print(f"{server['missing']} of {report['client']['sent']} samples did not arrive", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
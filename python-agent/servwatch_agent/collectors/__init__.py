@@ -2,6 +2,18 @@
 Metrics Collectors
 """
 
+from servwatch_agent.collectors.cgroups import CgroupCollector
+from servwatch_agent.collectors.cpu import CPUSampler
+from servwatch_agent.collectors.diskstats import DiskStatsSampler
+from servwatch_agent.collectors.gpu import GPUEngine
+from servwatch_agent.collectors.highres import HighResSampler
+from servwatch_agent.collectors.interfaces import InterfaceInventory
+from servwatch_agent.collectors.mounts import MountTable
+from servwatch_agent.collectors.pressure import PressureCollector
+from servwatch_agent.collectors.processes import ProcessScanner
 from servwatch_agent.collectors.system import SystemCollector
 
-__all__ = ['SystemCollector']
+__all__ = [
+    'CgroupCollector', 'CPUSampler', 'DiskStatsSampler', 'GPUEngine', 'HighResSampler',
+    'InterfaceInventory', 'MountTable', 'PressureCollector', 'ProcessScanner', 'SystemCollector'
+]
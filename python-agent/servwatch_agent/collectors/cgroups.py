@@ -0,0 +1,263 @@
+"""
+Cgroup v2 Collector
+Collects per-container CPU, memory, IO and pid metrics from the unified cgroup hierarchy
+"""
+
+import logging
+import os
+import time
+from typing import Callable, Dict, List, Optional, Any
+
+from servwatch_agent.collectors.pressure import read_pressure
+
+logger = logging.getLogger(__name__)
+
+
+class CgroupCollector:
+    """
+    Collects resource usage per cgroup from a cgroup v2 hierarchy.
+
+    The directory tree is kept in a cached index that is refreshed at most once
+    per rescan interval, and only directories whose mtime changed (a child
+    cgroup was created or removed) are listed again. Each tick reads cpu.stat
+    for every indexed cgroup, ranks them by CPU usage and reads the remaining
+    files only for the top max_cgroups entries.
+    """
+
+    def __init__(self, root: str = '/sys/fs/cgroup', max_cgroups: int = 50,
+                 rescan_interval: float = 30.0,
+                 on_error: Optional[Callable[[str], None]] = None):
+        """
+        Initialize the cgroup collector.
+
+        Args:
+            root: Mount point of the cgroup v2 hierarchy
+            max_cgroups: Maximum number of cgroups reported per tick
+            rescan_interval: Seconds between directory index refreshes
+            on_error: Optional callback told 'cgroups' on every failed collection
+        """
+        self.on_error = on_error
+        self.root = root.rstrip('/') or '/'
+        self.max_cgroups = max_cgroups
+        self.rescan_interval = rescan_interval
+        self.available = os.path.isfile(os.path.join(self.root, 'cgroup.controllers'))
+
+        # Directory index: path -> (mtime_ns, child paths)
+        self._dirs: Dict[str, tuple] = {}
+        self._cgroups: List[str] = []
+        self._last_scan: Optional[float] = None
+
+        # Counter snapshots for rate calculation: path -> {counter: value}
+        self._last_counters: Dict[str, Dict[str, int]] = {}
+        self._last_time: Optional[float] = None
+
+        if not self.available:
+            logger.info(f"cgroup v2 hierarchy not found at {self.root}, cgroup monitoring disabled")
+
+    def collect(self) -> Dict[str, Any]:
+        """
+        Collect cgroup metrics.
+
+        Returns:
+            Dictionary with the number of indexed cgroups and the top cgroups
+            by CPU usage
+        """
+        if not self.available:
+            return {'count': 0, 'cgroups': []}
+
+        try:
+            now = time.monotonic()
+            if self._last_scan is None or now - self._last_scan >= self.rescan_interval:
+                self._refresh_index()
+                self._last_scan = now
+
+            elapsed = now - self._last_time if self._last_time is not None else 0
+            last_counters = self._last_counters
+            counters = {}
+            ranked = []
+
+            for path in self._cgroups:
+                cpu = self._read_flat_keyed(path, 'cpu.stat')
+                if cpu is None:
+                    continue
+                current = {
+                    'usage_usec': cpu.get('usage_usec', 0),
+                    'user_usec': cpu.get('user_usec', 0),
+                    'system_usec': cpu.get('system_usec', 0),
+                    'nr_throttled': cpu.get('nr_throttled', 0),
+                    'throttled_usec': cpu.get('throttled_usec', 0)
+                }
+                prev = last_counters.get(path)
+                usage = 0.0
+                if prev is not None and elapsed > 0:
+                    usage = max(0, current['usage_usec'] - prev['usage_usec']) / (elapsed * 1e4)
+                counters[path] = current
+                ranked.append((usage, path))
+
+            ranked.sort(reverse=True)
+            reported = []
+            for usage, path in ranked[:self.max_cgroups]:
+                reported.append(
+                    self._build_entry(path, usage, counters[path], last_counters.get(path), elapsed)
+                )
+
+            self._last_counters = counters
+            self._last_time = now
+
+            return {
+                'count': len(self._cgroups),
+                'cgroups': reported
+            }
+        except Exception as e:
+            logger.error(f"Error collecting cgroup metrics: {e}")
+            if self.on_error:
+                self.on_error('cgroups')
+            return {'count': 0, 'cgroups': []}
+
+    def _refresh_index(self):
+        """Walk the hierarchy, re-listing only directories that changed"""
+        dirs = {}
+        cgroups = []
+        stack = [self.root]
+
+        while stack:
+            path = stack.pop()
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue  # Cgroup was removed
+
+            cached = self._dirs.get(path)
+            if cached is not None and cached[0] == mtime:
+                children = cached[1]
+            else:
+                try:
+                    with os.scandir(path) as it:
+                        children = [e.path for e in it if e.is_dir(follow_symlinks=False)]
+                except OSError:
+                    continue
+
+            dirs[path] = (mtime, children)
+            if path != self.root:
+                cgroups.append(path)
+            stack.extend(children)
+
+        self._dirs = dirs
+        self._cgroups = cgroups
+        # Forget counters of cgroups that no longer exist
+        self._last_counters = {p: c for p, c in self._last_counters.items() if p in dirs}
+
+    def _build_entry(self, path: str, usage: float, current: Dict[str, int],
+                     prev: Optional[Dict[str, int]], elapsed: float) -> Dict[str, Any]:
+        """Read the remaining controller files for a reported cgroup"""
+        memory_stat = self._read_flat_keyed(path, 'memory.stat') or {}
+
+        # Extend the stored snapshot so the next tick can compute rates
+        current.update(self._read_io_stat(path))
+        current['pgfault'] = memory_stat.get('pgfault', 0)
+        current['pgmajfault'] = memory_stat.get('pgmajfault', 0)
+        pressure = {}
+        for resource in ('cpu', 'memory', 'io'):
+            values = read_pressure(os.path.join(path, f'{resource}.pressure'))
+            if values is not None:
+                pressure[resource] = values
+                for kind, fields in values.items():
+                    current[f'psi_{resource}_{kind}'] = fields.get('total', 0)
+
+        def rate(key):
+            if prev is None or elapsed <= 0 or key not in prev:
+                return 0.0
+            return max(0, current[key] - prev[key]) / elapsed
+
+        memory_max = self._read_value(path, 'memory.max')
+
+        return {
+            'name': path[len(self.root):] or '/',
+            'cpu': {
+                'usage': usage,
+                'user': rate('user_usec') / 1e4,
+                'system': rate('system_usec') / 1e4,
+                'throttledPeriods_sec': rate('nr_throttled'),
+                'throttled': rate('throttled_usec') / 1e4
+            },
+            'memory': {
+                'current': self._read_value(path, 'memory.current') or 0,
+                'max': memory_max,
+                'anon': memory_stat.get('anon', 0),
+                'file': memory_stat.get('file', 0),
+                'kernel': memory_stat.get('kernel', memory_stat.get('kernel_stack', 0)),
+                'shmem': memory_stat.get('shmem', 0),
+                'pgfault_sec': rate('pgfault'),
+                'pgmajfault_sec': rate('pgmajfault')
+            },
+            'io': {
+                'readBytes_sec': rate('rbytes'),
+                'writeBytes_sec': rate('wbytes'),
+                'readCount_sec': rate('rios'),
+                'writeCount_sec': rate('wios')
+            },
+            'pids': self._read_value(path, 'pids.current') or 0,
+            'pressure': {
+                resource: {
+                    kind: {
+                        'avg10': fields.get('avg10', 0.0),
+                        'avg60': fields.get('avg60', 0.0),
+                        'avg300': fields.get('avg300', 0.0),
+                        'stall': min(100.0, rate(f'psi_{resource}_{kind}') / 1e4)
+                    }
+                    for kind, fields in values.items()
+                }
+                for resource, values in pressure.items()
+            }
+        }
+
+    @staticmethod
+    def _read_flat_keyed(path: str, name: str) -> Optional[Dict[str, int]]:
+        """Read a flat-keyed cgroup file ('key value' per line)"""
+        try:
+            with open(os.path.join(path, name), 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        values = {}
+        for line in data.split(b'\n'):
+            parts = line.split()
+            if len(parts) == 2:
+                try:
+                    values[parts[0].decode()] = int(parts[1])
+                except ValueError:
+                    continue
+        return values
+
+    @staticmethod
+    def _read_value(path: str, name: str) -> Optional[int]:
+        """Read a single-value cgroup file, returning None for 'max' or missing files"""
+        try:
+            with open(os.path.join(path, name), 'rb') as f:
+                value = f.read().strip()
+        except OSError:
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _read_io_stat(path: str) -> Dict[str, int]:
+        """Read io.stat and sum the counters across devices"""
+        totals = {'rbytes': 0, 'wbytes': 0, 'rios': 0, 'wios': 0}
+        try:
+            with open(os.path.join(path, 'io.stat'), 'rb') as f:
+                data = f.read()
+        except OSError:
+            return totals
+        for line in data.split(b'\n'):
+            for field in line.split()[1:]:
+                key, _, value = field.partition(b'=')
+                key = key.decode()
+                if key in totals:
+                    try:
+                        totals[key] += int(value)
+                    except ValueError:
+                        continue
+        return totals
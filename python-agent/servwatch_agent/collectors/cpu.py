@@ -0,0 +1,155 @@
+"""
+CPU Usage Sampler
+Computes total and per-core CPU usage from /proc/stat deltas without blocking
+"""
+
+import os
+from typing import Dict, List, Optional, Any
+
+import psutil
+
+# Column order of the cpu lines in /proc/stat
+_FIELDS = ('user', 'nice', 'system', 'idle', 'iowait', 'irq', 'softirq', 'steal')
+
+# Fields reported in the usage breakdown (nice is folded into user)
+BREAKDOWN_FIELDS = ('user', 'system', 'iowait', 'irq', 'softirq', 'steal')
+
+
+class CPUSampler:
+    """
+    Stateful CPU sampler.
+
+    Each call to sample() reads /proc/stat once and computes usage from the
+    difference to the previous snapshot, so collection never sleeps. The first
+    call only primes the state and reports zero usage. Per-core counters are
+    matched to the previous snapshot by their cpuN id, as /proc/stat leaves
+    out offline CPUs and the list positions shift on hotplug. Falls back to
+    psutil's non-blocking cpu_percent() where /proc/stat is not available.
+    """
+
+    def __init__(self, proc_stat: str = '/proc/stat'):
+        """
+        Initialize the CPU sampler.
+
+        Args:
+            proc_stat: Path to the kernel CPU statistics file
+        """
+        self.proc_stat = proc_stat
+        self.use_proc = os.path.exists(proc_stat)
+        self._last_total: Optional[List[int]] = None
+        # cpuN id -> counters of the online cores in the previous snapshot
+        self._last_cores: Dict[bytes, List[int]] = {}
+
+        if not self.use_proc:
+            # Prime psutil so the next non-blocking call has a reference point
+            psutil.cpu_percent(interval=None, percpu=True)
+            psutil.cpu_times_percent(interval=None)
+
+    def sample(self) -> Dict[str, Any]:
+        """
+        Take one CPU sample.
+
+        Returns:
+            Dictionary with 'usage' (total %), 'perCore' (list of %) and
+            'breakdown' (per-state % of total time)
+        """
+        if self.use_proc:
+            try:
+                return self._sample_proc()
+            except (OSError, ValueError):
+                self.use_proc = False
+        return self._sample_psutil()
+
+    def _read_proc_stat(self):
+        """Read aggregate and per-core jiffy counters from /proc/stat, cores as (id, counters)"""
+        total = None
+        cores = []
+        with open(self.proc_stat, 'rb') as f:
+            for line in f:
+                if not line.startswith(b'cpu'):
+                    # cpu lines come first, stop at the first other line
+                    break
+                parts = line.split()
+                counters = [int(v) for v in parts[1:9]]
+                if len(counters) < len(_FIELDS):
+                    counters.extend([0] * (len(_FIELDS) - len(counters)))
+                if parts[0] == b'cpu':
+                    total = counters
+                else:
+                    cores.append((parts[0], counters))
+        if total is None:
+            raise ValueError('no aggregate cpu line in /proc/stat')
+        return total, cores
+
+    def _sample_proc(self) -> Dict[str, Any]:
+        """Compute usage from /proc/stat deltas"""
+        total, cores = self._read_proc_stat()
+        last_total, last_cores = self._last_total, self._last_cores
+        self._last_total, self._last_cores = total, dict(cores)
+
+        if last_total is None:
+            return {
+                'usage': 0.0,
+                'perCore': [0.0] * len(cores),
+                'breakdown': dict.fromkeys(BREAKDOWN_FIELDS, 0.0)
+            }
+
+        deltas = [max(0, c - p) for c, p in zip(total, last_total)]
+        elapsed = sum(deltas)
+        breakdown = dict.fromkeys(BREAKDOWN_FIELDS, 0.0)
+        usage = 0.0
+        if elapsed > 0:
+            busy = elapsed - deltas[3] - deltas[4]  # idle and iowait
+            usage = busy * 100.0 / elapsed
+            breakdown = {
+                'user': (deltas[0] + deltas[1]) * 100.0 / elapsed,
+                'system': deltas[2] * 100.0 / elapsed,
+                'iowait': deltas[4] * 100.0 / elapsed,
+                'irq': deltas[5] * 100.0 / elapsed,
+                'softirq': deltas[6] * 100.0 / elapsed,
+                'steal': deltas[7] * 100.0 / elapsed
+            }
+
+        per_core = []
+        for core, cur in cores:
+            prev = last_cores.get(core)
+            if prev is None:
+                # Core came online since the last sample
+                per_core.append(0.0)
+                continue
+            core_elapsed = 0
+            core_idle = 0
+            for j in range(len(_FIELDS)):
+                d = cur[j] - prev[j]
+                if d > 0:
+                    core_elapsed += d
+                    if j == 3 or j == 4:
+                        core_idle += d
+            per_core.append(
+                (core_elapsed - core_idle) * 100.0 / core_elapsed if core_elapsed > 0 else 0.0
+            )
+
+        return {
+            'usage': usage,
+            'perCore': per_core,
+            'breakdown': breakdown
+        }
+
+    def _sample_psutil(self) -> Dict[str, Any]:
+        """Compute usage with psutil's non-blocking counters"""
+        per_core = psutil.cpu_percent(interval=None, percpu=True)
+        times = psutil.cpu_times_percent(interval=None)
+        breakdown = {
+            'user': getattr(times, 'user', 0.0) + getattr(times, 'nice', 0.0),
+            'system': getattr(times, 'system', 0.0),
+            'iowait': getattr(times, 'iowait', 0.0),
+            'irq': getattr(times, 'irq', getattr(times, 'interrupt', 0.0)),
+            'softirq': getattr(times, 'softirq', getattr(times, 'dpc', 0.0)),
+            'steal': getattr(times, 'steal', 0.0)
+        }
+        usage = sum(per_core) / len(per_core) if per_core else 0.0
+        return {
+            'usage': usage,
+            'perCore': per_core,
+            'breakdown': breakdown
+        }
@@ -0,0 +1,216 @@
+"""
+Disk Statistics Sampler
+Computes per-device IOPS, throughput, latency, queue depth and utilisation from /proc/diskstats
+"""
+
+import fnmatch
+import os
+import time
+from typing import Dict, List, Optional, Any
+
+import psutil
+
+# /proc/diskstats reports sectors of 512 bytes regardless of the device's sector size
+_SECTOR_SIZE = 512
+
+# Seconds before device classifications are checked again, for loop devices
+# attached and arrays assembled without the device list changing
+_KIND_REFRESH = 60.0
+
+
+class DiskStatsSampler:
+    """
+    Stateful per-device disk I/O sampler.
+
+    Each call to sample() reads /proc/diskstats once and computes rates from
+    the difference to the previous read. Per device it reports read/write
+    IOPS and throughput, average read/write latency (await, ms per completed
+    I/O), the number of I/Os in flight, the average queue size and %util
+    (share of time the device was busy, from io_ticks). The aggregate totals
+    only count whole disks that are not stacked on other block devices:
+    device-mapper, md and other devices with entries in
+    /sys/block/<name>/slaves, and loop devices backed by a file, pass their
+    I/O on to the devices below, which count it already. Filtered devices
+    are skipped before their counters are parsed, and the previous counters
+    are kept as one tuple per device. Device classifications are cached
+    until the set of (name, major:minor) entries changes, so a reused name
+    is classified again, and are refreshed every minute regardless. Falls
+    back to psutil's aggregate counters where /proc/diskstats is not
+    available.
+    """
+
+    def __init__(self, include_partitions: bool = False, exclude: Optional[List[str]] = None,
+                 proc_root: str = '/proc', sys_block: str = '/sys/block'):
+        """
+        Initialize the disk statistics sampler.
+
+        Args:
+            include_partitions: Whether to report partitions as well as whole disks
+            exclude: Glob patterns of device names to leave out (e.g. 'loop*', 'dm-*')
+            proc_root: Path to the proc filesystem
+            sys_block: Path of the sysfs block device directory
+        """
+        self.include_partitions = include_partitions
+        self.exclude = list(exclude if exclude is not None else ['loop*', 'ram*', 'zram*'])
+        self.path = os.path.join(proc_root, 'diskstats')
+        self.sys_block = sys_block
+        self.use_proc = os.path.exists(self.path)
+
+        # name -> (reads, sectors read, read ms, writes, sectors written, write ms, io ms, queue ms)
+        self._last: Dict[str, tuple] = {}
+        self._last_time: Optional[float] = None
+        # name -> (is whole disk, counts towards the totals, passes the filters),
+        # valid for the (name, major, minor) entries they were made for
+        self._kinds: Dict[str, tuple] = {}
+        self._members: Optional[frozenset] = None
+        self._kinds_time = 0.0
+        self._last_psutil = None
+
+    def _kind(self, name: str) -> tuple:
+        """Classify a device as counted disk, stacked disk or partition and apply filters, cached"""
+        kind = self._kinds.get(name)
+        if kind is None:
+            # sysfs spells '/' in device names (cciss/c0d0) as '!'
+            sys_name = os.path.join(self.sys_block, name.replace('/', '!'))
+            is_disk = not os.path.isdir(self.sys_block) or os.path.exists(sys_name)
+            counted = is_disk and not self._stacked(sys_name)
+            included = (
+                (is_disk or self.include_partitions)
+                and not any(fnmatch.fnmatchcase(name, p) for p in self.exclude)
+            )
+            kind = self._kinds[name] = (is_disk, counted, included)
+        return kind
+
+    @staticmethod
+    def _stacked(sys_name: str) -> bool:
+        """Check whether a disk passes its I/O on to other devices (dm, md, file-backed loop)"""
+        try:
+            if os.listdir(os.path.join(sys_name, 'slaves')):
+                return True
+        except OSError:
+            pass
+        return os.path.exists(os.path.join(sys_name, 'loop', 'backing_file'))
+
+    def sample(self) -> Optional[Dict[str, Any]]:
+        """
+        Take one disk I/O sample.
+
+        Returns:
+            Aggregate rates of all whole disks not stacked on other devices,
+            plus a 'devices' list of per-device rates, or None on the first call
+        """
+        if self.use_proc:
+            try:
+                return self._sample_proc()
+            except (OSError, ValueError):
+                self.use_proc = False
+        return self._sample_psutil()
+
+    def _sample_proc(self) -> Optional[Dict[str, Any]]:
+        """Sample /proc/diskstats"""
+        with open(self.path, 'r') as f:
+            rows = [line.split() for line in f]
+        now = time.monotonic()
+
+        # Classify again when devices come and go or names are reused
+        members = frozenset((fields[2], fields[0], fields[1]) for fields in rows if len(fields) >= 14)
+        if members != self._members or now - self._kinds_time >= _KIND_REFRESH:
+            self._kinds.clear()
+            self._members = members
+            self._kinds_time = now
+
+        elapsed = now - self._last_time if self._last_time is not None else 0
+        last = self._last
+        current = {}
+        devices = []
+        total = [0, 0, 0, 0]  # reads, sectors read, writes, sectors written
+
+        for fields in rows:
+            if len(fields) < 14:
+                continue
+            name = fields[2]
+            is_disk, counted, included = self._kind(name)
+            if not is_disk and not included:
+                continue
+
+            counters = (
+                int(fields[3]), int(fields[5]), int(fields[6]),
+                int(fields[7]), int(fields[9]), int(fields[10]),
+                int(fields[12]), int(fields[13])
+            )
+            current[name] = counters
+            prev = last.get(name)
+            if prev is None or elapsed <= 0:
+                continue
+
+            reads = max(0, counters[0] - prev[0])
+            read_sectors = max(0, counters[1] - prev[1])
+            writes = max(0, counters[3] - prev[3])
+            write_sectors = max(0, counters[4] - prev[4])
+
+            if counted:
+                total[0] += reads
+                total[1] += read_sectors
+                total[2] += writes
+                total[3] += write_sectors
+
+            if not included:
+                continue
+
+            devices.append({
+                'name': name,
+                'readIops': reads / elapsed,
+                'writeIops': writes / elapsed,
+                'readBytes_sec': read_sectors * _SECTOR_SIZE / elapsed,
+                'writeBytes_sec': write_sectors * _SECTOR_SIZE / elapsed,
+                'readAwait': max(0, counters[2] - prev[2]) / reads if reads else 0.0,
+                'writeAwait': max(0, counters[5] - prev[5]) / writes if writes else 0.0,
+                'inFlight': int(fields[11]),
+                'avgQueue': max(0, counters[7] - prev[7]) / (elapsed * 1000),
+                'util': min(100.0, max(0, counters[6] - prev[6]) / (elapsed * 10))
+            })
+
+        self._last = current
+        self._last_time = now
+        if elapsed <= 0:
+            return None
+
+        read_bytes = total[1] * _SECTOR_SIZE
+        write_bytes = total[3] * _SECTOR_SIZE
+        return {
+            'readBytes': read_bytes,
+            'writeBytes': write_bytes,
+            'readCount': total[0],
+            'writeCount': total[2],
+            'readBytes_sec': read_bytes / elapsed,
+            'writeBytes_sec': write_bytes / elapsed,
+            'readCount_sec': total[0] / elapsed,
+            'writeCount_sec': total[2] / elapsed,
+            'devices': devices
+        }
+
+    def _sample_psutil(self) -> Optional[Dict[str, Any]]:
+        """Sample psutil's aggregate counters (no per-device data)"""
+        current = psutil.disk_io_counters()
+        now = time.monotonic()
+        last, last_time = self._last_psutil, self._last_time
+        self._last_psutil, self._last_time = current, now
+        if current is None or last is None or last_time is None or now <= last_time:
+            return None
+
+        elapsed = now - last_time
+        read_bytes = max(0, current.read_bytes - last.read_bytes)
+        write_bytes = max(0, current.write_bytes - last.write_bytes)
+        read_count = max(0, current.read_count - last.read_count)
+        write_count = max(0, current.write_count - last.write_count)
+        return {
+            'readBytes': read_bytes,
+            'writeBytes': write_bytes,
+            'readCount': read_count,
+            'writeCount': write_count,
+            'readBytes_sec': read_bytes / elapsed,
+            'writeBytes_sec': write_bytes / elapsed,
+            'readCount_sec': read_count / elapsed,
+            'writeCount_sec': write_count / elapsed,
+            'devices': []
+        }
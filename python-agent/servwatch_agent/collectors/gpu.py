@@ -0,0 +1,326 @@
+"""
+GPU Sampling Engine
+Reads NVIDIA GPU metrics through NVML with cached handles and one shared reading per tick
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Any
+
+try:
+    import pynvml
+except ImportError:
+    pynvml = None
+
+logger = logging.getLogger(__name__)
+
+# Field values fetched in one nvmlDeviceGetFieldValues call: name -> (constant, scale)
+_FIELDS = (
+    ('power', 'NVML_FI_DEV_POWER_INSTANT', 0.001),  # mW -> W
+    ('memoryTemperature', 'NVML_FI_DEV_MEMORY_TEMP', 1),
+    ('energy', 'NVML_FI_DEV_TOTAL_ENERGY_CONSUMPTION', 0.001)  # mJ -> J
+)
+
+# nvmlValue_t union member for each NVML_VALUE_TYPE_*
+_VALUE_MEMBERS = ('dVal', 'uiVal', 'ulVal', 'ullVal', 'sllVal', 'siVal', 'usVal')
+
+
+class GPUDevice:
+    """Cached handle and static information of one GPU"""
+
+    __slots__ = ('index', 'handle', 'name', 'uuid', 'vram', 'clock_max', 'memory_clock_max',
+                 'field_ids', 'fields', 'has_fan', 'has_clocks', 'has_process_util', 'last_seen')
+
+    def __init__(self, index: int, handle: Any):
+        self.index = index
+        self.handle = handle
+        self.name = 'Unknown'
+        self.uuid = None
+        self.vram = 0
+        self.clock_max = 0
+        self.memory_clock_max = 0
+        # Field values this driver supports for the device, probed at init
+        self.field_ids: List[int] = []
+        self.fields: List[Tuple[str, float]] = []
+        self.has_fan = True
+        self.has_clocks = True
+        self.has_process_util = True
+        # NVML timestamp (us) of the newest process utilization sample seen
+        self.last_seen = 0
+
+
+class GPUEngine:
+    """
+    Shared NVML reader.
+
+    Device handles and static information (name, total VRAM, max clocks) are
+    looked up once at init. read() fetches the dynamic values of every device
+    and caches the result for max_age seconds, so the GPU and temperature
+    collectors and the high-resolution sampler share one set of NVML calls
+    per tick. Power, memory temperature and energy are fetched in a single
+    nvmlDeviceGetFieldValues call where the driver supports it, and queries a
+    device reported as unsupported are not repeated. NVML defines no field
+    values for utilization, memory use, GPU temperature, fan speed or current
+    clocks, so those stay individual calls.
+    """
+
+    def __init__(self, nvml: Any = None, max_age: float = 0.5):
+        """
+        Initialize NVML and cache the device handles.
+
+        Args:
+            nvml: NVML binding module (defaults to pynvml, a fake may be passed for testing)
+            max_age: Seconds a reading is reused before NVML is queried again
+        """
+        self.nvml = nvml if nvml is not None else pynvml
+        self.max_age = max_age
+        self.available = False
+        self.devices: List[GPUDevice] = []
+
+        self._lock = threading.Lock()
+        self._reading: Optional[List[Dict[str, Any]]] = None
+        self._reading_time = 0.0
+
+        if self.nvml is None:
+            logger.info("pynvml not installed, GPU monitoring disabled")
+            return
+
+        try:
+            self.nvml.nvmlInit()
+            count = self.nvml.nvmlDeviceGetCount()
+            self.devices = [self._init_device(i) for i in range(count)]
+            self.available = True
+        except Exception as e:
+            logger.warning(f"GPU monitoring not available: {e}")
+
+    def _init_device(self, index: int) -> GPUDevice:
+        """Look up a device handle, its static information and supported fields"""
+        nvml = self.nvml
+        device = GPUDevice(index, nvml.nvmlDeviceGetHandleByIndex(index))
+        handle = device.handle
+
+        name = nvml.nvmlDeviceGetName(handle)
+        device.name = name.decode('utf-8') if isinstance(name, bytes) else name
+        try:
+            uuid = nvml.nvmlDeviceGetUUID(handle)
+            device.uuid = uuid.decode('utf-8') if isinstance(uuid, bytes) else uuid
+        except Exception:
+            pass
+        try:
+            device.vram = nvml.nvmlDeviceGetMemoryInfo(handle).total
+        except Exception:
+            pass
+        try:
+            device.clock_max = nvml.nvmlDeviceGetMaxClockInfo(handle, nvml.NVML_CLOCK_GRAPHICS)
+            device.memory_clock_max = nvml.nvmlDeviceGetMaxClockInfo(handle, nvml.NVML_CLOCK_MEM)
+        except Exception:
+            pass
+
+        self._probe_fields(device)
+        return device
+
+    def _probe_fields(self, device: GPUDevice):
+        """Keep the field values the driver returns successfully for this device"""
+        nvml = self.nvml
+        if not hasattr(nvml, 'nvmlDeviceGetFieldValues'):
+            return
+
+        candidates = [(name, getattr(nvml, const), scale) for name, const, scale in _FIELDS
+                      if hasattr(nvml, const)]
+        if not candidates:
+            return
+
+        try:
+            values = nvml.nvmlDeviceGetFieldValues(device.handle, [fid for _, fid, _ in candidates])
+        except Exception:
+            return
+
+        for (name, fid, scale), value in zip(candidates, values):
+            if value.nvmlReturn == 0:
+                device.field_ids.append(fid)
+                device.fields.append((name, scale))
+
+    def read(self, max_age: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Get the dynamic values of every device.
+
+        Args:
+            max_age: Reuse a reading younger than this many seconds (defaults to the engine's max_age)
+
+        Returns:
+            One dictionary per device, in index order
+        """
+        if not self.available:
+            return []
+
+        max_age = self.max_age if max_age is None else max_age
+        with self._lock:
+            now = time.monotonic()
+            if self._reading is None or now - self._reading_time >= max_age:
+                self._reading = [self._read_device(device) for device in self.devices]
+                self._reading_time = now
+            return self._reading
+
+    def _read_device(self, device: GPUDevice) -> Dict[str, Any]:
+        """Query the dynamic values of one device"""
+        nvml = self.nvml
+        handle = device.handle
+        reading = {
+            'usage': 0,
+            'memoryUsage': 0,
+            'vramUsed': 0,
+            'vramFree': device.vram,
+            'temperature': 0,
+            'powerUsage': 0,
+            'fanSpeed': 0,
+            'clockSpeed': 0,
+            'memoryClockSpeed': 0
+        }
+
+        try:
+            utilization = nvml.nvmlDeviceGetUtilizationRates(handle)
+            reading['usage'] = utilization.gpu
+            reading['memoryUsage'] = utilization.memory
+        except Exception:
+            pass
+
+        try:
+            mem_info = nvml.nvmlDeviceGetMemoryInfo(handle)
+            reading['vramUsed'] = mem_info.used
+            reading['vramFree'] = mem_info.free
+        except Exception:
+            pass
+
+        try:
+            reading['temperature'] = nvml.nvmlDeviceGetTemperature(handle, nvml.NVML_TEMPERATURE_GPU)
+        except Exception:
+            pass
+
+        fields = self._read_fields(device)
+        if 'power' in fields:
+            reading['powerUsage'] = fields['power']
+        else:
+            try:
+                reading['powerUsage'] = nvml.nvmlDeviceGetPowerUsage(handle) / 1000  # Convert to watts
+            except Exception:
+                pass
+        for name in ('memoryTemperature', 'energy'):
+            if name in fields:
+                reading[name] = fields[name]
+
+        if device.has_fan:
+            try:
+                reading['fanSpeed'] = nvml.nvmlDeviceGetFanSpeed(handle)
+            except Exception as e:
+                device.has_fan = not self._is_not_supported(e)
+
+        if device.has_clocks:
+            try:
+                reading['clockSpeed'] = nvml.nvmlDeviceGetClockInfo(handle, nvml.NVML_CLOCK_GRAPHICS)
+                reading['memoryClockSpeed'] = nvml.nvmlDeviceGetClockInfo(handle, nvml.NVML_CLOCK_MEM)
+            except Exception as e:
+                device.has_clocks = not self._is_not_supported(e)
+
+        return reading
+
+    def _read_fields(self, device: GPUDevice) -> Dict[str, float]:
+        """Fetch the supported field values of a device in one call"""
+        if not device.field_ids:
+            return {}
+
+        try:
+            values = self.nvml.nvmlDeviceGetFieldValues(device.handle, device.field_ids)
+        except Exception:
+            return {}
+
+        fields = {}
+        for (name, scale), value in zip(device.fields, values):
+            if value.nvmlReturn != 0:
+                continue
+            member = _VALUE_MEMBERS[value.valueType] if value.valueType < len(_VALUE_MEMBERS) else 'ullVal'
+            fields[name] = getattr(value.value, member) * scale
+        return fields
+
+    def read_processes(self) -> Dict[int, Dict[str, Any]]:
+        """
+        Get per-process GPU usage across all devices.
+
+        Memory comes from the running compute processes. SM and memory
+        utilization come from the process samples newer than the last call,
+        so each call only transfers new samples; a process with no new
+        samples was idle and reports 0%.
+
+        Returns:
+            pid -> {'pid', 'gpus', 'gpuMemory' (bytes), 'smUtil', 'memUtil'}
+        """
+        if not self.available:
+            return {}
+
+        nvml = self.nvml
+        processes: Dict[int, Dict[str, Any]] = {}
+
+        def entry(pid: int) -> Dict[str, Any]:
+            proc = processes.get(pid)
+            if proc is None:
+                proc = processes[pid] = {'pid': pid, 'gpus': [], 'gpuMemory': 0, 'smUtil': 0, 'memUtil': 0}
+            return proc
+
+        with self._lock:
+            for device in self.devices:
+                try:
+                    running = nvml.nvmlDeviceGetComputeRunningProcesses(device.handle)
+                except Exception:
+                    running = []
+                for info in running:
+                    proc = entry(info.pid)
+                    if device.index not in proc['gpus']:
+                        proc['gpus'].append(device.index)
+                    proc['gpuMemory'] += info.usedGpuMemory or 0  # None when not available
+
+                for sample in self._read_process_samples(device):
+                    proc = entry(sample.pid)
+                    if device.index not in proc['gpus']:
+                        proc['gpus'].append(device.index)
+                    proc['smUtil'] = max(proc['smUtil'], sample.smUtil)
+                    proc['memUtil'] = max(proc['memUtil'], sample.memUtil)
+
+        return processes
+
+    def _read_process_samples(self, device: GPUDevice) -> List[Any]:
+        """Fetch the process utilization samples newer than the last call"""
+        if not device.has_process_util:
+            return []
+
+        try:
+            samples = self.nvml.nvmlDeviceGetProcessUtilization(device.handle, device.last_seen)
+        except Exception as e:
+            # NOT_FOUND means no new samples since last_seen
+            device.has_process_util = not self._is_not_supported(e)
+            return []
+
+        # Keep only the newest sample per pid
+        newest: Dict[int, Any] = {}
+        for sample in samples:
+            if sample.timeStamp <= device.last_seen:
+                continue
+            current = newest.get(sample.pid)
+            if current is None or sample.timeStamp > current.timeStamp:
+                newest[sample.pid] = sample
+        if newest:
+            device.last_seen = max(sample.timeStamp for sample in newest.values())
+        return list(newest.values())
+
+    def _is_not_supported(self, error: Exception) -> bool:
+        """Check whether an NVML error means the query is not supported by the device"""
+        not_supported = getattr(self.nvml, 'NVML_ERROR_NOT_SUPPORTED', None)
+        return not_supported is not None and getattr(error, 'value', None) == not_supported
+
+    def shutdown(self):
+        """Release NVML"""
+        if self.available:
+            try:
+                self.nvml.nvmlShutdown()
+            except Exception:
+                pass
+            self.available = False
@@ -0,0 +1,138 @@
+"""
+High-Resolution Sampler
+Samples cheap metrics at sub-second intervals and summarizes them per transmit window
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional, Any
+
+import psutil
+
+from servwatch_agent.aggregation import WindowAggregator
+from servwatch_agent.collectors.cpu import CPUSampler
+from servwatch_agent.collectors.gpu import GPUEngine
+
+logger = logging.getLogger(__name__)
+
+
+class HighResSampler:
+    """
+    Background sampler for short-lived spikes.
+
+    A daemon thread samples CPU, memory, network and disk rates and GPU
+    utilisation every interval seconds on a fixed schedule and feeds them into
+    a WindowAggregator. take_window() returns the min/max/mean/last/p95/p99
+    summary of everything sampled since the previous call, so microbursts show
+    up in the next payload without sending more messages.
+    """
+
+    def __init__(self, interval: float = 0.1, gpu_engine: Optional[GPUEngine] = None,
+                 relative_accuracy: float = 0.01,
+                 on_error: Optional[Callable[[str], None]] = None):
+        """
+        Initialize the sampler.
+
+        Args:
+            interval: Sampling interval in seconds
+            gpu_engine: Shared GPU engine to sample utilisation from, if any
+            relative_accuracy: Relative accuracy of the percentile sketches
+            on_error: Optional callback told 'highres' on every failed sample
+        """
+        self.interval = interval
+        self.on_error = on_error
+        self._cpu = CPUSampler()
+        self._aggregator = WindowAggregator(relative_accuracy)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        self._last_net = None
+        self._last_disk = None
+        self._last_time: Optional[float] = None
+
+        self._gpu_engine = gpu_engine if gpu_engine is not None and gpu_engine.available else None
+
+    def start(self):
+        """Start the sampling thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name='highres-sampler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the sampling thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+
+    def _loop(self):
+        """Sample on a fixed schedule until stopped"""
+        deadline = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                values = self.sample()
+                with self._lock:
+                    self._aggregator.add(values)
+            except Exception as e:
+                logger.error(f"Error in high-resolution sampling: {e}")
+                if self.on_error:
+                    self.on_error('highres')
+
+            deadline += self.interval
+            now = time.monotonic()
+            if deadline <= now:
+                deadline = now + self.interval  # Overran, skip missed samples
+            self._stop.wait(deadline - now)
+
+    def sample(self) -> Dict[str, Optional[float]]:
+        """
+        Take one sample of the cheap metrics.
+
+        Returns:
+            Metric name to value; rates are None on the first sample
+        """
+        now = time.monotonic()
+        net = psutil.net_io_counters()
+        disk = psutil.disk_io_counters()
+        values = {
+            'cpu': self._cpu.sample()['usage'],
+            'memory': psutil.virtual_memory().percent,
+            'networkRx': None,
+            'networkTx': None,
+            'diskRead': None,
+            'diskWrite': None
+        }
+
+        elapsed = now - self._last_time if self._last_time is not None else 0
+        if elapsed > 0:
+            if net is not None and self._last_net is not None:
+                values['networkRx'] = max(0, net.bytes_recv - self._last_net.bytes_recv) / elapsed
+                values['networkTx'] = max(0, net.bytes_sent - self._last_net.bytes_sent) / elapsed
+            if disk is not None and self._last_disk is not None:
+                values['diskRead'] = max(0, disk.read_bytes - self._last_disk.read_bytes) / elapsed
+                values['diskWrite'] = max(0, disk.write_bytes - self._last_disk.write_bytes) / elapsed
+        self._last_net, self._last_disk, self._last_time = net, disk, now
+
+        if self._gpu_engine:
+            # Readings are shared with the GPU collector, so this adds no NVML calls at its tick
+            readings = self._gpu_engine.read(max_age=self.interval / 2)
+            if readings:
+                values['gpu'] = sum(reading['usage'] for reading in readings) / len(readings)
+
+        return values
+
+    def take_window(self) -> Dict[str, Any]:
+        """
+        Summarize the samples taken since the previous call.
+
+        Returns:
+            Dictionary with the sampling interval (ms) and per-metric summaries
+        """
+        with self._lock:
+            metrics = self._aggregator.take()
+        return {
+            'interval': int(self.interval * 1000),
+            'metrics': metrics
+        }
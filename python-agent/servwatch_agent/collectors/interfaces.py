@@ -0,0 +1,107 @@
+"""
+Network Interface Inventory
+Caches interface metadata and filters interfaces by name
+"""
+
+import fnmatch
+import socket
+from typing import Dict, List, Optional, Any
+
+import psutil
+
+_AF_PACKET = getattr(socket, 'AF_PACKET', 17)
+_AF_LINK = getattr(psutil, 'AF_LINK', _AF_PACKET)
+
+
+class InterfaceInventory:
+    """
+    Network interface metadata, rebuilt only when it changes.
+
+    Each refresh reads the address table and the link stats once for all
+    interfaces. The metadata list is rebuilt only when the interface set, an
+    address or a link attribute changed, and otherwise the cached list is
+    returned; version is incremented on every change. Interfaces are filtered
+    by fnmatch-style include and exclude patterns (e.g. 'veth*'), with the
+    result of each name cached.
+    """
+
+    def __init__(self, include: Optional[List[str]] = None, exclude: Optional[List[str]] = None):
+        """
+        Initialize the inventory.
+
+        Args:
+            include: Glob patterns of interfaces to report (all if empty)
+            exclude: Glob patterns of interfaces to leave out, applied after include
+        """
+        self.include = list(include or [])
+        self.exclude = list(exclude or [])
+        self.version = 0
+        self._signature = None
+        self._interfaces: List[Dict[str, Any]] = []
+        self._matches: Dict[str, bool] = {}
+
+    def matches(self, name: str) -> bool:
+        """Check whether an interface passes the include/exclude filters"""
+        result = self._matches.get(name)
+        if result is None:
+            result = (
+                (not self.include or any(fnmatch.fnmatchcase(name, p) for p in self.include))
+                and not any(fnmatch.fnmatchcase(name, p) for p in self.exclude)
+            )
+            if len(self._matches) > 4096:
+                self._matches.clear()  # Churned veth names, don't grow forever
+            self._matches[name] = result
+        return result
+
+    def refresh(self) -> List[Dict[str, Any]]:
+        """
+        Get the metadata of the filtered interfaces.
+
+        Returns:
+            List of interface dictionaries; the same list object is returned
+            while nothing has changed
+        """
+        addrs = psutil.net_if_addrs()
+        stats = psutil.net_if_stats()
+
+        signature = tuple(
+            (name, tuple((a.family, a.address) for a in addrs.get(name, ())),
+             (s.isup, s.speed, s.duplex, s.mtu) if s is not None else None)
+            for name in sorted(set(addrs) | set(stats))
+            if self.matches(name)
+            for s in (stats.get(name),)
+        )
+        if signature == self._signature:
+            return self._interfaces
+
+        interfaces = []
+        for name, iface_addrs, link in signature:
+            iface_info = {
+                'name': name,
+                'ip4': None,
+                'ip6': None,
+                'mac': None
+            }
+            for family, address in iface_addrs:
+                if family == socket.AF_INET:
+                    iface_info['ip4'] = address
+                elif family == socket.AF_INET6:
+                    iface_info['ip6'] = address
+                elif family in (_AF_PACKET, _AF_LINK):
+                    iface_info['mac'] = address
+
+            if link is not None:
+                isup, speed, duplex, mtu = link
+                iface_info.update({
+                    'speed': speed,
+                    'duplex': duplex,
+                    'mtu': mtu,
+                    'isup': isup
+                })
+
+            interfaces.append(iface_info)
+
+        self._signature = signature
+        self._interfaces = interfaces
+        self.version += 1
+        return interfaces
@@ -0,0 +1,265 @@
+"""
+Mount Table Collector
+Caches the mount list and measures partition usage without blocking on hung mounts
+"""
+
+import fnmatch
+import os
+import queue
+import re
+import select
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Dict, List, Optional, Any, Set
+
+import psutil
+
+_ESCAPE = re.compile(r'\\([0-7]{3})')
+
+
+def _unescape(path: str) -> str:
+    """Decode the octal escapes (\\040 for space, ...) used in mountinfo paths"""
+    return _ESCAPE.sub(lambda m: chr(int(m.group(1), 8)), path)
+
+
+class _StatPool:
+    """
+    Growable pool of daemon threads running disk_usage().
+
+    Daemon threads are used instead of a ThreadPoolExecutor so that a worker
+    stuck in statvfs on a dead mount can never block interpreter exit.
+    """
+
+    def __init__(self, workers: int):
+        self._jobs: queue.Queue = queue.Queue()
+        self._threads = 0
+        self.grow(workers)
+
+    def grow(self, workers: int):
+        """Start threads until the pool has at least this many"""
+        while self._threads < workers:
+            threading.Thread(target=self._work, name=f'statvfs-{self._threads}', daemon=True).start()
+            self._threads += 1
+
+    @property
+    def size(self) -> int:
+        """Number of worker threads started"""
+        return self._threads
+
+    def submit(self, mountpoint: str) -> Future:
+        """Queue a disk_usage() call for a mountpoint"""
+        future = Future()
+        self._jobs.put((mountpoint, future))
+        return future
+
+    def _work(self):
+        while True:
+            mountpoint, future = self._jobs.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(psutil.disk_usage(mountpoint))
+            except BaseException as e:
+                future.set_exception(e)
+
+
+class MountTable:
+    """
+    Partition usage with a cached mount list and bounded statvfs calls.
+
+    On Linux the mount list is parsed from /proc/self/mountinfo and re-read
+    only when poll() reports the mount table changed. Every statvfs runs in
+    a worker pool and gets its own deadline, timeout seconds after it was
+    submitted; a mount that does not answer in time is reported with its last
+    known usage and 'stale': True, and is not queried again until its
+    outstanding call returns. The pool grows by one worker for each call
+    still outstanding, so hung NFS or FUSE mounts never starve the healthy
+    ones of workers and never block the caller.
+    """
+
+    def __init__(self, include_fstypes: Optional[List[str]] = None,
+                 exclude_fstypes: Optional[List[str]] = None,
+                 exclude_mountpoints: Optional[List[str]] = None,
+                 timeout: float = 2.0, workers: int = 4, proc_root: str = '/proc'):
+        """
+        Initialize the mount table.
+
+        Args:
+            include_fstypes: Filesystem types to report (default: block-device filesystems)
+            exclude_fstypes: Filesystem types to skip
+            exclude_mountpoints: Glob patterns of mountpoints to skip
+            timeout: Seconds each statvfs call is waited for after it is submitted
+            workers: Number of statvfs worker threads kept free for new calls
+            proc_root: Path to the proc filesystem
+        """
+        self.include_fstypes = set(include_fstypes or [])
+        self.exclude_fstypes = set(exclude_fstypes if exclude_fstypes is not None else ['squashfs'])
+        self.exclude_mountpoints = list(exclude_mountpoints or [])
+        self.timeout = timeout
+        self.workers = workers
+        self.proc_root = proc_root
+
+        self._pool = _StatPool(workers)
+        self._mounts: Optional[List[Dict[str, str]]] = None
+        # mountpoint -> last usage entry, and statvfs calls still outstanding
+        self._last: Dict[str, Dict[str, Any]] = {}
+        self._last_time: Dict[str, float] = {}
+        self._pending: Dict[str, Future] = {}
+        self._deadlines: Dict[str, float] = {}
+        # Calls still hung on mounts that have since gone away (umount -l)
+        self._orphaned: Set[Future] = set()
+
+        self._mountinfo = None
+        self._poller = None
+        try:
+            self._mountinfo = open(os.path.join(proc_root, 'self', 'mountinfo'), 'rb')
+            self._poller = select.poll()
+            self._poller.register(self._mountinfo, select.POLLPRI | select.POLLERR)
+        except (OSError, AttributeError):
+            # No mountinfo (non-Linux) or no poll(): list mounts through psutil every time
+            if self._mountinfo is not None:
+                self._mountinfo.close()
+            self._mountinfo = None
+            self._poller = None
+
+    def _changed(self) -> bool:
+        """Check whether the mount table changed since it was last read"""
+        if self._mounts is None or self._poller is None:
+            return True
+        return bool(self._poller.poll(0))
+
+    def _physical_fstypes(self) -> set:
+        """Filesystem types backed by block devices, as psutil.disk_partitions() uses"""
+        fstypes = {'zfs'}
+        try:
+            with open(os.path.join(self.proc_root, 'filesystems'), 'r') as f:
+                for line in f:
+                    if not line.startswith('nodev'):
+                        fstypes.add(line.strip())
+        except OSError:
+            pass
+        return fstypes
+
+    def _read_mounts(self) -> List[Dict[str, str]]:
+        """Get the filtered mount list, re-reading it only after a change"""
+        if not self._changed():
+            return self._mounts
+
+        if self._mountinfo is not None:
+            self._mountinfo.seek(0)
+            raw = []
+            for line in self._mountinfo.read().decode('utf-8', 'replace').splitlines():
+                # id parent major:minor root mountpoint options [optional...] - fstype source super
+                left, _, right = line.partition(' - ')
+                left, right = left.split(), right.split()
+                if len(left) < 5 or len(right) < 2:
+                    continue
+                raw.append((_unescape(right[1]), _unescape(left[4]), right[0]))
+        else:
+            raw = [(p.device, p.mountpoint, p.fstype) for p in psutil.disk_partitions(all=True)]
+
+        fstypes = self.include_fstypes or self._physical_fstypes()
+        mounts = []
+        seen = set()
+        # Later mounts hide earlier ones on the same mountpoint, keep the last
+        for device, mountpoint, fstype in reversed(raw):
+            if mountpoint in seen:
+                continue
+            seen.add(mountpoint)
+            if fstype not in fstypes or fstype in self.exclude_fstypes:
+                continue
+            if not self.include_fstypes and device in ('', 'none'):
+                continue
+            if any(fnmatch.fnmatchcase(mountpoint, p) for p in self.exclude_mountpoints):
+                continue
+            mounts.append({'device': device, 'mountpoint': mountpoint, 'fstype': fstype})
+        mounts.reverse()
+
+        self._mounts = mounts
+        current = {mount['mountpoint'] for mount in mounts}
+        for mountpoint in list(self._last):
+            if mountpoint not in current:
+                del self._last[mountpoint]
+                del self._last_time[mountpoint]
+        for mountpoint in list(self._pending):
+            if mountpoint not in current:
+                future = self._pending.pop(mountpoint)
+                del self._deadlines[mountpoint]
+                if not future.done():
+                    self._orphaned.add(future)
+        return mounts
+
+    def collect(self) -> List[Dict[str, Any]]:
+        """
+        Get the usage of every mounted partition.
+
+        Returns:
+            List of partition dictionaries; entries whose statvfs did not finish
+            in time carry 'stale': True and 'staleAge' (ms since the value was measured)
+        """
+        mounts = self._read_mounts()
+
+        # Keep a free worker for every call a hung mount is still holding,
+        # including mounts detached while their call was outstanding
+        self._orphaned = {future for future in self._orphaned if not future.done()}
+        hung = sum(1 for future in self._pending.values() if not future.done()) + len(self._orphaned)
+        self._pool.grow(self.workers + hung)
+
+        # Calls still outstanding from earlier ticks are checked, not waited for
+        now = time.monotonic()
+        futures = {}
+        for mount in mounts:
+            mountpoint = mount['mountpoint']
+            future = self._pending.get(mountpoint)
+            if future is None:
+                future = self._pool.submit(mountpoint)
+                self._pending[mountpoint] = future
+                self._deadlines[mountpoint] = now + self.timeout
+            futures[mountpoint] = future
+
+        # Wait for each call until its own deadline
+        while True:
+            now = time.monotonic()
+            waiting = [mountpoint for mountpoint, future in futures.items()
+                       if not future.done() and self._deadlines[mountpoint] > now]
+            if not waiting:
+                break
+            remaining = min(self._deadlines[mountpoint] for mountpoint in waiting) - now
+            wait([futures[mountpoint] for mountpoint in waiting],
+                 timeout=remaining, return_when=FIRST_COMPLETED)
+
+        partitions = []
+        for mount in mounts:
+            mountpoint = mount['mountpoint']
+            future = futures[mountpoint]
+
+            if not future.done():
+                last = self._last.get(mountpoint)
+                entry = dict(last) if last else {
+                    **mount, 'total': 0, 'used': 0, 'free': 0, 'usePercent': 0
+                }
+                entry['stale'] = True
+                entry['staleAge'] = int((now - self._last_time[mountpoint]) * 1000) if last else None
+                partitions.append(entry)
+                continue
+
+            del self._pending[mountpoint]
+            del self._deadlines[mountpoint]
+            try:
+                usage = future.result()
+            except OSError:
+                continue  # Permission denied or the mount went away
+
+            entry = {
+                **mount,
+                'total': usage.total,
+                'used': usage.used,
+                'free': usage.free,
+                'usePercent': usage.percent
+            }
+            self._last[mountpoint] = entry
+            self._last_time[mountpoint] = now
+            partitions.append(entry)
+
+        return partitions
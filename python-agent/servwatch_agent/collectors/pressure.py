@@ -0,0 +1,131 @@
+"""
+Pressure Stall Information Collector
+Reports CPU, memory and IO contention from /proc/pressure
+"""
+
+import logging
+import os
+import time
+from typing import Callable, Dict, List, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+# Resources exposed under /proc/pressure and as <resource>.pressure in cgroups
+RESOURCES = ('cpu', 'memory', 'io', 'irq')
+
+
+def read_pressure(path: str) -> Optional[Dict[str, Dict[str, float]]]:
+    """
+    Parse a PSI file.
+
+    Args:
+        path: Path of a /proc/pressure/<resource> or <cgroup>/<resource>.pressure file
+
+    Returns:
+        {'some': {...}, 'full': {...}} with avg10/avg60/avg300 (%) and total
+        (stall microseconds), or None if the file cannot be read
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None  # Missing, or PSI disabled at boot (EOPNOTSUPP)
+
+    lines = {}
+    for line in data.split(b'\n'):
+        parts = line.split()
+        if not parts:
+            continue
+        values = {}
+        for field in parts[1:]:
+            key, _, value = field.partition(b'=')
+            try:
+                values[key.decode()] = int(value) if key == b'total' else float(value)
+            except ValueError:
+                continue
+        lines[parts[0].decode()] = values
+    return lines
+
+
+class PressureCollector:
+    """
+    Collects system-wide Pressure Stall Information.
+
+    Each tick reads one small file per resource and reports the kernel's
+    avg10/avg60/avg300 stall percentages together with the share of time
+    stalled since the previous tick, computed from the total stall counter.
+    'some' is the share of time at least one task was stalled on the
+    resource, 'full' the share of time all non-idle tasks were. Resources
+    whose file cannot be read at startup are skipped, and the collector
+    disables itself if none can (kernels before 4.20 or booted with psi=0).
+    """
+
+    def __init__(self, proc_root: str = '/proc', on_error: Optional[Callable[[str], None]] = None):
+        """
+        Initialize the PSI collector.
+
+        Args:
+            proc_root: Path to the proc filesystem
+            on_error: Optional callback told 'pressure' on every failed collection
+        """
+        self.on_error = on_error
+        self.path = os.path.join(proc_root, 'pressure')
+        self.resources: List[str] = [
+            name for name in RESOURCES
+            if read_pressure(os.path.join(self.path, name)) is not None
+        ]
+        self.available = bool(self.resources)
+
+        # resource -> {'some': total, 'full': total} from the previous tick
+        self._last_totals: Dict[str, Dict[str, int]] = {}
+        self._last_time: Optional[float] = None
+
+        if not self.available:
+            logger.info(f"Pressure stall information not available at {self.path}, PSI monitoring disabled")
+
+    def collect(self) -> Dict[str, Any]:
+        """
+        Collect PSI metrics.
+
+        Returns:
+            Resource name to {'some': {...}, 'full': {...}}, each with avg10,
+            avg60, avg300 and stall (% of time stalled since the previous tick)
+        """
+        if not self.available:
+            return {}
+
+        try:
+            now = time.monotonic()
+            elapsed = now - self._last_time if self._last_time is not None else 0
+            metrics = {}
+            totals = {}
+
+            for name in self.resources:
+                pressure = read_pressure(os.path.join(self.path, name))
+                if pressure is None:
+                    continue
+                last = self._last_totals.get(name, {})
+                resource = {}
+                totals[name] = {}
+                for kind, values in pressure.items():
+                    total = values.get('total', 0)
+                    totals[name][kind] = total
+                    stall = 0.0
+                    if kind in last and elapsed > 0:
+                        stall = min(100.0, max(0, total - last[kind]) / (elapsed * 1e4))
+                    resource[kind] = {
+                        'avg10': values.get('avg10', 0.0),
+                        'avg60': values.get('avg60', 0.0),
+                        'avg300': values.get('avg300', 0.0),
+                        'stall': stall
+                    }
+                metrics[name] = resource
+
+            self._last_totals = totals
+            self._last_time = now
+            return metrics
+        except Exception as e:
+            logger.error(f"Error collecting pressure metrics: {e}")
+            if self.on_error:
+                self.on_error('pressure')
+            return {}
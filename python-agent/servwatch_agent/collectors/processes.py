@@ -0,0 +1,262 @@
+"""
+Process Scanner
+Reads /proc/<pid>/stat directly and keeps only the top-K processes
+"""
+
+import heapq
+import os
+import time
+from typing import Dict, List, Optional, Any
+
+import psutil
+
+try:
+    import pwd
+except ImportError:
+    pwd = None
+
+# /proc/<pid>/stat state letters mapped to psutil status names
+_STATES = {
+    'R': 'running',
+    'S': 'sleeping',
+    'D': 'disk-sleep',
+    'T': 'stopped',
+    't': 'tracing-stop',
+    'Z': 'zombie',
+    'X': 'dead',
+    'x': 'dead',
+    'I': 'idle',
+    'K': 'wake-kill',
+    'W': 'waking',
+    'P': 'parked'
+}
+
+
+class ProcessScanner:
+    """
+    Fast process table scanner.
+
+    On Linux it reads /proc/<pid>/stat once per process, derives CPU usage from
+    the utime+stime delta since the previous scan and selects the top-K
+    processes with bounded heaps, so the per-process work is a single read and
+    only K entries are ever built into dictionaries. RSS is taken from the
+    rss field of stat rather than from /proc/<pid>/statm: the kernel fills
+    both from the same counter, and skipping statm halves the files opened
+    per process. Usernames are resolved only for the selected processes and
+    cached per uid. Falls back to psutil.process_iter() where /proc is not
+    available.
+    """
+
+    def __init__(self, top_k: int = 10, proc_root: str = '/proc'):
+        """
+        Initialize the process scanner.
+
+        Args:
+            top_k: Number of processes reported per ranking
+            proc_root: Path to the proc filesystem
+        """
+        self.top_k = top_k
+        self.proc_root = proc_root
+        self.use_proc = os.path.isfile(os.path.join(proc_root, 'self', 'stat'))
+
+        self._clock_ticks = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+        self._page_size = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+        self._total_memory = psutil.virtual_memory().total
+
+        # pid -> (starttime, utime + stime, comm) from the previous scan
+        self._last_ticks: Dict[int, tuple] = {}
+        self._last_time: Optional[float] = None
+        self._usernames: Dict[int, str] = {}
+
+    def scan(self) -> Dict[str, Any]:
+        """
+        Scan the process table.
+
+        Returns:
+            Dictionary with process counts and 'topByCPU'/'topByMemory' lists
+        """
+        if self.use_proc:
+            return self._scan_proc()
+        return self._scan_psutil()
+
+    def _scan_proc(self) -> Dict[str, Any]:
+        """Scan processes through /proc"""
+        now = time.monotonic()
+        elapsed = now - self._last_time if self._last_time is not None else 0
+        cpu_scale = 100.0 / (self._clock_ticks * elapsed) if elapsed > 0 else 0.0
+        mem_scale = self._page_size * 100.0 / self._total_memory if self._total_memory else 0.0
+
+        last_ticks = self._last_ticks
+        current_ticks = {}
+        status_counts = {}
+        top_cpu: List[tuple] = []
+        top_mem: List[tuple] = []
+        k = self.top_k
+        total = 0
+        root = self.proc_root
+
+        for entry in os.listdir(root):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f'{root}/{entry}/stat', 'rb') as f:
+                    data = f.read()
+            except OSError:
+                continue  # Process exited or is not readable
+
+            # comm may contain spaces and parentheses, split around the last ')'
+            lparen = data.find(b'(')
+            rparen = data.rfind(b')')
+            if lparen < 0 or rparen < 0:
+                continue
+            fields = data[rparen + 2:].split()
+            if len(fields) < 22:
+                continue
+
+            pid = int(entry)
+            state = fields[0].decode('ascii', 'replace')
+            ticks = int(fields[11]) + int(fields[12])
+            starttime = int(fields[19])
+            rss = int(fields[21])
+
+            total += 1
+            status = _STATES.get(state, 'unknown')
+            status_counts[status] = status_counts.get(status, 0) + 1
+            current_ticks[pid] = (starttime, ticks, data[lparen + 1:rparen])
+
+            cpu = 0.0
+            prev = last_ticks.get(pid)
+            if prev is not None and prev[0] == starttime:
+                cpu = (ticks - prev[1]) * cpu_scale
+
+            item = (cpu, pid, rss, data, lparen, rparen, status)
+            if len(top_cpu) < k:
+                heapq.heappush(top_cpu, item)
+            elif cpu > top_cpu[0][0]:
+                heapq.heapreplace(top_cpu, item)
+
+            item = (rss, pid, cpu, data, lparen, rparen, status)
+            if len(top_mem) < k:
+                heapq.heappush(top_mem, item)
+            elif rss > top_mem[0][0]:
+                heapq.heapreplace(top_mem, item)
+
+        self._last_ticks = current_ticks
+        self._last_time = now
+
+        top_cpu.sort(reverse=True)
+        top_mem.sort(reverse=True)
+
+        return {
+            'total': total,
+            'running': status_counts.get('running', 0),
+            'sleeping': status_counts.get('sleeping', 0),
+            'stopped': status_counts.get('stopped', 0),
+            'zombie': status_counts.get('zombie', 0),
+            'topByCPU': [
+                self._build_entry(pid, data[lp + 1:rp], cpu, rss * mem_scale, status)
+                for cpu, pid, rss, data, lp, rp, status in top_cpu
+            ],
+            'topByMemory': [
+                self._build_entry(pid, data[lp + 1:rp], cpu, rss * mem_scale, status)
+                for rss, pid, cpu, data, lp, rp, status in top_mem
+            ]
+        }
+
+    def _build_entry(self, pid: int, comm: bytes, cpu: float, memory: float,
+                     status: str) -> Dict[str, Any]:
+        """Build the payload entry for a selected process"""
+        return {
+            'pid': pid,
+            'name': comm.decode('utf-8', 'replace'),
+            'cpu': cpu,
+            'memory': memory,
+            'user': self._get_username(pid),
+            'status': status
+        }
+
+    def describe(self, pids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Look up the name and owner of specific processes.
+
+        Names of processes seen by the last scan are taken from it, only
+        other processes have their comm file read.
+
+        Args:
+            pids: Process IDs to describe
+
+        Returns:
+            pid -> {'name', 'user'}; processes that no longer exist are omitted
+        """
+        described = {}
+        for pid in pids:
+            if self.use_proc:
+                seen = self._last_ticks.get(pid)
+                if seen is not None:
+                    name = seen[2].decode('utf-8', 'replace')
+                else:
+                    try:
+                        with open(f'{self.proc_root}/{pid}/comm', 'rb') as f:
+                            name = f.read().rstrip(b'\n').decode('utf-8', 'replace')
+                    except OSError:
+                        continue
+                described[pid] = {'name': name, 'user': self._get_username(pid)}
+            else:
+                try:
+                    proc = psutil.Process(pid)
+                    described[pid] = {'name': proc.name(), 'user': proc.username()}
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    continue
+        return described
+
+    def _get_username(self, pid: int) -> str:
+        """Resolve the owner of a process, caching uid to name lookups"""
+        try:
+            uid = os.stat(f'{self.proc_root}/{pid}').st_uid
+        except OSError:
+            return 'unknown'
+
+        name = self._usernames.get(uid)
+        if name is None:
+            try:
+                name = pwd.getpwuid(uid).pw_name if pwd else str(uid)
+            except KeyError:
+                name = str(uid)
+            self._usernames[uid] = name
+        return name
+
+    def _scan_psutil(self) -> Dict[str, Any]:
+        """Scan processes through psutil (non-Linux platforms)"""
+        procs = []
+        status_counts = {}
+
+        for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent', 'username', 'status']):
+            try:
+                pinfo = proc.info
+                if pinfo.get('name') is None:
+                    continue
+
+                # Count by status
+                status = pinfo.get('status', 'unknown')
+                status_counts[status] = status_counts.get(status, 0) + 1
+
+                procs.append({
+                    'pid': pinfo.get('pid'),
+                    'name': pinfo.get('name'),
+                    'cpu': pinfo.get('cpu_percent', 0) or 0,
+                    'memory': pinfo.get('memory_percent', 0) or 0,
+                    'user': pinfo.get('username', 'unknown'),
+                    'status': status
+                })
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+
+        return {
+            'total': len(procs),
+            'running': status_counts.get('running', 0),
+            'sleeping': status_counts.get('sleeping', 0),
+            'stopped': status_counts.get('stopped', 0),
+            'zombie': status_counts.get('zombie', 0),
+            'topByCPU': heapq.nlargest(self.top_k, procs, key=lambda p: p['cpu']),
+            'topByMemory': heapq.nlargest(self.top_k, procs, key=lambda p: p['memory'])
+        }
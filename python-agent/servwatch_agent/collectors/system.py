@@ -3,6 +3,8 @@ System Metrics Collector
 Collects CPU, Memory, Disk, Network, GPU, and Temperature metrics
 """
 
+import heapq
+import logging
 import math
 import psutil
 import platform
@@ -10,59 +12,98 @@ import socket
 import subprocess
 import threading
 import time
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any
 
-try:
-    import pynvml
-except ImportError:
-    pynvml = None
+from servwatch_agent.collectors.cpu import CPUSampler
+from servwatch_agent.collectors.diskstats import DiskStatsSampler
+from servwatch_agent.collectors.gpu import GPUEngine
+from servwatch_agent.collectors.interfaces import InterfaceInventory
+from servwatch_agent.collectors.mounts import MountTable
+from servwatch_agent.collectors.processes import ProcessScanner
+
+logger = logging.getLogger(__name__)
 
 
 class SystemCollector:
     """Collects system metrics using psutil and pynvml"""
 
-    def __init__(self, enable_gpu: bool = True):
+    def __init__(self, enable_gpu: bool = True, interface_include: Optional[List[str]] = None,
+                 interface_exclude: Optional[List[str]] = None,
+                 partition_options: Optional[Dict[str, Any]] = None,
+                 disk_io_options: Optional[Dict[str, Any]] = None,
+                 on_error: Optional[Callable[[str], None]] = None):
         """
         Initialize the system collector.
 
         Args:
             enable_gpu: Whether to collect GPU metrics (requires pynvml)
+            interface_include: Glob patterns of network interfaces to report individually
+            interface_exclude: Glob patterns of network interfaces to leave out of the
+                per-interface lists (they still count towards the totals)
+            partition_options: Mount filters and statvfs limits ('partitions' config section)
+            disk_io_options: Per-device disk I/O filters ('diskIO' config section)
+            on_error: Optional callback told the section name of every failed collection
         """
         self.enable_gpu = enable_gpu
+        self.on_error = on_error
         self.gpu_available = False
         self.nvml_initialized = False
+        self.gpu_engine: Optional[GPUEngine] = None
 
         # Network stats tracking for rate calculation
         self._last_network_stats = None
         self._last_network_time = None
         self._network_lock = threading.Lock()
 
-        # Disk IO stats tracking
-        self._last_disk_stats = None
-        self._last_disk_time = None
+        # Interface metadata, rebuilt only when it changes
+        self.interfaces = InterfaceInventory(interface_include, interface_exclude)
+
+        # Mount list cached between mount table changes, statvfs bounded by a deadline
+        partition_options = partition_options or {}
+        self.mounts = MountTable(
+            include_fstypes=partition_options.get('includeFstypes'),
+            exclude_fstypes=partition_options.get('excludeFstypes'),
+            exclude_mountpoints=partition_options.get('excludeMountpoints'),
+            timeout=partition_options.get('statTimeout', 2000) / 1000,
+            workers=partition_options.get('statWorkers', 4)
+        )
+
+        # Disk IO rates from /proc/diskstats deltas
+        disk_io_options = disk_io_options or {}
+        self._disk_sampler = DiskStatsSampler(
+            include_partitions=disk_io_options.get('partitions', False),
+            exclude=disk_io_options.get('exclude')
+        )
         self._disk_lock = threading.Lock()
 
+        # CPU usage is computed from counter deltas between ticks
+        self._cpu_sampler = CPUSampler()
+
+        # Process table scanner keeping only the top processes
+        self._process_scanner = ProcessScanner()
+
         # Initialize NVML if GPU monitoring is enabled
         if self.enable_gpu:
             self._init_nvml()
 
     def _init_nvml(self):
         """Initialize NVIDIA ML library for GPU monitoring"""
-        if pynvml is None:
-            print("pynvml not installed, GPU monitoring disabled")
-            self.gpu_available = False
-            return
-
-        try:
-            pynvml.nvmlInit()
-            self.gpu_available = True
-            self.nvml_initialized = True
-            device_count = pynvml.nvmlDeviceGetCount()
-            print(f"GPU monitoring enabled: {device_count} NVIDIA GPU(s) detected")
-        except Exception as e:
-            print(f"GPU monitoring not available: {e}")
-            self.gpu_available = False
-            self.nvml_initialized = False
+        self.gpu_engine = GPUEngine()
+        self.gpu_available = self.gpu_engine.available
+        self.nvml_initialized = self.gpu_engine.available
+        if self.gpu_available:
+            logger.info(f"GPU monitoring enabled: {len(self.gpu_engine.devices)} NVIDIA GPU(s) detected")
+
+    def _collection_failed(self, section: str, message: str):
+        """Log a failed collection and report it to the error callback"""
+        logger.error(message)
+        if self.on_error:
+            self.on_error(section)
+
+    SECTIONS = (
+        'cpu', 'memory', 'partitions', 'diskIO', 'interfaces', 'networkIO',
+        'gpu', 'temperatures', 'processes'
+    )
 
     def collect_all(self) -> Optional[Dict[str, Any]]:
         """
@@ -72,26 +113,90 @@ class SystemCollector:
             Dictionary containing all metrics or None if collection fails
         """
         try:
-            metrics = {
-                'timestamp': int(time.time() * 1000),
-                'cpu': self.collect_cpu(),
-                'memory': self.collect_memory(),
-                'disk': self.collect_disk(),
-                'network': self.collect_network(),
-                'gpu': self.collect_gpu() if self.gpu_available else {},
-                'temperatures': self.collect_temperatures(),
-                'processes': self.collect_processes()
-            }
-            return metrics
+            sections = {name: func() for name, func in self.get_section_collectors().items()}
+            return self.build_metrics(sections)
         except Exception as e:
-            print(f"Error collecting metrics: {e}")
+            self._collection_failed('all', f"Error collecting metrics: {e}")
             return None
 
+    def get_section_collectors(self) -> Dict[str, Callable[[], Any]]:
+        """
+        Get the individual collectors that make up a full sample.
+
+        Returns:
+            Mapping of section name to collector callable
+        """
+        return {
+            'cpu': self.collect_cpu,
+            'memory': self.collect_memory,
+            'partitions': self.collect_partitions,
+            'diskIO': self._get_disk_io_rates,
+            'interfaces': self.collect_interfaces,
+            'networkIO': self._get_network_io_rates,
+            'gpu': self.collect_gpu if self.gpu_available else dict,
+            'temperatures': self.collect_temperatures,
+            'processes': self.collect_processes
+        }
+
+    @staticmethod
+    def build_metrics(sections: Dict[str, Any],
+                      ages: Optional[Dict[str, int]] = None,
+                      status: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Assemble section values into the metrics payload.
+
+        Args:
+            sections: Section values keyed by name (see SECTIONS)
+            ages: Optional age in milliseconds of each section value
+            status: Optional status of sections whose value is stale
+                ('timeout', 'quarantined' or 'error')
+
+        Returns:
+            Metrics payload dictionary
+        """
+        metrics = {'timestamp': int(time.time() * 1000)}
+
+        for name in ('cpu', 'memory'):
+            if name in sections:
+                metrics[name] = sections[name]
+
+        if 'partitions' in sections or 'diskIO' in sections:
+            metrics['disk'] = {
+                'drives': sections.get('partitions') or [],
+                'io': sections.get('diskIO')
+            }
+
+        if 'interfaces' in sections or 'networkIO' in sections:
+            net_io = sections.get('networkIO')
+            metrics['network'] = {
+                'interfaces': sections.get('interfaces') or [],
+                'stats': net_io['stats'] if net_io else [],
+                'totalRx': net_io['totalRx'] if net_io else 0,
+                'totalTx': net_io['totalTx'] if net_io else 0
+            }
+
+        for name in ('gpu', 'temperatures', 'processes'):
+            if name in sections:
+                metrics[name] = sections[name]
+
+        # Sections from collectors outside SystemCollector are passed through
+        for name, value in sections.items():
+            if name not in SystemCollector.SECTIONS:
+                metrics[name] = value
+
+        if ages is not None:
+            metrics['sectionAge'] = ages
+
+        if status:
+            metrics['sectionStatus'] = dict(status)
+
+        return metrics
+
     def collect_cpu(self) -> Dict[str, Any]:
         """Collect CPU metrics"""
         try:
-            # CPU usage per core
-            cpu_percents = psutil.cpu_percent(interval=0.1, percpu=True)
+            # CPU usage (total, per core and per state) since the last tick
+            cpu_sample = self._cpu_sampler.sample()
 
             # Load averages (Linux/Unix only)
             load_avg = list(psutil.getloadavg()) if hasattr(psutil, 'getloadavg') else [0, 0, 0]
@@ -101,7 +206,9 @@ class SystemCollector:
 
             # CPU info
             cpu_info = {
-                'usage': psutil.cpu_percent(interval=0.1),
+                'usage': cpu_sample['usage'],
+                'perCore': cpu_sample['perCore'],
+                'breakdown': cpu_sample['breakdown'],
                 'loadAverage': load_avg,
                 'cores': psutil.cpu_count(logical=True),
                 'physicalCores': psutil.cpu_count(logical=False),
@@ -114,7 +221,7 @@ class SystemCollector:
             }
             return cpu_info
         except Exception as e:
-            print(f"Error collecting CPU metrics: {e}")
+            self._collection_failed('cpu', f"Error collecting CPU metrics: {e}")
             return {'usage': 0, 'cores': psutil.cpu_count()}
 
     def collect_memory(self) -> Dict[str, Any]:
@@ -136,129 +243,61 @@ class SystemCollector:
                 'percentage': mem.percent
             }
         except Exception as e:
-            print(f"Error collecting memory metrics: {e}")
+            self._collection_failed('memory', f"Error collecting memory metrics: {e}")
             return {'total': 0, 'used': 0, 'percentage': 0}
 
     def collect_disk(self) -> Dict[str, Any]:
         """Collect disk metrics"""
         try:
-            # Get disk partitions
-            partitions = []
-            for part in psutil.disk_partitions(all=False):
-                if part.fstype == 'squashfs':
-                    continue  # Skip snap filesystems
-                try:
-                    usage = psutil.disk_usage(part.mountpoint)
-                    partitions.append({
-                        'device': part.device,
-                        'mountpoint': part.mountpoint,
-                        'fstype': part.fstype,
-                        'total': usage.total,
-                        'used': usage.used,
-                        'free': usage.free,
-                        'usePercent': usage.percent
-                    })
-                except PermissionError:
-                    continue
-
-            # Get disk I/O stats
-            disk_io = self._get_disk_io_rates()
-
             return {
-                'drives': partitions,
-                'io': disk_io
+                'drives': self.collect_partitions(),
+                'io': self._get_disk_io_rates()
             }
         except Exception as e:
-            print(f"Error collecting disk metrics: {e}")
+            self._collection_failed('disk', f"Error collecting disk metrics: {e}")
             return {'drives': [], 'io': {}}
 
-    def _get_disk_io_rates(self) -> Optional[Dict[str, float]]:
-        """Calculate disk I/O rates (bytes/sec)"""
+    def collect_partitions(self) -> List[Dict[str, Any]]:
+        """Collect usage of mounted partitions"""
         try:
-            with self._disk_lock:
-                current_stats = psutil.disk_io_counters()
-                current_time = time.time()
-
-                if self._last_disk_stats is None or self._last_disk_time is None:
-                    self._last_disk_stats = current_stats
-                    self._last_disk_time = current_time
-                    return None
-
-                time_delta = current_time - self._last_disk_time
-                if time_delta <= 0:
-                    return None
-
-                read_bytes = current_stats.read_bytes - self._last_disk_stats.read_bytes
-                write_bytes = current_stats.write_bytes - self._last_disk_stats.write_bytes
-                read_count = current_stats.read_count - self._last_disk_stats.read_count
-                write_count = current_stats.write_count - self._last_disk_stats.write_count
-
-                self._last_disk_stats = current_stats
-                self._last_disk_time = current_time
+            return self.mounts.collect()
+        except Exception as e:
+            self._collection_failed('partitions', f"Error collecting partition metrics: {e}")
+            return []
 
-                return {
-                    'readBytes': max(0, read_bytes),
-                    'writeBytes': max(0, write_bytes),
-                    'readCount': max(0, read_count),
-                    'writeCount': max(0, write_count),
-                    'readBytes_sec': max(0, read_bytes / time_delta),
-                    'writeBytes_sec': max(0, write_bytes / time_delta),
-                    'readCount_sec': max(0, read_count / time_delta),
-                    'writeCount_sec': max(0, write_count / time_delta)
-                }
+    def _get_disk_io_rates(self) -> Optional[Dict[str, Any]]:
+        """Calculate disk I/O rates, in total and per device"""
+        try:
+            with self._disk_lock:
+                return self._disk_sampler.sample()
         except Exception as e:
-            print(f"Error calculating disk I/O rates: {e}")
+            self._collection_failed('diskIO', f"Error calculating disk I/O rates: {e}")
             return None
 
     def collect_network(self) -> Dict[str, Any]:
         """Collect network metrics"""
         try:
-            # Get network interfaces
-            interfaces = []
-            stats_list = []
-
-            for name, addrs in psutil.net_if_addrs().items():
-                iface_info = {
-                    'name': name,
-                    'ip4': None,
-                    'ip6': None,
-                    'mac': None
-                }
-                for addr in addrs:
-                    if addr.family == 2:  # AF_INET
-                        iface_info['ip4'] = addr.address
-                    elif addr.family == 10:  # AF_INET6
-                        iface_info['ip6'] = addr.address
-                    elif addr.family == 17:  # AF_PACKET
-                        iface_info['mac'] = addr.address
-
-                # Get interface stats
-                try:
-                    stats = psutil.net_if_stats()[name]
-                    iface_info.update({
-                        'speed': stats.speed,
-                        'duplex': stats.duplex,
-                        'mtu': stats.mtu,
-                        'isup': stats.isup
-                    })
-                except KeyError:
-                    pass
-
-                interfaces.append(iface_info)
-
             # Get network I/O stats
             net_io = self._get_network_io_rates()
 
             return {
-                'interfaces': interfaces,
+                'interfaces': self.collect_interfaces(),
                 'stats': net_io['stats'] if net_io else [],
                 'totalRx': net_io['totalRx'] if net_io else 0,
                 'totalTx': net_io['totalTx'] if net_io else 0
             }
         except Exception as e:
-            print(f"Error collecting network metrics: {e}")
+            self._collection_failed('network', f"Error collecting network metrics: {e}")
             return {'interfaces': [], 'stats': [], 'totalRx': 0, 'totalTx': 0}
 
+    def collect_interfaces(self) -> List[Dict[str, Any]]:
+        """Collect network interface metadata"""
+        try:
+            return self.interfaces.refresh()
+        except Exception as e:
+            self._collection_failed('interfaces', f"Error collecting network interfaces: {e}")
+            return []
+
     def _get_network_io_rates(self) -> Optional[Dict[str, Any]]:
         """Calculate network I/O rates (bytes/sec)"""
         try:
@@ -290,6 +329,9 @@ class SystemCollector:
                     total_rx += rx_bytes
                     total_tx += tx_bytes
 
+                    if not self.interfaces.matches(name):
+                        continue
+
                     stats_list.append({
                         'iface': name,
                         'rx_bytes': stats.bytes_recv,
@@ -309,7 +351,7 @@ class SystemCollector:
                     'totalTx': total_tx / time_delta if time_delta > 0 else 0
                 }
         except Exception as e:
-            print(f"Error calculating network I/O rates: {e}")
+            self._collection_failed('networkIO', f"Error calculating network I/O rates: {e}")
             return None
 
     def collect_gpu(self) -> Dict[str, Any]:
@@ -318,78 +360,35 @@ class SystemCollector:
             return {'controllers': [], 'count': 0, 'avgUsage': 0}
 
         try:
-            device_count = pynvml.nvmlDeviceGetCount()
+            devices = self.gpu_engine.devices
+            readings = self.gpu_engine.read()
             controllers = []
             total_vram = 0
             total_vram_used = 0
             total_usage = 0
             max_temp = 0
 
-            for i in range(device_count):
-                handle = pynvml.nvmlDeviceGetHandleByIndex(i)
-
-                # Get GPU name
-                name = pynvml.nvmlDeviceGetName(handle)
-
-                # Get memory info
-                mem_info = pynvml.nvmlDeviceGetMemoryInfo(handle)
-                vram_total = mem_info.total
-                vram_used = mem_info.used
-                vram_free = mem_info.free
-
-                # Get utilization
-                utilization = pynvml.nvmlDeviceGetUtilizationRates(handle)
-                gpu_util = utilization.gpu
-                mem_util = utilization.memory
-
-                # Get temperature
-                try:
-                    temp = pynvml.nvmlDeviceGetTemperature(handle, pynvml.NVML_TEMPERATURE_GPU)
-                except:
-                    temp = 0
-
-                # Get power usage
-                try:
-                    power = pynvml.nvmlDeviceGetPowerUsage(handle) / 1000  # Convert to watts
-                except:
-                    power = 0
-
-                # Get fan speed
-                try:
-                    fan = pynvml.nvmlDeviceGetFanSpeed(handle)
-                except:
-                    fan = 0
-
-                # Get clock speeds
-                try:
-                    clock_graphics = pynvml.nvmlDeviceGetClockInfo(handle, pynvml.NVML_CLOCK_GRAPHICS)
-                    clock_memory = pynvml.nvmlDeviceGetClockInfo(handle, pynvml.NVML_CLOCK_MEM)
-                except:
-                    clock_graphics = 0
-                    clock_memory = 0
+            for device, reading in zip(devices, readings):
+                vram_total = device.vram
+                vram_used = reading['vramUsed']
 
                 controllers.append({
                     'vendor': 'NVIDIA',
-                    'model': name.decode('utf-8') if isinstance(name, bytes) else name,
-                    'index': i,
+                    'model': device.name,
+                    'index': device.index,
                     'vram': vram_total,
-                    'vramUsed': vram_used,
-                    'vramFree': vram_free,
                     'vramPercentage': (vram_used / vram_total * 100) if vram_total > 0 else 0,
-                    'usage': gpu_util,
-                    'memoryUsage': mem_util,
-                    'temperature': temp,
-                    'powerUsage': power,
-                    'fanSpeed': fan,
-                    'clockSpeed': clock_graphics,
-                    'memoryClockSpeed': clock_memory
+                    'clockSpeedMax': device.clock_max,
+                    'memoryClockSpeedMax': device.memory_clock_max,
+                    **reading
                 })
 
                 total_vram += vram_total
                 total_vram_used += vram_used
-                total_usage += gpu_util
-                max_temp = max(max_temp, temp)
+                total_usage += reading['usage']
+                max_temp = max(max_temp, reading['temperature'])
 
+            device_count = len(controllers)
             avg_usage = total_usage / device_count if device_count > 0 else 0
 
             return {
@@ -400,12 +399,31 @@ class SystemCollector:
                 'vramPercentage': (total_vram_used / total_vram * 100) if total_vram > 0 else 0,
                 'avgUsage': avg_usage,
                 'maxTemperature': max_temp,
-                'count': device_count
+                'count': device_count,
+                'topProcesses': self._collect_gpu_processes()
             }
         except Exception as e:
-            print(f"Error collecting GPU metrics: {e}")
+            self._collection_failed('gpu', f"Error collecting GPU metrics: {e}")
             return {'controllers': [], 'count': 0, 'avgUsage': 0}
 
+    def _collect_gpu_processes(self) -> List[Dict[str, Any]]:
+        """Get the top GPU consumers by VRAM held, joined with process names"""
+        try:
+            usage = self.gpu_engine.read_processes()
+        except Exception as e:
+            self._collection_failed('gpuProcesses', f"Error collecting GPU process metrics: {e}")
+            return []
+
+        top = heapq.nlargest(
+            self._process_scanner.top_k, usage.values(),
+            key=lambda p: (p['gpuMemory'], p['smUtil'])
+        )
+        names = self._process_scanner.describe([p['pid'] for p in top])
+        return [
+            {**p, **names.get(p['pid'], {'name': 'unknown', 'user': 'unknown'})}
+            for p in top
+        ]
+
     def collect_temperatures(self) -> Dict[str, Any]:
         """Collect temperature metrics"""
         try:
@@ -427,18 +445,9 @@ class SystemCollector:
             # Get CPU temp from GPU collector (more accurate)
             cpu_temp = 0
             if self.gpu_available and self.nvml_initialized:
-                try:
-                    # Try to get CPU temp from NVML (for Jetson devices)
-                    device_count = pynvml.nvmlDeviceGetCount()
-                    for i in range(device_count):
-                        handle = pynvml.nvmlDeviceGetHandleByIndex(i)
-                        try:
-                            temp = pynvml.nvmlDeviceGetTemperature(handle, pynvml.NVML_TEMPERATURE_GPU)
-                            cpu_temp = max(cpu_temp, temp)
-                        except:
-                            pass
-                except:
-                    pass
+                # Try to get CPU temp from NVML (for Jetson devices), reusing the GPU reading
+                for reading in self.gpu_engine.read():
+                    cpu_temp = max(cpu_temp, reading['temperature'])
 
             # Max temperature
             max_temp = 0
@@ -458,54 +467,15 @@ class SystemCollector:
                 'cores': temps.get('core', {}).get('cores', []) if isinstance(temps.get('core'), dict) else []
             }
         except Exception as e:
-            print(f"Error collecting temperature metrics: {e}")
+            self._collection_failed('temperatures', f"Error collecting temperature metrics: {e}")
             return {'cpu': 0, 'sensors': {}, 'max': 0}
 
     def collect_processes(self) -> Dict[str, Any]:
         """Collect process information"""
         try:
-            procs = []
-            status_counts = {}
-
-            # Iterate through all processes
-            for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent', 'username', 'status']):
-                try:
-                    pinfo = proc.info
-                    if pinfo.get('name') is None:
-                        continue
-
-                    # Count by status
-                    status = pinfo.get('status', 'unknown')
-                    status_counts[status] = status_counts.get(status, 0) + 1
-
-                    procs.append({
-                        'pid': pinfo.get('pid'),
-                        'name': pinfo.get('name'),
-                        'cpu': pinfo.get('cpu_percent', 0) or 0,
-                        'memory': pinfo.get('memory_percent', 0) or 0,
-                        'user': pinfo.get('username', 'unknown'),
-                        'status': status
-                    })
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
-
-            # Sort by CPU
-            top_cpu = sorted(procs, key=lambda p: p['cpu'], reverse=True)[:10]
-
-            # Sort by memory
-            top_mem = sorted(procs, key=lambda p: p['memory'], reverse=True)[:10]
-
-            return {
-                'total': len(procs),
-                'running': status_counts.get('running', 0),
-                'sleeping': status_counts.get('sleeping', 0),
-                'stopped': status_counts.get('stopped', 0),
-                'zombie': status_counts.get('zombie', 0),
-                'topByCPU': top_cpu,
-                'topByMemory': top_mem
-            }
+            return self._process_scanner.scan()
         except Exception as e:
-            print(f"Error collecting process metrics: {e}")
+            self._collection_failed('processes', f"Error collecting process metrics: {e}")
             return {'total': 0, 'topByCPU': [], 'topByMemory': []}
 
     def get_system_info(self) -> Dict[str, Any]:
@@ -532,7 +502,7 @@ class SystemCollector:
                 'uptime': time.time() - boot_time
             }
         except Exception as e:
-            print(f"Error getting system info: {e}")
+            self._collection_failed('systemInfo', f"Error getting system info: {e}")
             return {}
 
 
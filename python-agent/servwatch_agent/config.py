@@ -22,7 +22,9 @@ class Config:
             'name': None,
             'collectInterval': 1000,
             'transmitInterval': 1000,
-            'enableGPU': True
+            'enableGPU': True,
+            'mode': 'thread',  # 'thread' or 'asyncio'
+            'debugDumpPath': None  # File the agent statistics are written to on SIGUSR1
         },
         'metrics': {
             'cpu': True,
@@ -31,7 +33,114 @@ class Config:
             'network': True,
             'gpu': True,
             'temperatures': True,
-            'processes': True
+            'processes': True,
+            'cgroups': True,
+            'pressure': True,
+            'agent': True  # The agent's own overhead and transmit health
+        },
+        'highResolution': {
+            'enabled': False,
+            'interval': 100
+        },
+        'transmitter': {
+            'deltaEncoding': False,
+            'keyframeInterval': 30,
+            'binaryFormat': False,
+            'batching': False,
+            'batchMaxCount': 50,
+            'batchMaxBytes': 262144,
+            'batchLinger': 1000,
+            'spoolPath': None,
+            'spoolMaxBytes': 67108864,
+            'spoolSegmentBytes': 4194304,
+            'spoolFsync': 'interval',
+            'spoolFsyncInterval': 1000,
+            'acknowledged': False,
+            'ackTimeout': 5000,
+            'maxInFlight': 100,
+            'backfillRate': 20,
+            'backfillBurst': 20
+        },
+        # Pull-mode OpenMetrics/Prometheus endpoint, serves the latest sample
+        'exporter': {
+            'enabled': False,
+            'host': '127.0.0.1',
+            'port': 9464,
+            'path': '/metrics'
+        },
+        # Alert rules evaluated by the agent, replaced by rule sets the server pushes (agent:alertRules)
+        'alerts': {
+            'enabled': False,  # Off until the backend handles alert:event
+            'rules': []
+        },
+        # Back off collection and skip transmissions while metrics stay within their deadbands
+        'adaptive': {
+            'enabled': False,
+            'deadbands': None,  # Field path -> band, e.g. {'cpu.usage': 2, 'network.totalRx': '20%'}; None = defaults
+            'maxInterval': 10000,
+            'backoff': 2.0,
+            'quietTicks': 5,
+            'heartbeat': 60000
+        },
+        # In-agent history of numeric series (1s raw, 10s and 60s rollups) with a local query API
+        'store': {
+            'enabled': False,
+            'host': '127.0.0.1',
+            'port': 9465,
+            'socket': None,  # Unix socket path, used instead of host/port when set
+            'rawRetention': 3600,
+            'rollup10Retention': 21600,
+            'rollup60Retention': 86400,
+            'maxBytes': None,  # None = sized from the host's CPU and cgroup counts
+            'include': []  # Glob patterns of series keys, empty = all
+        },
+        'partitions': {
+            'includeFstypes': [],  # Empty = block-device filesystems, add e.g. 'nfs4' for network mounts
+            'excludeFstypes': ['squashfs'],
+            'excludeMountpoints': [],  # Glob patterns, e.g. ['/var/lib/docker/*']
+            'statTimeout': 2000,
+            'statWorkers': 4
+        },
+        'diskIO': {
+            'partitions': False,  # Report partitions as well as whole disks
+            'exclude': ['loop*', 'ram*', 'zram*']  # Add 'dm-*' to hide device-mapper volumes
+        },
+        'network': {
+            'include': [],  # Glob patterns, e.g. ['eth*', 'ens*']
+            'exclude': [],  # e.g. ['veth*', 'cali*'], still counted in totals
+            # Leave network.interfaces out while unchanged; only for receivers that keep the last list
+            'omitUnchanged': False,
+            'interfacesRefresh': 60000  # Full list at least this often (ms) when omitting
+        },
+        'cgroups': {
+            'root': '/sys/fs/cgroup',
+            'maxCgroups': 50,
+            'rescanInterval': 30000
+        },
+        # Collectors run concurrently; a section missing its deadline (ms) is sent stale
+        'collectors': {
+            'workers': 4,  # Free collector threads, 0 = one after another, without deadlines or quarantine
+            'deadline': None,  # Default deadline, None = collectInterval
+            # Per-section deadlines, well above the time a large process table or mount list takes
+            'deadlines': {'processes': 30000, 'partitions': 30000, 'cgroups': 30000},
+            'quarantineAfter': 3,
+            'quarantineBackoff': 30000,
+            'quarantineMax': 600000
+        },
+        # Per-section collection intervals (ms); sections run at most once per
+        # collectInterval tick and reuse their cached value in between
+        'schedule': {
+            'cpu': 1000,
+            'memory': 1000,
+            'diskIO': 1000,
+            'networkIO': 1000,
+            'gpu': 1000,
+            'temperatures': 5000,
+            'processes': 5000,
+            'cgroups': 1000,
+            'pressure': 1000,
+            'partitions': 60000,
+            'interfaces': 60000
         },
         'logging': {
             'level': 'INFO',
@@ -112,12 +221,17 @@ class Config:
         if os.getenv('TRANSMIT_INTERVAL'):
             config['agent']['transmitInterval'] = int(os.getenv('TRANSMIT_INTERVAL'))
 
+        # Agent mode
+        if os.getenv('AGENT_MODE'):
+            config['agent']['mode'] = os.getenv('AGENT_MODE')
+
         # GPU enablement
         if os.getenv('ENABLE_GPU'):
             config['agent']['enableGPU'] = os.getenv('ENABLE_GPU').lower() == 'true'
 
         # Metrics
-        for metric in ['cpu', 'memory', 'disk', 'network', 'gpu', 'temperatures', 'processes']:
+        for metric in ['cpu', 'memory', 'disk', 'network', 'gpu', 'temperatures', 'processes', 'cgroups',
+                       'pressure', 'agent']:
             env_var = f'METRIC_{metric.upper()}'
             if os.getenv(env_var):
                 config['metrics'][metric] = os.getenv(env_var).lower() == 'true'
@@ -0,0 +1,316 @@
+"""
+Collector Scheduler
+Runs each metric collector on its own interval and caches results in between
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Callable, Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Section status values, reported for sections that are not fresh
+TIMEOUT = 'timeout'
+QUARANTINED = 'quarantined'
+ERROR = 'error'
+
+
+class _Task:
+    """Scheduling state for a single collector"""
+
+    __slots__ = ('name', 'func', 'interval', 'deadline', 'next_due', 'value', 'collected_at',
+                 'future', 'misses', 'quarantines', 'quarantined_until')
+
+    def __init__(self, name: str, func: Callable[[], Any], interval: float, deadline: float):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.deadline = deadline
+        self.next_due = 0.0
+        self.value = None
+        self.collected_at: Optional[float] = None
+        # Concurrent mode: run still in progress, consecutive deadline misses, quarantine state
+        self.future: Optional[Future] = None
+        self.misses = 0
+        self.quarantines = 0
+        self.quarantined_until = 0.0
+
+
+class _DaemonPool:
+    """
+    Minimal growable thread pool on daemon threads.
+
+    Unlike ThreadPoolExecutor, whose workers are joined at interpreter exit,
+    a collector stuck in a sensor or driver call cannot keep the agent from
+    shutting down.
+    """
+
+    def __init__(self, workers: int):
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._threads = 0
+        self.grow(workers)
+
+    def grow(self, workers: int):
+        """Start threads until the pool has at least this many"""
+        while self._threads < workers:
+            threading.Thread(target=self._work, name=f'collector-{self._threads}', daemon=True).start()
+            self._threads += 1
+
+    @property
+    def size(self) -> int:
+        """Number of worker threads started"""
+        return self._threads
+
+    def submit(self, func: Callable[[], Any]) -> Future:
+        future = Future()
+        self._queue.put((future, func))
+        return future
+
+    def _work(self):
+        while True:
+            future, func = self._queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func())
+            except BaseException as e:
+                future.set_exception(e)
+
+
+class CollectorScheduler:
+    """
+    Tiered collector scheduler.
+
+    Every call to run() executes only the collectors whose interval has
+    elapsed. The others return the value cached from their last run, together
+    with its age, so slow-changing sections (process table, mounts,
+    interfaces) are not re-collected on every tick.
+
+    A collector that raises keeps its last value, is marked 'error' in
+    status and is retried on the next tick.
+
+    With workers > 0 the due collectors run concurrently on a pool of daemon
+    threads, and run() waits for each only until its deadline. A collector
+    that misses it keeps running in the background; the tick returns its
+    last value marked 'timeout' in status, and the collector is not started
+    again until that run finishes, whose result is then used and dated by
+    when it finished. The pool keeps `workers` threads free for new runs
+    and starts one more for every run still outstanding, so hung collectors
+    never hold up the others.
+    After quarantine_after consecutive misses a collector is quarantined and
+    skipped for quarantine_backoff seconds. A miss right after a quarantine
+    quarantines it again for twice as long, up to quarantine_max; completing
+    within the deadline clears the record.
+    """
+
+    def __init__(self, collectors: Dict[str, Callable[[], Any]],
+                 intervals: Optional[Dict[str, float]] = None,
+                 default_interval: float = 1.0,
+                 observer: Optional[Callable[[str, float], None]] = None,
+                 on_error: Optional[Callable[[str], None]] = None,
+                 workers: int = 0,
+                 deadlines: Optional[Dict[str, float]] = None,
+                 default_deadline: Optional[float] = None,
+                 quarantine_after: int = 3,
+                 quarantine_backoff: float = 30.0,
+                 quarantine_max: float = 600.0):
+        """
+        Initialize the scheduler.
+
+        Args:
+            collectors: Mapping of section name to collector callable
+            intervals: Optional mapping of section name to interval in seconds
+            default_interval: Interval for sections without an explicit one
+            observer: Optional callable receiving (section name, wall time in
+                seconds) after every collector run
+            on_error: Optional callable receiving the section name whenever a
+                collector raises or misses its deadline
+            workers: Collector threads kept free for new runs, 0 runs collectors
+                one after another on the calling thread without deadlines
+            deadlines: Optional mapping of section name to deadline in seconds
+            default_deadline: Deadline for sections without an explicit one
+                (defaults to default_interval)
+            quarantine_after: Consecutive deadline misses before quarantine
+            quarantine_backoff: First quarantine duration in seconds
+            quarantine_max: Longest quarantine duration in seconds
+        """
+        intervals = intervals or {}
+        deadlines = deadlines or {}
+        if default_deadline is None:
+            default_deadline = default_interval
+        self.observer = observer
+        self.on_error = on_error
+        self.tasks = [
+            _Task(name, func, max(0.0, intervals.get(name, default_interval)),
+                  max(0.0, deadlines.get(name, default_deadline)))
+            for name, func in collectors.items()
+        ]
+        self.quarantine_after = max(1, quarantine_after)
+        self.quarantine_backoff = quarantine_backoff
+        self.quarantine_max = max(quarantine_backoff, quarantine_max)
+        self.status: Dict[str, str] = {}
+        self.workers = workers
+        self._pool = _DaemonPool(workers) if workers > 0 else None
+
+    def run(self, now: Optional[float] = None) -> Tuple[Dict[str, Any], Dict[str, int]]:
+        """
+        Run all due collectors.
+
+        Args:
+            now: Optional monotonic timestamp (defaults to time.monotonic())
+
+        Returns:
+            Tuple of (section values, section ages in milliseconds). Sections
+            that timed out, failed or are quarantined are listed in
+            self.status and, once collected before, keep their last value;
+            sections never collected yet are left out.
+        """
+        if now is None:
+            now = time.monotonic()
+        if self._pool is not None:
+            self._run_concurrent(now)
+        else:
+            for task in self.tasks:
+                if task.collected_at is None or now >= task.next_due or task.name in self.status:
+                    self._run_sequential(task, now)
+
+        values = {}
+        ages = {}
+        for task in self.tasks:
+            if task.collected_at is None:
+                continue
+            values[task.name] = task.value
+            ages[task.name] = int((now - task.collected_at) * 1000)
+        return values, ages
+
+    def _run_sequential(self, task: _Task, now: float):
+        """Run a collector on the calling thread, keeping its last value if it fails"""
+        start = time.perf_counter()
+        try:
+            task.value = task.func()
+        except Exception as e:
+            self._failed(task, e)
+            return
+        self.status.pop(task.name, None)
+        self._collected(task, now, time.perf_counter() - start)
+
+    def _collected(self, task: _Task, now: float, elapsed: float):
+        """Record a run that finished at time now and schedule the next one"""
+        if self.observer is not None:
+            self.observer(task.name, elapsed)
+        task.collected_at = now
+        # Advance on the original grid so the schedule does not drift
+        if task.interval > 0 and now - task.next_due < task.interval:
+            task.next_due += task.interval
+        else:
+            task.next_due = now + task.interval
+
+    @staticmethod
+    def _timed(func: Callable[[], Any]) -> Callable[[], Tuple[Any, float, float]]:
+        def call():
+            start = time.perf_counter()
+            value = func()
+            return value, time.perf_counter() - start, time.monotonic()
+        return call
+
+    def _harvest(self, task: _Task, now: float, late: bool = False):
+        """Take the result of a task's finished run; late runs do not clear its misses"""
+        future, task.future = task.future, None
+        try:
+            task.value, elapsed, finished = future.result()
+        except Exception as e:
+            self._failed(task, e)
+            # Retried on the next tick rather than after a full interval
+            return
+        if not late:
+            task.misses = 0
+            task.quarantines = 0
+        self.status.pop(task.name, None)
+        if late:
+            # Date the value by when the run finished, possibly ticks ago
+            now -= max(0.0, time.monotonic() - finished)
+        self._collected(task, now, elapsed)
+
+    def _failed(self, task: _Task, error: Exception):
+        """Account for a run that raised"""
+        logger.error(f"Collector {task.name} failed: {error}")
+        self.status[task.name] = ERROR
+        if self.on_error is not None:
+            self.on_error(task.name)
+
+    def _missed(self, task: _Task, now: float):
+        """Account for a run that is still going at its deadline"""
+        self.status[task.name] = TIMEOUT
+        task.misses += 1
+        if self.on_error is not None:
+            self.on_error(task.name)
+        # Once quarantined, a single further miss quarantines again for longer
+        if task.misses >= (1 if task.quarantines else self.quarantine_after):
+            backoff = min(self.quarantine_backoff * 2 ** task.quarantines, self.quarantine_max)
+            task.quarantines += 1
+            task.misses = 0
+            task.quarantined_until = now + backoff
+            self.status[task.name] = QUARANTINED
+            logger.warning(f"Collector {task.name} keeps missing its {task.deadline * 1000:.0f}ms deadline, "
+                           f"quarantined for {backoff:.0f}s")
+
+    def _run_concurrent(self, now: float):
+        """Run the due collectors on the pool, waiting for each until its deadline"""
+        start = time.perf_counter()
+        self._grow()
+        waiting: Dict[Future, _Task] = {}
+        for task in self.tasks:
+            quarantined = now < task.quarantined_until
+            if task.future is not None:
+                # A run that missed an earlier deadline
+                if task.future.done():
+                    self._harvest(task, now, late=True)
+                else:
+                    if quarantined:
+                        self.status[task.name] = QUARANTINED
+                    else:
+                        self._missed(task, now)
+                    continue
+            if quarantined:
+                self.status[task.name] = QUARANTINED
+                continue
+            if task.collected_at is None or now >= task.next_due or task.name in self.status:
+                task.future = self._pool.submit(self._timed(task.func))
+                waiting[task.future] = task
+
+        while waiting:
+            elapsed = time.perf_counter() - start
+            timeout = max(0.0, min(task.deadline for task in waiting.values()) - elapsed)
+            done, _ = wait(waiting, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                self._harvest(waiting.pop(future), now)
+            elapsed = time.perf_counter() - start
+            missed = False
+            for future, task in list(waiting.items()):
+                if elapsed >= task.deadline:
+                    del waiting[future]
+                    self._missed(task, now)
+                    missed = True
+            if missed:
+                # Runs queued behind the hung ones start now instead of next tick
+                self._grow()
+
+    def _grow(self):
+        """Keep a free worker for every run a hung collector is still holding"""
+        hung = sum(1 for task in self.tasks if task.future is not None and not task.future.done())
+        self._pool.grow(self.workers + hung)
+
+    def invalidate(self, name: Optional[str] = None):
+        """
+        Force a collector (or all collectors) to run on the next tick.
+
+        Args:
+            name: Section name, or None for every section
+        """
+        for task in self.tasks:
+            if name is None or task.name == name:
+                task.next_due = 0.0
+                task.quarantined_until = 0.0
@@ -0,0 +1,186 @@
+"""
+Agent Self-Instrumentation
+Tracks the agent's own collector timings, tick overruns and resource usage
+"""
+
+import threading
+import time
+from typing import Dict, Optional, Any
+
+import psutil
+
+
+class TimingRing:
+    """
+    Durations of the most recent runs of one operation.
+
+    Recording is a single list store; percentiles are only computed when a
+    snapshot is taken, over the last `size` durations.
+    """
+
+    __slots__ = ('_values', '_index', 'count', 'last', 'total')
+
+    def __init__(self, size: int = 128):
+        self._values = [0.0] * size
+        self._index = 0
+        self.count = 0
+        self.last = 0.0
+        self.total = 0.0
+
+    def add(self, seconds: float):
+        """Record one duration"""
+        self._values[self._index] = seconds
+        self._index = (self._index + 1) % len(self._values)
+        self.count += 1
+        self.last = seconds
+        self.total += seconds
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Summarize the recorded durations.
+
+        Returns:
+            Dictionary with last, p99 and max over the recent runs (ms), and
+            the total run count
+        """
+        recent = sorted(self._values[:min(self.count, len(self._values))])
+        if not recent:
+            return {'last': 0.0, 'p99': 0.0, 'max': 0.0, 'count': 0}
+        return {
+            'last': self.last * 1000,
+            'p99': recent[min(len(recent) - 1, int(len(recent) * 0.99))] * 1000,
+            'max': recent[-1] * 1000,
+            'count': self.count
+        }
+
+
+class AgentStats:
+    """
+    Measures the agent's own overhead.
+
+    The scheduler reports the wall time of every collector run and the
+    collection loop reports tick durations; both cost two clock reads per
+    run. The agent's CPU time and RSS are only read when a snapshot is
+    taken, once per transmission. Collection failures are counted per
+    section. Transmit health (buffer depth, emit latency, reconnects,
+    dropped samples) comes from the transmitter.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.collectors: Dict[str, TimingRing] = {}
+        self.tick = TimingRing()
+        self.ticks = 0
+        self.overruns = 0
+        self.errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._process = psutil.Process()
+        self._last_cpu: Optional[float] = None
+        self._last_time: Optional[float] = None
+
+    def record_collector(self, name: str, seconds: float):
+        """
+        Record one collector run.
+
+        Args:
+            name: Section name
+            seconds: Wall time of the run
+        """
+        ring = self.collectors.get(name)
+        if ring is None:
+            with self._lock:
+                ring = self.collectors.setdefault(name, TimingRing())
+        ring.add(seconds)
+
+    def record_tick(self, seconds: float, overrun: bool):
+        """
+        Record one collection tick.
+
+        Args:
+            seconds: Wall time of the tick (collection and transmission)
+            overrun: Whether the tick missed the next tick's deadline
+        """
+        self.tick.add(seconds)
+        self.ticks += 1
+        if overrun:
+            self.overruns += 1
+
+    def record_error(self, name: str):
+        """
+        Count one failed collection.
+
+        Args:
+            name: Section (or sampler) whose collection failed
+        """
+        with self._lock:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def _resources(self, advance: bool = True) -> Dict[str, Any]:
+        """The agent process's CPU time, CPU share since the last snapshot and RSS"""
+        with self._process.oneshot():
+            times = self._process.cpu_times()
+            rss = self._process.memory_info().rss
+            threads = self._process.num_threads()
+        cpu = times.user + times.system
+        now = time.monotonic()
+        with self._lock:
+            percent = 0.0
+            if self._last_time is not None and now > self._last_time:
+                percent = max(0.0, cpu - self._last_cpu) / (now - self._last_time) * 100
+            if advance:
+                self._last_cpu, self._last_time = cpu, now
+        return {
+            'cpuSeconds': cpu,
+            'cpuPercent': percent,
+            'rss': rss,
+            'threads': threads
+        }
+
+    def snapshot(self, transmitter=None) -> Dict[str, Any]:
+        """
+        Build the 'agent' payload section.
+
+        The next snapshot's cpuPercent is measured from this one.
+
+        Args:
+            transmitter: Optional transmitter whose health is included
+
+        Returns:
+            Dictionary with uptime, resource usage, tick and per-collector
+            timings, collection error counts and, with a transmitter, its
+            transmit statistics
+        """
+        return self._section(transmitter, advance=True)
+
+    def view(self, transmitter=None) -> Dict[str, Any]:
+        """
+        Build the same section as snapshot() without starting a new CPU interval.
+
+        For readers outside the payload (scrapes, SIGUSR1 dumps), so that they
+        do not shorten the interval the payload's cpuPercent is measured over.
+
+        Args:
+            transmitter: Optional transmitter whose health is included
+
+        Returns:
+            Dictionary as returned by snapshot()
+        """
+        return self._section(transmitter, advance=False)
+
+    def _section(self, transmitter, advance: bool) -> Dict[str, Any]:
+        """Build the agent section, optionally moving the CPU reference point"""
+        with self._lock:
+            collectors = dict(self.collectors)
+            errors = dict(self.errors)
+        section = {
+            'uptime': int(time.monotonic() - self.started),
+            **self._resources(advance),
+            'ticks': self.ticks,
+            'tickOverruns': self.overruns,
+            'tick': self.tick.summary(),
+            'collectors': {name: ring.summary() for name, ring in collectors.items()},
+            'collectionErrors': errors
+        }
+        if transmitter is not None:
+            section['transmit'] = transmitter.get_stats()
+        return section
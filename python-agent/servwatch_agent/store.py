@@ -0,0 +1,470 @@
+"""
+Ring Store
+In-memory time-series store with 10s/60s rollups and a local query API
+"""
+
+import fnmatch
+import json
+import logging
+import math
+import os
+import threading
+import time
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from typing import Dict, Iterable, List, Optional, Any, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from servwatch_agent.transmitters.openmetrics import build_families
+
+logger = logging.getLogger(__name__)
+
+AGGREGATES = ('avg', 'min', 'max', 'sum', 'last', 'count')
+
+# Bytes per slot: raw tiers keep one double, rollup tiers min/max/sum doubles and a uint32 count
+_RAW_SLOT_BYTES = 8
+_ROLLUP_SLOT_BYTES = 28
+
+
+def series_samples(sections: Dict[str, Any]) -> List[Tuple[str, float]]:
+    """
+    Flatten collector sections into series samples.
+
+    Args:
+        sections: Section values as returned by CollectorScheduler.run()
+
+    Returns:
+        (key, value) pairs, keyed like the metrics endpoint's samples, e.g.
+        'disk_read_bytes_per_second{device="sda"}'
+    """
+    samples = []
+    for name, _kind, _help, family in build_families(sections).families:
+        for labels, value in family:
+            if labels:
+                name_labels = ','.join(f'{key}="{label}"' for key, label in labels)
+                samples.append((f'{name}{{{name_labels}}}', value))
+            else:
+                samples.append((name, value))
+    return samples
+
+
+def series_bytes(tiers: Iterable[Tuple[int, int]]) -> int:
+    """
+    Memory one series takes in a store.
+
+    Args:
+        tiers: (step, retention) pairs in seconds, finest first
+
+    Returns:
+        Bytes of the series' arrays in all tiers
+    """
+    return sum(
+        max(1, int(retention // step)) * (_RAW_SLOT_BYTES if i == 0 else _ROLLUP_SLOT_BYTES)
+        for i, (step, retention) in enumerate(tiers)
+    )
+
+
+class _Tier:
+    """One resolution: a ring of `size` buckets of `step` seconds"""
+
+    __slots__ = ('index', 'step', 'size', 'raw', 'buckets')
+
+    def __init__(self, index: int, step: int, size: int, raw: bool):
+        self.index = index
+        self.step = step
+        self.size = size
+        self.raw = raw
+        # Absolute bucket number (time // step) held by each slot, -1 when empty
+        self.buckets = array('q', [-1]) * size
+
+    @property
+    def retention(self) -> int:
+        return self.step * self.size
+
+    @property
+    def slot_bytes(self) -> int:
+        return _RAW_SLOT_BYTES if self.raw else _ROLLUP_SLOT_BYTES
+
+
+class _Series:
+    """
+    Preallocated arrays of one series in every tier.
+
+    Slots are cleared lazily: a write to a newer bucket clears the slots of
+    the buckets the series skipped, and a slot of a bucket newer than the
+    series' last write is read as empty, so starting a bucket costs nothing
+    for series that are not written.
+    """
+
+    __slots__ = ('arrays', 'buckets', 'last_seen')
+
+    def __init__(self, tiers: List[_Tier]):
+        # Last bucket written in each tier, -1 before the first write
+        self.buckets = array('q', [-1]) * len(tiers)
+        self.arrays = []
+        for tier in tiers:
+            if tier.raw:
+                self.arrays.append(array('d', [math.nan]) * tier.size)
+            else:
+                self.arrays.append((
+                    array('d', [math.inf]) * tier.size,    # min
+                    array('d', [-math.inf]) * tier.size,   # max
+                    array('d', [0.0]) * tier.size,         # sum
+                    array('I', [0]) * tier.size            # count
+                ))
+        self.last_seen = 0.0
+
+    def clear(self, tier: _Tier, slot: int):
+        if tier.raw:
+            self.arrays[tier.index][slot] = math.nan
+        else:
+            low, high, total, count = self.arrays[tier.index]
+            low[slot] = math.inf
+            high[slot] = -math.inf
+            total[slot] = 0.0
+            count[slot] = 0
+
+    def advance(self, tier: _Tier, bucket: int):
+        """Clear the slots of the buckets skipped since the last write, up to bucket"""
+        last = self.buckets[tier.index]
+        if bucket <= last:
+            return
+        if last >= 0:
+            for skipped in range(max(last + 1, bucket - tier.size + 1), bucket + 1):
+                self.clear(tier, skipped % tier.size)
+        self.buckets[tier.index] = bucket
+
+    def write(self, tier: _Tier, slot: int, value: float):
+        if tier.raw:
+            self.arrays[tier.index][slot] = value
+        else:
+            low, high, total, count = self.arrays[tier.index]
+            if value < low[slot]:
+                low[slot] = value
+            if value > high[slot]:
+                high[slot] = value
+            total[slot] += value
+            count[slot] += 1
+
+    def read(self, tier: _Tier, bucket: int) -> Optional[Tuple[float, float, float, int]]:
+        """(min, max, sum, count) of a bucket, or None if it holds no sample"""
+        if bucket > self.buckets[tier.index]:
+            return None  # Not written since the slot was reused
+        slot = bucket % tier.size
+        if tier.raw:
+            value = self.arrays[tier.index][slot]
+            return None if value != value else (value, value, value, 1)
+        low, high, total, count = self.arrays[tier.index]
+        if not count[slot]:
+            return None
+        return low[slot], high[slot], total[slot], count[slot]
+
+
+class RingStore:
+    """
+    Fixed-memory store of numeric time series.
+
+    Every series gets preallocated arrays for each tier when it first
+    appears: by default one value per second for an hour, and min/max/sum/
+    count per 10 s for six hours and per 60 s for a day. A write updates all
+    tiers at once, so the rollups need no separate downsampling pass. The
+    tiers' slot rings are shared by all series, and each series clears a
+    slot when it next writes after the slot's bucket came around again, so
+    the cost of a write does not grow with the number of series. Memory is bounded by max_bytes: series beyond
+    the budget are not stored, except in place of series that have not been
+    written for longer than the longest retention.
+    """
+
+    def __init__(self, tiers: Iterable[Tuple[int, int]] = ((1, 3600), (10, 21600), (60, 86400)),
+                 max_bytes: int = 32 * 1024 * 1024, include: Optional[List[str]] = None):
+        """
+        Initialize the store.
+
+        Args:
+            tiers: (step, retention) pairs in seconds, finest first; the first
+                tier keeps raw values, the others rollups
+            max_bytes: Memory budget of all series arrays
+            include: Glob patterns of series to store (default all)
+        """
+        self.tiers = [
+            _Tier(i, int(step), max(1, int(retention // step)), i == 0)
+            for i, (step, retention) in enumerate(tiers)
+        ]
+        self.include = list(include or [])
+        self.series_bytes = sum(tier.size * tier.slot_bytes for tier in self.tiers)
+        self.max_series = max(0, int(max_bytes // self.series_bytes))
+        self.series: Dict[str, _Series] = {}
+        self.rejected = 0
+        self._excluded = set()
+        self._next_eviction = 0.0
+        self._lock = threading.Lock()
+
+    def _accepts(self, key: str) -> bool:
+        if key in self._excluded:
+            return False
+        if not self.include or any(fnmatch.fnmatchcase(key, p) for p in self.include):
+            return True
+        if len(self._excluded) < 100000:
+            self._excluded.add(key)
+        return False
+
+    def _create(self, key: str, now: float) -> Optional[_Series]:
+        """Allocate a series, evicting series that aged out completely if over budget"""
+        if len(self.series) >= self.max_series:
+            # Look for aged-out series at most once per coarsest step
+            if now >= self._next_eviction:
+                self._next_eviction = now + self.tiers[-1].step
+                horizon = now - max(tier.retention for tier in self.tiers)
+                for old in [k for k, s in self.series.items() if s.last_seen < horizon]:
+                    del self.series[old]
+            if len(self.series) >= self.max_series:
+                self.rejected += 1
+                return None
+        series = self.series[key] = _Series(self.tiers)
+        return series
+
+    def add(self, timestamp: float, samples: Iterable[Tuple[str, float]]):
+        """
+        Store one sample of several series.
+
+        Args:
+            timestamp: Sample time (seconds since the epoch)
+            samples: (series key, value) pairs
+        """
+        with self._lock:
+            buckets = []
+            for tier in self.tiers:
+                bucket = int(timestamp // tier.step)
+                slot = bucket % tier.size
+                held = tier.buckets[slot]
+                if bucket < held:
+                    buckets.append(None)  # Clock stepped back past this slot, drop
+                    continue
+                if bucket > held:
+                    tier.buckets[slot] = bucket
+                buckets.append(bucket)
+
+            for key, value in samples:
+                series = self.series.get(key)
+                if series is None:
+                    if not self._accepts(key):
+                        continue
+                    series = self._create(key, timestamp)
+                    if series is None:
+                        continue
+                series.last_seen = timestamp
+                value = float(value)
+                for tier, bucket in zip(self.tiers, buckets):
+                    if bucket is not None:
+                        series.advance(tier, bucket)
+                        series.write(tier, bucket % tier.size, value)
+
+    def keys(self, match: Optional[str] = None) -> List[str]:
+        """
+        List stored series.
+
+        Args:
+            match: Optional glob pattern
+
+        Returns:
+            Sorted series keys
+        """
+        with self._lock:
+            keys = list(self.series)
+        if match:
+            keys = [k for k in keys if fnmatch.fnmatchcase(k, match)]
+        return sorted(keys)
+
+    def _pick_tier(self, start: float, step: float, now: float) -> _Tier:
+        """Coarsest tier holding start whose step fits the requested one, else the finest holding it"""
+        covering = [tier for tier in self.tiers if now - start <= tier.retention] or [self.tiers[-1]]
+        fitting = [tier for tier in covering if 0 < tier.step <= step]
+        return fitting[-1] if fitting else covering[0]
+
+    def query(self, match: str, start: float = -3600, end: float = 0, step: float = 0,
+              aggregate: str = 'avg') -> Dict[str, Any]:
+        """
+        Query series over a time range.
+
+        Args:
+            match: Glob pattern of series keys
+            start: Range start in seconds since the epoch, or relative to now if <= 0
+            end: Range end, same convention
+            step: Output resolution in seconds (0 = the tier's own)
+            aggregate: One of avg, min, max, sum, last, count
+
+        Returns:
+            {'tier': tier step, 'step': output step, 'series': {key: [[time, value], ...]}}
+        """
+        if aggregate not in AGGREGATES:
+            raise ValueError(f"Unknown aggregate: {aggregate}")
+        now = time.time()
+        start = now + start if start <= 0 else start
+        end = now + end if end <= 0 else end
+
+        with self._lock:
+            tier = self._pick_tier(start, step, now)
+            out_step = max(tier.step, int(math.ceil(step / tier.step)) * tier.step if step > 0 else tier.step)
+            per_group = out_step // tier.step
+            first = int(start // tier.step)
+            last = int(end // tier.step)
+            first = max(first, last - tier.size + 1)
+
+            # Buckets present in the ring, grouped by output step
+            groups: List[Tuple[int, List[int]]] = []
+            for bucket in range(first, last + 1):
+                if tier.buckets[bucket % tier.size] != bucket:
+                    continue
+                group = bucket // per_group
+                if not groups or groups[-1][0] != group:
+                    groups.append((group, []))
+                groups[-1][1].append(bucket)
+
+            result = {}
+            for key, series in self.series.items():
+                if not fnmatch.fnmatchcase(key, match):
+                    continue
+                points = []
+                for group, members in groups:
+                    low, high, total, count, latest = math.inf, -math.inf, 0.0, 0, None
+                    for bucket in members:
+                        cell = series.read(tier, bucket)
+                        if cell is None:
+                            continue
+                        low = min(low, cell[0])
+                        high = max(high, cell[1])
+                        total += cell[2]
+                        count += cell[3]
+                        latest = cell[2] / cell[3]
+                    if not count:
+                        continue
+                    value = {
+                        'avg': total / count if count else None,
+                        'min': low,
+                        'max': high,
+                        'sum': total,
+                        'last': latest,
+                        'count': count
+                    }[aggregate]
+                    points.append([group * out_step, value])
+                result[key] = points
+
+        return {'tier': tier.step, 'step': out_step, 'series': result}
+
+    def stats(self) -> Dict[str, Any]:
+        """Get store size and limits"""
+        with self._lock:
+            count = len(self.series)
+        return {
+            'series': count,
+            'maxSeries': self.max_series,
+            'bytes': count * self.series_bytes,
+            'bytesPerSeries': self.series_bytes,
+            'rejected': self.rejected,
+            'tiers': [{'step': tier.step, 'retention': tier.retention} for tier in self.tiers]
+        }
+
+
+class _UnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+
+class QueryServer:
+    """
+    Local HTTP query API of a RingStore.
+
+    Serves GET /series?match=, /query?match=&start=&end=&step=&agg= and
+    /stats as JSON, on localhost TCP or on a Unix socket (curl
+    --unix-socket). Requests are handled on daemon threads.
+    """
+
+    def __init__(self, store: RingStore, host: str = '127.0.0.1', port: int = 9465,
+                 socket_path: Optional[str] = None):
+        """
+        Initialize the query server.
+
+        Args:
+            store: Store to query
+            host: Interface to listen on
+            port: TCP port to listen on
+            socket_path: Unix socket path; when set, used instead of TCP
+        """
+        self.store = store
+        self.host = host
+        self.port = port
+        self.socket_path = socket_path
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start serving in a background thread"""
+        if self.socket_path:
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)  # Left over from an earlier run
+            self._server = _UnixHTTPServer(self.socket_path, _QueryHandler)
+            os.chmod(self.socket_path, 0o660)
+            address = f'unix:{self.socket_path}'
+        else:
+            self._server = ThreadingHTTPServer((self.host, self.port), _QueryHandler)
+            self._server.daemon_threads = True
+            self.port = self._server.server_address[1]
+            address = f'http://{self.host}:{self.port}'
+        self._server.store = self.store
+        self._thread = threading.Thread(target=self._server.serve_forever, name='store-query', daemon=True)
+        self._thread.start()
+        logger.info(f"Serving metric store queries on {address}")
+
+    def stop(self):
+        """Stop serving"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            if self.socket_path and os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+
+class _QueryHandler(BaseHTTPRequestHandler):
+    """Request handler of QueryServer"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        store = self.server.store
+        try:
+            if url.path == '/series':
+                self._reply(200, store.keys(params.get('match')))
+            elif url.path == '/query':
+                if 'match' not in params:
+                    raise ValueError("Missing parameter: match")
+                self._reply(200, store.query(
+                    params['match'],
+                    start=float(params.get('start', -3600)),
+                    end=float(params.get('end', 0)),
+                    step=float(params.get('step', 0)),
+                    aggregate=params.get('agg', 'avg')
+                ))
+            elif url.path == '/stats':
+                self._reply(200, store.stats())
+            else:
+                self._reply(404, {'error': 'Not found'})
+        except ValueError as e:
+            self._reply(400, {'error': str(e)})
+
+    def _reply(self, status: int, data: Any):
+        body = (json.dumps(data) + '\n').encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self) -> str:
+        # Unix socket peers have no address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
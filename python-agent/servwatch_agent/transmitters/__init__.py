@@ -2,6 +2,15 @@
 Metric Transmitters
 """
 
+from servwatch_agent.transmitters.async_websocket import AsyncWSTransmitter
+from servwatch_agent.transmitters.binary import FrameError, decode_frame, encode_frame
+from servwatch_agent.transmitters.delta import DeltaEncoder, apply_diff, make_diff
+from servwatch_agent.transmitters.openmetrics import MetricsEndpoint
+from servwatch_agent.transmitters.pacing import TokenBucket
+from servwatch_agent.transmitters.spool import DiskSpool
 from servwatch_agent.transmitters.websocket import WSTransmitter
 
-__all__ = ['WSTransmitter']
+__all__ = [
+    'AsyncWSTransmitter', 'DeltaEncoder', 'DiskSpool', 'FrameError', 'MetricsEndpoint', 'TokenBucket',
+    'WSTransmitter', 'apply_diff', 'decode_frame', 'encode_frame', 'make_diff'
+]
@@ -0,0 +1,224 @@
+"""
+Async WebSocket Transmitter
+Sends collected metrics to the backend server from an asyncio event loop
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Callable, List
+
+import socketio
+
+from servwatch_agent.transmitters.spool import DiskSpool
+from servwatch_agent.transmitters.websocket import WSTransmitter, Frame
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncWSTransmitter(WSTransmitter):
+    """
+    asyncio variant of WSTransmitter built on socketio.AsyncClient.
+
+    Uses the same registration, encoding, batching and buffering as
+    WSTransmitter, but every emit is awaited on the caller's event loop. The
+    buffered backlog is replayed by a task started on connect, and a pending
+    batch is flushed by a timer task after the linger time, so no thread polls
+    the connection state. Disk spool reads, writes and fsyncs run on a single
+    worker thread, in order, so they never block the event loop.
+    """
+
+    def __init__(self, server_url: str, agent_id: str, options: Optional[Dict[str, Any]] = None):
+        """
+        Initialize the async WebSocket transmitter.
+
+        Args:
+            server_url: Backend server URL (e.g., http://localhost:3001)
+            agent_id: Unique identifier for this agent
+            options: Optional configuration options
+        """
+        super().__init__(server_url, agent_id, options)
+        self._backlog_task: Optional[asyncio.Task] = None
+        self._linger_task: Optional[asyncio.Task] = None
+        self._retransmit_task: Optional[asyncio.Task] = None
+        self._spool_executor = None
+        if isinstance(self.buffer, DiskSpool):
+            self._spool_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='spool')
+
+    async def _buffer_io(self, func: Callable, *args) -> Any:
+        """Run a buffer operation, on the spool thread when the buffer is on disk"""
+        if self._spool_executor is None:
+            return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(self._spool_executor, func, *args)
+
+    async def connect(self):
+        """Connect to the backend server"""
+        if self.connected:
+            logger.info("Already connected")
+            return
+
+        # Create Socket.IO client
+        self.sio = socketio.AsyncClient(
+            reconnection=self.options['reconnection'],
+            reconnection_delay=self.options['reconnectionDelay'] / 1000,
+            reconnection_delay_max=self.options['reconnectionDelayMax'] / 1000,
+            reconnection_attempts=self.options['reconnectionAttempts']
+        )
+
+        # Register event handlers
+        self.sio.on('connect', self._on_connect)
+        self.sio.on('disconnect', self._on_disconnect)
+        self.sio.on('connect_error', self._on_connect_error)
+        self.sio.on('agent:registered', self._on_registered)
+        self.sio.on('agent:alertRules', self._on_alert_rules)
+        self.sio.on('reconnect', self._on_reconnect)
+
+        # Connect to server
+        try:
+            await self.sio.connect(self.server_url, transports=self.options['transports'])
+        except Exception as e:
+            logger.error(f"Connection error: {e}")
+
+    async def _on_connect(self):
+        """Handle connection event"""
+        await self.sio.emit('agent:register', self._handle_connect())
+        for event, data in self._take_pending_events():
+            await self.send_event(event, data)
+
+        # Replay samples buffered while disconnected
+        self._start_backlog()
+
+        # Retransmit frames whose acknowledgement timed out
+        if self.options['acknowledged'] and (self._retransmit_task is None or self._retransmit_task.done()):
+            self._retransmit_task = asyncio.ensure_future(self._retransmit_loop())
+
+    def _start_backlog(self):
+        """Start the backlog replay task unless it is already running"""
+        if self._backlog_task is None or self._backlog_task.done():
+            self._backlog_task = asyncio.ensure_future(self.flush_buffer())
+
+    async def disconnect(self):
+        """Disconnect from the server"""
+        self.should_stop = True
+        for task in (self._backlog_task, self._linger_task, self._retransmit_task):
+            if task is not None and not task.done():
+                task.cancel()
+        if self.sio:
+            await self.sio.disconnect()
+        self.connected = False
+        await self._buffer_io(self._close_buffer)
+        if self._spool_executor is not None:
+            self._spool_executor.shutdown(wait=True)
+        logger.info("Disconnected from server")
+
+    async def _on_disconnect(self):
+        """Handle disconnect event"""
+        self.connected = False
+        logger.info("Disconnected from server")
+
+        # Keep samples of the unsent batch for replay after reconnect
+        await self._buffer_io(self._buffer_samples, self._take_batch())
+
+    async def transmit(self, metrics: Dict[str, Any]):
+        """
+        Transmit metrics to the server.
+
+        Args:
+            metrics: Dictionary containing metrics data
+        """
+        if self.connected:
+            await self._send_frames(self._build_frames(metrics))
+            if self._batch and (self._linger_task is None or self._linger_task.done()):
+                self._linger_task = asyncio.ensure_future(self._flush_after_linger())
+        else:
+            logger.warning("Not connected, buffering metrics")
+            await self._buffer_io(self._buffer_data, {'agentId': self.agent_id, **metrics})
+
+    async def send_event(self, event: str, data: Dict[str, Any]):
+        """
+        Emit a non-metric event, such as an alert transition.
+
+        Args:
+            event: Event name
+            data: Event payload
+        """
+        if self.connected:
+            try:
+                await self.sio.emit(event, data)
+                return
+            except Exception as e:
+                logger.error(f"Error sending {event}: {e}")
+        self._pending_events.append((event, data))
+
+    async def _send_frames(self, frames: List[Frame]):
+        """
+        Emit frames, re-buffering the samples of any frame that fails.
+
+        Never waits: in acknowledged mode a frame that finds the maxInFlight
+        window full has its samples buffered at once. Samples buffered while
+        still connected are replayed by the backlog task, not after the next
+        reconnect.
+        """
+        buffered = False
+        for frame in frames:
+            if not self._window_open():
+                await self._buffer_io(self._buffer_samples, frame[3])
+                buffered = True
+                continue
+            event, payload, callback, samples = self._sequence_frame(frame)
+            try:
+                start = time.perf_counter()
+                await self.sio.emit(event, payload, callback=callback)
+                self._record_emit(start)
+            except Exception as e:
+                logger.error(f"Error transmitting metrics: {e}")
+                self.emit_errors += 1
+                self._forget_frame(payload)
+                await self._buffer_io(self._buffer_samples, samples)
+                buffered = True
+        if buffered and self.connected:
+            self._start_backlog()
+
+    async def _retransmit_loop(self):
+        """Resend timed-out frames while connected, paced by the backfill rate"""
+        while self.connected and not self.should_stop:
+            frame = self._take_expired_frame()
+            if frame is None:
+                await asyncio.sleep(min(0.5, self.options['ackTimeout'] / 4000))
+                continue
+            wait = self._backfill_wait()
+            while wait > 0:
+                await asyncio.sleep(wait)
+                wait = self._backfill_wait()
+            event, payload, callback, _ = frame
+            try:
+                await self.sio.emit(event, payload, callback=callback)
+                self.retransmits += 1
+            except Exception as e:
+                logger.error(f"Error retransmitting metrics: {e}")
+
+    async def _flush_after_linger(self):
+        """Emit the pending batch once its linger time has passed"""
+        while self._batch and self.connected:
+            await asyncio.sleep(self.options['batchLinger'] / 1000)
+            samples = self._take_lingering_batch()
+            if samples:
+                await self._send_frames([self._batch_frame(samples)])
+
+    async def flush_buffer(self):
+        """Flush all buffered metrics, paced by the backfill rate"""
+        await self._buffer_io(self._buffer_samples, self._take_batch())
+        while not self.buffer.empty() and self.connected and not self.should_stop:
+            # Leave the backlog buffered until acks free the window
+            if not self._window_open():
+                await asyncio.sleep(self._window_backoff())
+                continue
+            wait = self._backfill_wait()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            frames = await self._buffer_io(self._backlog_frames)
+            if not frames:
+                break
+            await self._send_frames(frames)
@@ -0,0 +1,289 @@
+"""
+Binary Wire Format
+Packs the numeric core of a metrics payload into a fixed, schema-versioned layout
+
+Frame layout (schema version 1, little-endian)
+----------------------------------------------
+Header::
+
+    magic       2s   b'SW'
+    version     B    schema version
+    sections    B    bitmask of the core blocks present (see SECTION_* below)
+    timestamp   Q    milliseconds since the epoch
+
+Core blocks, in bit order, each present only when its bit is set::
+
+    SECTION_CPU      usage f, loadAverage 3f, speed f,
+                     perCore count H followed by count f
+    SECTION_MEMORY   total Q, used Q, free Q, swapTotal Q, swapUsed Q,
+                     percentage f
+    SECTION_DISK_IO  readBytes_sec f, writeBytes_sec f,
+                     readCount_sec f, writeCount_sec f
+    SECTION_NETWORK  totalRx f, totalTx f
+    SECTION_GPU      count B followed by count records of
+                     index B, usage f, memoryUsage f, vram Q, vramUsed Q,
+                     temperature f, powerUsage f, fanSpeed f,
+                     clockSpeed I, memoryClockSpeed I
+                     (at most 255 records; further controllers are carried
+                     in the variable section)
+
+Variable section::
+
+    length      I    byte length of the JSON document that follows
+    document         UTF-8 JSON object with every payload field not stored in
+                     the core blocks, nested the same way as the payload
+
+decode_frame() rebuilds the core blocks into their payload positions and
+deep-merges the JSON document on top. Floats are stored as 32-bit values.
+Missing core fields decode as zero. Values a core field cannot hold (None,
+out-of-range integers) are stored as zero and kept in the JSON document,
+which restores them on decoding.
+"""
+
+import json
+import struct
+from typing import Any, Dict, List
+
+SCHEMA_VERSION = 1
+SUPPORTED_VERSIONS = (1,)
+
+MAGIC = b'SW'
+
+SECTION_CPU = 0x01
+SECTION_MEMORY = 0x02
+SECTION_DISK_IO = 0x04
+SECTION_NETWORK = 0x08
+SECTION_GPU = 0x10
+
+_HEADER = struct.Struct('<2sBBQ')
+_CPU = struct.Struct('<5fH')
+_MEMORY = struct.Struct('<5Qf')
+_DISK_IO = struct.Struct('<4f')
+_NETWORK = struct.Struct('<2f')
+_GPU_COUNT = struct.Struct('<B')
+_GPU = struct.Struct('<B2f2Q3f2I')
+_LENGTH = struct.Struct('<I')
+
+_MEMORY_FIELDS = ('total', 'used', 'free', 'swapTotal', 'swapUsed')
+_DISK_IO_FIELDS = ('readBytes_sec', 'writeBytes_sec', 'readCount_sec', 'writeCount_sec')
+_GPU_FIELDS = (
+    'index', 'usage', 'memoryUsage', 'vram', 'vramUsed', 'temperature',
+    'powerUsage', 'fanSpeed', 'clockSpeed', 'memoryClockSpeed'
+)
+
+
+class FrameError(ValueError):
+    """Raised when a binary frame cannot be decoded"""
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _take(container: Dict[str, Any], key: str) -> float:
+    """
+    Pop a float field for a core block.
+
+    Missing fields are stored as zero. Non-numeric values (None) stay in the
+    container, so they travel in the JSON document and replace the zero on
+    decoding.
+    """
+    value = container.get(key, 0)
+    if not _is_number(value):
+        return 0
+    container.pop(key, None)
+    return value
+
+
+def _take_int(container: Dict[str, Any], key: str, limit: int) -> int:
+    """Pop an unsigned integer field below limit for a core block, like _take()"""
+    value = container.get(key, 0)
+    if not _is_number(value) or not 0 <= value < limit:
+        return 0
+    container.pop(key, None)
+    return int(value)
+
+
+def _numbers(values: Any) -> bool:
+    return isinstance(values, list) and all(_is_number(v) for v in values)
+
+
+def encode_frame(metrics: Dict[str, Any]) -> bytes:
+    """
+    Encode a metrics payload as a binary frame.
+
+    Args:
+        metrics: Metrics payload as produced by SystemCollector.build_metrics()
+
+    Returns:
+        Encoded frame
+    """
+    # Fields stored in the core blocks are popped from shallow copies of
+    # their containers, everything left over goes into the JSON document
+    rest = dict(metrics)
+    timestamp = rest.pop('timestamp', 0) or 0
+    if not _is_number(timestamp) or not 0 <= timestamp < 2 ** 64:
+        rest['timestamp'] = timestamp
+        timestamp = 0
+    timestamp = int(timestamp)
+    sections = 0
+    parts: List[bytes] = []
+
+    cpu = rest.get('cpu')
+    if isinstance(cpu, dict) and 'usage' in cpu:
+        cpu = rest['cpu'] = dict(cpu)
+        sections |= SECTION_CPU
+        load = cpu.get('loadAverage') or [0, 0, 0]
+        if _numbers(load) and len(load) == 3:
+            cpu.pop('loadAverage', None)
+        else:
+            load = [0, 0, 0]
+        per_core = cpu.get('perCore') or []
+        if _numbers(per_core) and len(per_core) < 2 ** 16:
+            cpu.pop('perCore', None)
+        else:
+            per_core = []
+        parts.append(_CPU.pack(_take(cpu, 'usage'), *load, _take(cpu, 'speed'), len(per_core)))
+        parts.append(struct.pack(f'<{len(per_core)}f', *per_core))
+
+    memory = rest.get('memory')
+    if isinstance(memory, dict) and 'total' in memory:
+        memory = rest['memory'] = dict(memory)
+        sections |= SECTION_MEMORY
+        values = [_take_int(memory, f, 2 ** 64) for f in _MEMORY_FIELDS]
+        parts.append(_MEMORY.pack(*values, _take(memory, 'percentage')))
+
+    disk = rest.get('disk')
+    if isinstance(disk, dict) and isinstance(disk.get('io'), dict):
+        io = disk['io']
+        if all(f in io for f in _DISK_IO_FIELDS):
+            io = dict(io)
+            rest['disk'] = dict(disk, io=io)
+            sections |= SECTION_DISK_IO
+            parts.append(_DISK_IO.pack(*[_take(io, f) for f in _DISK_IO_FIELDS]))
+
+    network = rest.get('network')
+    if isinstance(network, dict) and 'totalRx' in network:
+        network = rest['network'] = dict(network)
+        sections |= SECTION_NETWORK
+        parts.append(_NETWORK.pack(_take(network, 'totalRx'), _take(network, 'totalTx')))
+
+    gpu = rest.get('gpu')
+    if isinstance(gpu, dict) and gpu.get('controllers'):
+        # The first 255 controllers go in the core block, any others stay
+        # whole in the JSON document and are appended on decoding
+        controllers = [dict(c) if isinstance(c, dict) else c for c in gpu['controllers']]
+        packed = controllers[:255]
+        if not all(isinstance(c, dict) for c in packed):
+            packed = []
+        rest['gpu'] = dict(gpu, controllers=controllers)
+        sections |= SECTION_GPU
+        parts.append(_GPU_COUNT.pack(len(packed)))
+        for i, ctrl in enumerate(packed):
+            ctrl.setdefault('index', i)
+            parts.append(_GPU.pack(
+                _take_int(ctrl, 'index', 2 ** 8),
+                _take(ctrl, 'usage'),
+                _take(ctrl, 'memoryUsage'),
+                _take_int(ctrl, 'vram', 2 ** 64),
+                _take_int(ctrl, 'vramUsed', 2 ** 64),
+                _take(ctrl, 'temperature'),
+                _take(ctrl, 'powerUsage'),
+                _take(ctrl, 'fanSpeed'),
+                _take_int(ctrl, 'clockSpeed', 2 ** 32),
+                _take_int(ctrl, 'memoryClockSpeed', 2 ** 32)
+            ))
+
+    document = json.dumps(rest, separators=(',', ':')).encode('utf-8')
+    header = _HEADER.pack(MAGIC, SCHEMA_VERSION, sections, timestamp)
+    return b''.join([header, *parts, _LENGTH.pack(len(document)), document])
+
+
+def _merge(base: Dict[str, Any], update: Dict[str, Any]):
+    """Deep merge update into base, merging lists of dicts element-wise"""
+    for key, value in update.items():
+        current = base.get(key)
+        if isinstance(current, dict) and isinstance(value, dict):
+            _merge(current, value)
+        elif isinstance(current, list) and isinstance(value, list):
+            for i, item in enumerate(value):
+                if i < len(current) and isinstance(current[i], dict) and isinstance(item, dict):
+                    _merge(current[i], item)
+                elif i < len(current):
+                    current[i] = item
+                else:
+                    current.append(item)
+        else:
+            base[key] = value
+
+
+def decode_frame(frame: bytes) -> Dict[str, Any]:
+    """
+    Reference decoder: rebuild a metrics payload from a binary frame.
+
+    Args:
+        frame: Encoded frame
+
+    Returns:
+        Metrics payload dictionary
+
+    Raises:
+        FrameError: If the frame is malformed or uses an unknown schema version
+    """
+    try:
+        magic, version, sections, timestamp = _HEADER.unpack_from(frame, 0)
+        if magic != MAGIC:
+            raise FrameError('bad frame magic')
+        if version not in SUPPORTED_VERSIONS:
+            raise FrameError(f'unsupported schema version {version}')
+
+        offset = _HEADER.size
+        metrics: Dict[str, Any] = {'timestamp': timestamp}
+
+        if sections & SECTION_CPU:
+            usage, l1, l5, l15, speed, count = _CPU.unpack_from(frame, offset)
+            offset += _CPU.size
+            per_core = list(struct.unpack_from(f'<{count}f', frame, offset))
+            offset += 4 * count
+            metrics['cpu'] = {
+                'usage': usage,
+                'loadAverage': [l1, l5, l15],
+                'speed': speed,
+                'perCore': per_core
+            }
+
+        if sections & SECTION_MEMORY:
+            values = _MEMORY.unpack_from(frame, offset)
+            offset += _MEMORY.size
+            metrics['memory'] = dict(zip(_MEMORY_FIELDS, values[:5]))
+            metrics['memory']['percentage'] = values[5]
+
+        if sections & SECTION_DISK_IO:
+            values = _DISK_IO.unpack_from(frame, offset)
+            offset += _DISK_IO.size
+            metrics['disk'] = {'io': dict(zip(_DISK_IO_FIELDS, values))}
+
+        if sections & SECTION_NETWORK:
+            total_rx, total_tx = _NETWORK.unpack_from(frame, offset)
+            offset += _NETWORK.size
+            metrics['network'] = {'totalRx': total_rx, 'totalTx': total_tx}
+
+        if sections & SECTION_GPU:
+            (count,) = _GPU_COUNT.unpack_from(frame, offset)
+            offset += _GPU_COUNT.size
+            controllers = []
+            for _ in range(count):
+                controllers.append(dict(zip(_GPU_FIELDS, _GPU.unpack_from(frame, offset))))
+                offset += _GPU.size
+            metrics['gpu'] = {'controllers': controllers}
+
+        (length,) = _LENGTH.unpack_from(frame, offset)
+        offset += _LENGTH.size
+        if offset + length != len(frame):
+            raise FrameError('frame length mismatch')
+        document = json.loads(frame[offset:offset + length].decode('utf-8'))
+    except (struct.error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise FrameError(f'malformed frame: {e}') from e
+
+    _merge(metrics, document)
+    return metrics
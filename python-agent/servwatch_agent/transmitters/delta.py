@@ -0,0 +1,197 @@
+"""
+Delta Encoding
+Encodes metrics payloads as structured diffs against an acknowledged keyframe
+
+Frames
+------
+A keyframe is a full payload sent as ``metrics:data`` with an extra integer
+``keyId``. The receiver acknowledges it through the Socket.IO ack callback and
+stores it as the base for that agent. A delta frame is sent as
+``metrics:delta``::
+
+    {"agentId": "...", "keyId": 7, "diff": {...}}
+
+``diff`` always describes the complete current payload relative to keyframe
+``keyId`` (not relative to the previous delta), so a lost delta never corrupts
+later ones.
+
+Reconstruction
+--------------
+``apply_diff(base, diff)`` rebuilds the value:
+
+1. If ``base`` is a dict and ``diff`` is a dict without a ``"$list"`` key, the
+   result is a copy of ``base`` where every key listed in ``diff["$del"]`` is
+   removed and every other key ``k`` of ``diff`` is replaced by
+   ``apply_diff(base.get(k), diff[k])``.
+2. If ``base`` is a list and ``diff`` is a dict with a ``"$list"`` key, the
+   result is a list of length ``diff["$list"]``. Element ``i`` is
+   ``apply_diff(base[i], diff[str(i)])`` when ``str(i)`` is a key of ``diff``
+   and ``base[i]`` otherwise (indexes past the end of ``base`` are always
+   present in ``diff``).
+3. Otherwise ``diff`` is the new value itself.
+
+Payload keys never start with ``$``, so the markers cannot collide with data.
+"""
+
+import copy
+import threading
+from typing import Any, Dict, Optional
+
+# Markers used inside diffs
+LIST_MARKER = '$list'
+DELETE_MARKER = '$del'
+
+# Sentinel returned by make_diff when nothing changed
+UNCHANGED = object()
+
+
+def make_diff(base: Any, value: Any) -> Any:
+    """
+    Compute the diff that turns base into value.
+
+    Args:
+        base: Previous value (from the keyframe)
+        value: Current value
+
+    Returns:
+        Diff understood by apply_diff(), or the UNCHANGED sentinel when they are equal
+    """
+    if type(base) is not type(value):
+        return value
+
+    if isinstance(value, dict):
+        diff = {}
+        for key, item in value.items():
+            if key in base:
+                item_diff = make_diff(base[key], item)
+                if item_diff is not UNCHANGED:
+                    diff[key] = item_diff
+            else:
+                diff[key] = item
+        removed = [key for key in base if key not in value]
+        if removed:
+            diff[DELETE_MARKER] = removed
+        return diff if diff else UNCHANGED
+
+    if isinstance(value, list):
+        base_len = len(base)
+        diff = {}
+        for i, item in enumerate(value):
+            if i < base_len:
+                item_diff = make_diff(base[i], item)
+                if item_diff is not UNCHANGED:
+                    diff[str(i)] = item_diff
+            else:
+                diff[str(i)] = item
+        if not diff and base_len == len(value):
+            return UNCHANGED
+        diff[LIST_MARKER] = len(value)
+        return diff
+
+    return UNCHANGED if base == value else value
+
+
+def apply_diff(base: Any, diff: Any) -> Any:
+    """
+    Reference decoder: rebuild a value from its base and a diff.
+
+    Args:
+        base: Value the diff was computed against
+        diff: Diff produced by make_diff()
+
+    Returns:
+        Reconstructed value (base is not modified)
+    """
+    if isinstance(diff, dict):
+        if isinstance(base, list) and LIST_MARKER in diff:
+            result = []
+            for i in range(diff[LIST_MARKER]):
+                key = str(i)
+                if key in diff:
+                    result.append(apply_diff(base[i] if i < len(base) else None, diff[key]))
+                else:
+                    result.append(copy.deepcopy(base[i]))
+            return result
+
+        if isinstance(base, dict) and LIST_MARKER not in diff:
+            result = {}
+            removed = diff.get(DELETE_MARKER, ())
+            for key, item in base.items():
+                if key not in removed and key not in diff:
+                    result[key] = copy.deepcopy(item)
+            for key, item in diff.items():
+                if key != DELETE_MARKER:
+                    result[key] = apply_diff(base.get(key), item)
+            return result
+
+    return copy.deepcopy(diff)
+
+
+class DeltaEncoder:
+    """
+    Keyframe/delta encoder for one transmitter.
+
+    A keyframe is produced every keyframe_interval frames, after reset() (on
+    reconnect) and whenever no keyframe has been acknowledged yet. All other
+    frames are diffs against the most recent acknowledged keyframe.
+    """
+
+    def __init__(self, keyframe_interval: int = 30):
+        """
+        Initialize the encoder.
+
+        Args:
+            keyframe_interval: Number of frames between keyframes
+        """
+        self.keyframe_interval = max(1, keyframe_interval)
+        self._lock = threading.Lock()
+        self._next_key_id = 1
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._base: Optional[Dict[str, Any]] = None
+        self._base_id: Optional[int] = None
+        self._frames_since_key = 0
+
+    def encode(self, metrics: Dict[str, Any]):
+        """
+        Encode a payload.
+
+        Args:
+            metrics: Full metrics payload (without agentId)
+
+        Returns:
+            Tuple of (is_keyframe, key_id, body) where body is the full payload
+            for keyframes and the diff for delta frames
+        """
+        with self._lock:
+            if self._base is None or self._frames_since_key >= self.keyframe_interval:
+                key_id = self._next_key_id
+                self._next_key_id += 1
+                # Only the newest unacknowledged keyframe is worth keeping
+                self._pending = {key_id: metrics}
+                self._frames_since_key = 0
+                return True, key_id, metrics
+
+            self._frames_since_key += 1
+            diff = make_diff(self._base, metrics)
+            return False, self._base_id, {} if diff is UNCHANGED else diff
+
+    def acknowledge(self, key_id: int):
+        """
+        Mark a keyframe as received by the server.
+
+        Args:
+            key_id: Identifier of the acknowledged keyframe
+        """
+        with self._lock:
+            metrics = self._pending.pop(key_id, None)
+            if metrics is not None:
+                self._base = metrics
+                self._base_id = key_id
+
+    def reset(self):
+        """Forget the acknowledged keyframe so the next frame is a keyframe"""
+        with self._lock:
+            self._pending.clear()
+            self._base = None
+            self._base_id = None
+            self._frames_since_key = 0
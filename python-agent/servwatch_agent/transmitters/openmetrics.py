@@ -0,0 +1,378 @@
+"""
+OpenMetrics Endpoint
+Serves the latest collected sample over HTTP for Prometheus-style scrapers
+"""
+
+import gzip
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+OPENMETRICS_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+PROMETHEUS_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+PREFIX = 'servwatch_'
+
+# A sample is (label pairs, value); a family is (name, type, help, samples)
+Sample = Tuple[Tuple[Tuple[str, Any], ...], Any]
+
+
+class _Families:
+    """Collects metric families in insertion order"""
+
+    def __init__(self):
+        self.families: List[Tuple[str, str, str, List[Sample]]] = []
+        self._by_name: Dict[str, List[Sample]] = {}
+
+    def add(self, name: str, kind: str, help_text: str, value: Any, /, **labels):
+        """Add one sample, creating its family on first use; None values are skipped"""
+        if value is None or isinstance(value, (dict, list, str)):
+            return
+        samples = self._by_name.get(name)
+        if samples is None:
+            samples = self._by_name[name] = []
+            self.families.append((name, kind, help_text, samples))
+        samples.append((tuple(labels.items()), value))
+
+
+def _escape(value: Any) -> str:
+    """Escape a label value"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: Any) -> str:
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int):
+        return str(value)
+    if value != value:
+        return 'NaN'
+    return repr(float(value))
+
+
+def render(families: _Families, openmetrics: bool = True) -> str:
+    """
+    Render metric families as text exposition.
+
+    Args:
+        families: Families to render
+        openmetrics: OpenMetrics 1.0 format, or the Prometheus 0.0.4 text
+            format where counter families are named with their _total suffix
+
+    Returns:
+        Exposition text
+    """
+    lines = []
+    for name, kind, help_text, samples in families.families:
+        sample_name = name + '_total' if kind == 'counter' else name
+        family_name = name if openmetrics else sample_name
+        lines.append(f'# HELP {PREFIX}{family_name} {help_text}')
+        lines.append(f'# TYPE {PREFIX}{family_name} {kind}')
+        for labels, value in samples:
+            if labels:
+                label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in labels)
+                lines.append(f'{PREFIX}{sample_name}{{{label_text}}} {_format_value(value)}')
+            else:
+                lines.append(f'{PREFIX}{sample_name} {_format_value(value)}')
+    if openmetrics:
+        lines.append('# EOF')
+    return '\n'.join(lines) + '\n'
+
+
+def build_families(sections: Dict[str, Any], agent: Optional[Dict[str, Any]] = None) -> _Families:
+    """
+    Map collector sections to metric families.
+
+    Args:
+        sections: Section values as returned by CollectorScheduler.run()
+        agent: Optional agent self-instrumentation (AgentStats.view())
+
+    Returns:
+        Metric families. Rates computed by the agent are gauges named
+        *_per_second; cumulative kernel counters are counters. Process
+        top lists are left out, their pid labels would churn every scrape.
+    """
+    f = _Families()
+
+    cpu = sections.get('cpu')
+    if cpu:
+        f.add('cpu_usage_percent', 'gauge', 'CPU usage since the previous collection', cpu.get('usage'))
+        for core, usage in enumerate(cpu.get('perCore') or []):
+            f.add('cpu_core_usage_percent', 'gauge', 'Per-core CPU usage', usage, core=core)
+        for mode, value in (cpu.get('breakdown') or {}).items():
+            f.add('cpu_mode_percent', 'gauge', 'CPU time share per mode', value, mode=mode)
+        for period, value in zip(('1m', '5m', '15m'), cpu.get('loadAverage') or []):
+            f.add('load_average', 'gauge', 'System load average', value, period=period)
+        f.add('cpu_frequency_mhz', 'gauge', 'Current CPU frequency', cpu.get('speed'))
+
+    memory = sections.get('memory')
+    if memory:
+        for state in ('total', 'used', 'free', 'active', 'cached', 'buffers'):
+            f.add('memory_bytes', 'gauge', 'Physical memory by state', memory.get(state), state=state)
+        for state, key in (('total', 'swapTotal'), ('used', 'swapUsed'), ('free', 'swapFree')):
+            f.add('swap_bytes', 'gauge', 'Swap space by state', memory.get(key), state=state)
+        f.add('memory_usage_percent', 'gauge', 'Physical memory in use', memory.get('percentage'))
+
+    for drive in sections.get('partitions') or []:
+        labels = {'device': drive.get('device'), 'mountpoint': drive.get('mountpoint'),
+                  'fstype': drive.get('fstype')}
+        f.add('filesystem_size_bytes', 'gauge', 'Filesystem size', drive.get('total'), **labels)
+        f.add('filesystem_used_bytes', 'gauge', 'Filesystem space used', drive.get('used'), **labels)
+        f.add('filesystem_free_bytes', 'gauge', 'Filesystem space available', drive.get('free'), **labels)
+        f.add('filesystem_stale', 'gauge', 'Filesystem statistics are from an earlier collection',
+              bool(drive.get('stale')), **labels)
+
+    disk_io = sections.get('diskIO')
+    if disk_io:
+        f.add('disks_read_bytes_per_second', 'gauge', 'Bytes read from all disks', disk_io.get('readBytes_sec'))
+        f.add('disks_written_bytes_per_second', 'gauge', 'Bytes written to all disks',
+              disk_io.get('writeBytes_sec'))
+        for device in disk_io.get('devices') or []:
+            name = device.get('name')
+            f.add('disk_read_bytes_per_second', 'gauge', 'Bytes read', device.get('readBytes_sec'), device=name)
+            f.add('disk_written_bytes_per_second', 'gauge', 'Bytes written', device.get('writeBytes_sec'),
+                  device=name)
+            f.add('disk_reads_per_second', 'gauge', 'Completed reads', device.get('readIops'), device=name)
+            f.add('disk_writes_per_second', 'gauge', 'Completed writes', device.get('writeIops'), device=name)
+            f.add('disk_read_await_milliseconds', 'gauge', 'Average read latency', device.get('readAwait'),
+                  device=name)
+            f.add('disk_write_await_milliseconds', 'gauge', 'Average write latency', device.get('writeAwait'),
+                  device=name)
+            f.add('disk_io_in_flight', 'gauge', 'I/Os in flight', device.get('inFlight'), device=name)
+            f.add('disk_queue_length', 'gauge', 'Average queue size', device.get('avgQueue'), device=name)
+            f.add('disk_utilization_percent', 'gauge', 'Share of time the device was busy', device.get('util'),
+                  device=name)
+
+    for interface in sections.get('interfaces') or []:
+        f.add('network_up', 'gauge', 'Interface is up', bool(interface.get('isup')), interface=interface.get('name'))
+        f.add('network_mtu_bytes', 'gauge', 'Interface MTU', interface.get('mtu'), interface=interface.get('name'))
+
+    net_io = sections.get('networkIO')
+    if net_io:
+        for stat in net_io.get('stats') or []:
+            name = stat.get('iface')
+            f.add('network_receive_bytes', 'counter', 'Bytes received', stat.get('rx_bytes'), interface=name)
+            f.add('network_transmit_bytes', 'counter', 'Bytes sent', stat.get('tx_bytes'), interface=name)
+            f.add('network_receive_packets', 'counter', 'Packets received', stat.get('rx_packets'), interface=name)
+            f.add('network_transmit_packets', 'counter', 'Packets sent', stat.get('tx_packets'), interface=name)
+            f.add('network_receive_bytes_per_second', 'gauge', 'Receive rate', stat.get('rx_sec'), interface=name)
+            f.add('network_transmit_bytes_per_second', 'gauge', 'Transmit rate', stat.get('tx_sec'), interface=name)
+
+    gpu = sections.get('gpu')
+    if gpu:
+        for controller in gpu.get('controllers') or []:
+            labels = {'gpu': controller.get('index'), 'model': controller.get('model')}
+            f.add('gpu_usage_percent', 'gauge', 'GPU utilization', controller.get('usage'), **labels)
+            f.add('gpu_memory_usage_percent', 'gauge', 'GPU memory controller utilization',
+                  controller.get('memoryUsage'), **labels)
+            f.add('gpu_memory_used_bytes', 'gauge', 'VRAM in use', controller.get('vramUsed'), **labels)
+            f.add('gpu_memory_total_bytes', 'gauge', 'VRAM size', controller.get('vram'), **labels)
+            f.add('gpu_temperature_celsius', 'gauge', 'GPU temperature', controller.get('temperature'), **labels)
+            f.add('gpu_power_watts', 'gauge', 'GPU power draw', controller.get('powerUsage'), **labels)
+            f.add('gpu_fan_speed_percent', 'gauge', 'GPU fan speed', controller.get('fanSpeed'), **labels)
+            f.add('gpu_clock_mhz', 'gauge', 'GPU core clock', controller.get('clockSpeed'), **labels)
+            f.add('gpu_memory_clock_mhz', 'gauge', 'GPU memory clock', controller.get('memoryClockSpeed'), **labels)
+
+    temperatures = sections.get('temperatures')
+    if temperatures:
+        for sensor, values in (temperatures.get('sensors') or {}).items():
+            f.add('temperature_celsius', 'gauge', 'Average sensor temperature', values.get('current'), sensor=sensor)
+
+    processes = sections.get('processes')
+    if processes:
+        for state in ('total', 'running', 'sleeping', 'stopped', 'zombie'):
+            f.add('processes', 'gauge', 'Processes by state', processes.get(state), state=state)
+
+    cgroups = sections.get('cgroups')
+    if cgroups:
+        for entry in cgroups.get('cgroups') or []:
+            name = entry.get('name')
+            f.add('cgroup_cpu_usage_percent', 'gauge', 'cgroup CPU usage (100 = one core)',
+                  entry.get('cpu', {}).get('usage'), cgroup=name)
+            f.add('cgroup_cpu_throttled_percent', 'gauge', 'cgroup CPU time throttled',
+                  entry.get('cpu', {}).get('throttled'), cgroup=name)
+            f.add('cgroup_memory_bytes', 'gauge', 'cgroup memory usage', entry.get('memory', {}).get('current'),
+                  cgroup=name)
+            f.add('cgroup_memory_limit_bytes', 'gauge', 'cgroup memory limit', entry.get('memory', {}).get('max'),
+                  cgroup=name)
+            f.add('cgroup_read_bytes_per_second', 'gauge', 'cgroup bytes read',
+                  entry.get('io', {}).get('readBytes_sec'), cgroup=name)
+            f.add('cgroup_written_bytes_per_second', 'gauge', 'cgroup bytes written',
+                  entry.get('io', {}).get('writeBytes_sec'), cgroup=name)
+            f.add('cgroup_pids', 'gauge', 'cgroup task count', entry.get('pids'), cgroup=name)
+
+    for resource, kinds in (sections.get('pressure') or {}).items():
+        for kind, values in kinds.items():
+            for window in ('avg10', 'avg60', 'avg300'):
+                f.add('pressure_percent', 'gauge', 'Share of time tasks stalled on the resource',
+                      values.get(window), resource=resource, kind=kind, window=window)
+
+    if agent:
+        f.add('agent_cpu_seconds', 'counter', 'CPU time used by the agent', agent.get('cpuSeconds'))
+        f.add('agent_resident_memory_bytes', 'gauge', 'Agent resident set size', agent.get('rss'))
+        f.add('agent_tick_overruns', 'counter', 'Collection ticks that overran the interval',
+              agent.get('tickOverruns'))
+        for name, timing in (agent.get('collectors') or {}).items():
+            f.add('agent_collector_duration_milliseconds', 'gauge', 'Wall time of the last collector run',
+                  timing.get('last'), collector=name)
+            f.add('agent_collector_duration_p99_milliseconds', 'gauge', 'p99 collector wall time over recent runs',
+                  timing.get('p99'), collector=name)
+        for name, count in (agent.get('collectionErrors') or {}).items():
+            f.add('agent_collection_errors', 'counter', 'Failed collections', count, collector=name)
+        transmit = agent.get('transmit')
+        if transmit:
+            f.add('agent_connected', 'gauge', 'Agent is connected to the server', transmit.get('connected'))
+            f.add('agent_buffered_samples', 'gauge', 'Samples buffered for transmission', transmit.get('bufferSize'))
+            f.add('agent_reconnects', 'counter', 'Reconnections to the server', transmit.get('reconnects'))
+            f.add('agent_dropped_samples', 'counter', 'Samples dropped from a full buffer', transmit.get('dropped'))
+
+    return f
+
+
+class MetricsEndpoint:
+    """
+    HTTP endpoint exposing the latest sample in OpenMetrics text format.
+
+    update() only stores the new sections and is called from the collection
+    loop. The exposition is rendered on the first scrape after an update and
+    cached, together with its gzip-compressed form, so any number of
+    scrapers cost at most one render (and one compression) per format and
+    collection. Requests are served from daemon threads, independent of the
+    collection loop and of asyncio mode.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 9464, path: str = '/metrics',
+                 agent_stats: Optional[Callable[[], Dict[str, Any]]] = None):
+        """
+        Initialize the endpoint.
+
+        Args:
+            host: Interface to listen on
+            port: Port to listen on
+            path: URL path of the exposition
+            agent_stats: Optional callable returning the agent section, called once per render
+        """
+        self.host = host
+        self.port = port
+        self.path = path
+        self.agent_stats = agent_stats
+
+        self._sections: Optional[Dict[str, Any]] = None
+        self._version = 0
+        # (openmetrics, gzip) -> (version, body)
+        self._cache: Dict[Tuple[bool, bool], Tuple[int, bytes]] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self.renders = 0
+
+    def update(self, sections: Dict[str, Any]):
+        """
+        Publish a new sample.
+
+        Args:
+            sections: Section values of the latest collection; they are
+                rendered later from another thread and must not be mutated
+        """
+        self._sections = sections
+        self._version += 1
+
+    def body(self, openmetrics: bool, compressed: bool) -> Optional[bytes]:
+        """
+        Get the exposition of the latest sample, rendering it if needed.
+
+        Args:
+            openmetrics: OpenMetrics instead of Prometheus text format
+            compressed: gzip-compressed
+
+        Returns:
+            Encoded exposition, or None before the first sample
+        """
+        key = (openmetrics, compressed)
+        with self._lock:
+            version = self._version
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            if self._sections is None:
+                return None
+
+            plain = self._cache.get((openmetrics, False))
+            if plain is None or plain[0] != version:
+                agent = self.agent_stats() if self.agent_stats else None
+                text = render(build_families(self._sections, agent), openmetrics)
+                plain = (version, text.encode('utf-8'))
+                self._cache[(openmetrics, False)] = plain
+                self.renders += 1
+            if not compressed:
+                return plain[1]
+            data = gzip.compress(plain[1], compresslevel=6, mtime=0)
+            self._cache[key] = (version, data)
+            return data
+
+    def start(self):
+        """Start serving in a background thread"""
+        self._server = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self._server.daemon_threads = True
+        self._server.endpoint = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='openmetrics', daemon=True)
+        self._thread.start()
+        logger.info(f"Serving OpenMetrics on http://{self.host}:{self.port}{self.path}")
+
+    def stop(self):
+        """Stop serving"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Request handler serving the server's MetricsEndpoint"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def _serve(self, send_body: bool):
+        endpoint = self.server.endpoint
+        if self.path.split('?', 1)[0] != endpoint.path:
+            self._reply(404, 'text/plain; charset=utf-8', b'Not found\n', send_body)
+            return
+
+        openmetrics = 'application/openmetrics-text' in self.headers.get('Accept', '')
+        compressed = 'gzip' in self.headers.get('Accept-Encoding', '')
+        try:
+            body = endpoint.body(openmetrics, compressed)
+        except Exception as e:
+            logger.error(f"Error rendering metrics: {e}")
+            self._reply(500, 'text/plain; charset=utf-8', b'Error rendering metrics\n', send_body)
+            return
+        if body is None:
+            self._reply(503, 'text/plain; charset=utf-8', b'No sample collected yet\n', send_body)
+            return
+        self._reply(200, OPENMETRICS_TYPE if openmetrics else PROMETHEUS_TYPE, body, send_body,
+                    {'Content-Encoding': 'gzip'} if compressed else None)
+
+    def _reply(self, status: int, content_type: str, body: bytes, send_body: bool,
+               headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Vary', 'Accept, Accept-Encoding')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
@@ -0,0 +1,338 @@
+"""
+Disk Spool
+Crash-safe, segment-based on-disk queue for metrics that could not be sent
+
+Layout
+------
+The spool directory holds numbered segment files (``0000000001.seg``, ...)
+and a ``cursor`` file. Each segment is a sequence of records::
+
+    length  I   payload length in bytes (little-endian)
+    crc     I   CRC-32 of the payload
+    payload     UTF-8 JSON document
+
+Records are only ever appended to the newest segment. When it reaches the
+segment size a new one is started, and when the spool exceeds its total size
+limit the oldest segment is deleted, unread records included. Fully read
+segments are deleted as the reader moves past them. The cursor file stores
+the read position. It is rewritten atomically at most once per fsync interval
+and whenever the spool drains, so replaying a backlog does not cost a sync per
+record; after a crash the records read since the last cursor write are
+replayed again. On startup the newest segment is truncated at the first
+incomplete or corrupt record.
+"""
+
+import json
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Any
+
+_RECORD_HEADER = struct.Struct('<II')
+_SEGMENT_SUFFIX = '.seg'
+_CURSOR_FILE = 'cursor'
+
+FSYNC_ALWAYS = 'always'
+FSYNC_INTERVAL = 'interval'
+FSYNC_NEVER = 'never'
+
+
+class DiskSpool:
+    """
+    Persistent FIFO of metrics payloads.
+
+    Implements the subset of the queue.Queue interface used by the
+    transmitters (put_nowait, get_nowait, empty, qsize), so it can replace the
+    in-memory buffer. put_nowait() never raises queue.Full; the oldest data is
+    evicted instead. Delivery is at-least-once: records read but not yet
+    covered by a persisted cursor are replayed after a crash.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024,
+                 segment_bytes: int = 4 * 1024 * 1024, fsync: str = FSYNC_INTERVAL,
+                 fsync_interval: float = 1.0):
+        """
+        Initialize the spool, recovering any existing segments.
+
+        Args:
+            path: Spool directory
+            max_bytes: Maximum total size of all segments
+            segment_bytes: Size at which a new segment is started
+            fsync: 'always' (every write), 'interval' or 'never'
+            fsync_interval: Seconds between fsyncs in 'interval' mode, and
+                between cursor writes while reading in every mode
+        """
+        if fsync not in (FSYNC_ALWAYS, FSYNC_INTERVAL, FSYNC_NEVER):
+            raise ValueError(f"Invalid fsync policy: {fsync}")
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self.segment_bytes = min(segment_bytes, max_bytes)
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+
+        self._lock = threading.Lock()
+        # seq -> [size in bytes, record count]
+        self._segments: Dict[int, List[int]] = {}
+        self._writer = None
+        self._write_seq = 0
+        self._reader = None
+        self._read_seq = 0
+        self._read_offset = 0
+        self._read_count = 0  # Records already read from the reader segment
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._last_cursor = time.monotonic()
+        self._cursor_dirty = False
+        self.evicted = 0
+
+        os.makedirs(path, exist_ok=True)
+        self._recover()
+
+    def _segment_path(self, seq: int) -> str:
+        """Path of a segment file"""
+        return os.path.join(self.path, f'{seq:010d}{_SEGMENT_SUFFIX}')
+
+    def _recover(self):
+        """Scan existing segments, repair the newest one and restore the cursor"""
+        seqs = sorted(
+            int(name[:-len(_SEGMENT_SUFFIX)]) for name in os.listdir(self.path)
+            if name.endswith(_SEGMENT_SUFFIX) and name[:-len(_SEGMENT_SUFFIX)].isdigit()
+        )
+
+        cursor_seq, cursor_offset = self._load_cursor()
+        for i, seq in enumerate(seqs):
+            valid_size, count, before_cursor = self._scan_segment(
+                seq, cursor_offset if seq == cursor_seq else 0
+            )
+            if i == len(seqs) - 1 and valid_size < os.path.getsize(self._segment_path(seq)):
+                # Torn write at the tail of the newest segment
+                with open(self._segment_path(seq), 'r+b') as f:
+                    f.truncate(valid_size)
+            self._segments[seq] = [valid_size, count]
+            if seq == cursor_seq:
+                self._read_count = before_cursor
+                self._read_offset = min(cursor_offset, valid_size)
+
+        if not self._segments:
+            self._segments[1] = [0, 0]
+            open(self._segment_path(1), 'ab').close()
+
+        if cursor_seq in self._segments:
+            self._read_seq = cursor_seq
+        else:
+            self._read_seq = min(self._segments)
+            self._read_offset = 0
+            self._read_count = 0
+
+        # Segments before the cursor were already delivered
+        for seq in [s for s in self._segments if s < self._read_seq]:
+            self._delete_segment(seq)
+
+        self._pending = sum(count for _, count in self._segments.values()) - self._read_count
+        self._write_seq = max(self._segments)
+        self._writer = open(self._segment_path(self._write_seq), 'ab')
+
+    def _scan_segment(self, seq: int, cursor_offset: int):
+        """Return (valid size, record count, records before cursor_offset)"""
+        offset = 0
+        count = 0
+        before = 0
+        with open(self._segment_path(seq), 'rb') as f:
+            while True:
+                header = f.read(_RECORD_HEADER.size)
+                if len(header) < _RECORD_HEADER.size:
+                    break
+                length, crc = _RECORD_HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    break
+                if offset < cursor_offset:
+                    before += 1
+                offset += _RECORD_HEADER.size + length
+                count += 1
+        return offset, count, before
+
+    def _load_cursor(self):
+        """Read the persisted read position"""
+        try:
+            with open(os.path.join(self.path, _CURSOR_FILE), 'r') as f:
+                cursor = json.load(f)
+            return int(cursor['segment']), int(cursor['offset'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None, 0
+
+    def _save_cursor(self):
+        """Atomically persist the read position"""
+        tmp = os.path.join(self.path, _CURSOR_FILE + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump({'segment': self._read_seq, 'offset': self._read_offset}, f)
+            if self.fsync != FSYNC_NEVER:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(self.path, _CURSOR_FILE))
+        self._cursor_dirty = False
+        self._last_cursor = time.monotonic()
+
+    def put_nowait(self, data: Dict[str, Any]):
+        """
+        Append a payload to the spool.
+
+        Args:
+            data: JSON-serializable payload
+        """
+        payload = json.dumps(data, separators=(',', ':'), default=str).encode('utf-8')
+        record = _RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+        with self._lock:
+            if self._segments[self._write_seq][0] + len(record) > self.segment_bytes \
+                    and self._segments[self._write_seq][1] > 0:
+                self._roll_segment()
+
+            self._writer.write(record)
+            self._writer.flush()
+            segment = self._segments[self._write_seq]
+            segment[0] += len(record)
+            segment[1] += 1
+            self._pending += 1
+
+            self._maybe_sync()
+            self._evict()
+            self._commit_cursor()
+
+    put = put_nowait
+
+    def _roll_segment(self):
+        """Close the current segment and start a new one"""
+        self._sync_writer()
+        self._writer.close()
+        self._write_seq += 1
+        self._segments[self._write_seq] = [0, 0]
+        self._writer = open(self._segment_path(self._write_seq), 'ab')
+
+    def _evict(self):
+        """Delete the oldest segments while the spool is over its size limit"""
+        total = sum(size for size, _ in self._segments.values())
+        while total > self.max_bytes and len(self._segments) > 1:
+            oldest = min(self._segments)
+            size, count = self._segments[oldest]
+            if oldest == self._read_seq:
+                lost = count - self._read_count
+                self._close_reader()
+                self._read_seq = min(s for s in self._segments if s != oldest)
+                self._read_offset = 0
+                self._read_count = 0
+                self._cursor_dirty = True
+            else:
+                lost = count
+            self._pending -= lost
+            self.evicted += lost
+            self._delete_segment(oldest)
+            total -= size
+
+    def _delete_segment(self, seq: int):
+        """Remove a segment file"""
+        self._segments.pop(seq, None)
+        try:
+            os.remove(self._segment_path(seq))
+        except OSError:
+            pass
+
+    def _sync_writer(self):
+        """Flush the current segment to stable storage"""
+        self._writer.flush()
+        if self.fsync != FSYNC_NEVER:
+            os.fsync(self._writer.fileno())
+        self._last_sync = time.monotonic()
+
+    def _maybe_sync(self):
+        """Apply the fsync policy after a write"""
+        if self.fsync == FSYNC_ALWAYS or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self._sync_writer()
+
+    def _commit_cursor(self):
+        """Persist a moved cursor once per fsync interval, or right away once drained"""
+        if self._cursor_dirty and (self._pending <= 0
+                                   or time.monotonic() - self._last_cursor >= self.fsync_interval):
+            self._save_cursor()
+
+    def _close_reader(self):
+        """Close the reader file handle"""
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    def get_nowait(self) -> Dict[str, Any]:
+        """
+        Remove and return the oldest payload.
+
+        Raises:
+            queue.Empty: If the spool is empty
+        """
+        with self._lock:
+            while True:
+                if self._reader is None:
+                    self._reader = open(self._segment_path(self._read_seq), 'rb')
+                    self._reader.seek(self._read_offset)
+
+                record = self._read_record()
+                if record is not None:
+                    self._read_offset += _RECORD_HEADER.size + len(record)
+                    self._read_count += 1
+                    self._pending -= 1
+                    self._cursor_dirty = True
+                    self._commit_cursor()
+                    return json.loads(record.decode('utf-8'))
+
+                if self._read_seq == self._write_seq:
+                    self._commit_cursor()
+                    raise queue.Empty
+
+                # Finished (or hit a corrupt tail of) an older segment
+                lost = self._segments[self._read_seq][1] - self._read_count
+                self._pending -= max(0, lost)
+                self._close_reader()
+                self._delete_segment(self._read_seq)
+                self._read_seq = min(self._segments)
+                self._read_offset = 0
+                self._read_count = 0
+                self._cursor_dirty = True
+
+    get = get_nowait
+
+    def _read_record(self) -> Optional[bytes]:
+        """Read the next valid record at the reader position"""
+        header = self._reader.read(_RECORD_HEADER.size)
+        if len(header) < _RECORD_HEADER.size:
+            self._reader.seek(self._read_offset)
+            return None
+        length, crc = _RECORD_HEADER.unpack(header)
+        payload = self._reader.read(length)
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            self._reader.seek(self._read_offset)
+            return None
+        return payload
+
+    def empty(self) -> bool:
+        """Check whether there are unread payloads"""
+        return self._pending <= 0
+
+    def qsize(self) -> int:
+        """Get the number of unread payloads"""
+        return max(0, self._pending)
+
+    def size_bytes(self) -> int:
+        """Get the total size of all segments in bytes"""
+        with self._lock:
+            return sum(size for size, _ in self._segments.values())
+
+    def close(self):
+        """Flush the writer and persist the cursor"""
+        with self._lock:
+            self._sync_writer()
+            self._writer.close()
+            self._close_reader()
+            self._save_cursor()
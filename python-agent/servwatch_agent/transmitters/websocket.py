@@ -3,16 +3,27 @@ WebSocket Transmitter
 Sends collected metrics to the backend server via WebSocket
 """
 
+import json
 import socketio
 import threading
 import time
 import queue
 import logging
-from typing import Optional, Dict, Any, Callable
+from collections import deque
+from typing import Optional, Dict, Any, Callable, List, Tuple
+
+from servwatch_agent.selfstats import TimingRing
+from servwatch_agent.transmitters.binary import SUPPORTED_VERSIONS, encode_frame
+from servwatch_agent.transmitters.delta import DeltaEncoder
+from servwatch_agent.transmitters.pacing import TokenBucket
+from servwatch_agent.transmitters.spool import DiskSpool
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# (event, payload, ack callback, samples to re-buffer if the emit fails)
+Frame = Tuple[str, Dict[str, Any], Optional[Callable], List[Dict[str, Any]]]
+
 
 class WSTransmitter:
     """WebSocket transmitter for sending metrics to ServWatch backend"""
@@ -33,7 +44,25 @@ class WSTransmitter:
             'reconnection': True,
             'reconnectionDelay': 1000,
             'reconnectionDelayMax': 5000,
-            'reconnectionAttempts': 0  # Infinite
+            'reconnectionAttempts': 0,  # Infinite
+            'transports': None,  # Engine.IO transports, e.g. ['websocket']; None = polling, upgraded when possible
+            'deltaEncoding': False,
+            'keyframeInterval': 30,
+            'binaryFormat': False,
+            'batching': False,
+            'batchMaxCount': 50,
+            'batchMaxBytes': 256 * 1024,
+            'batchLinger': 1000,
+            'spoolPath': None,  # Directory of the disk spool, None keeps the buffer in memory
+            'spoolMaxBytes': 64 * 1024 * 1024,
+            'spoolSegmentBytes': 4 * 1024 * 1024,
+            'spoolFsync': 'interval',
+            'spoolFsyncInterval': 1000,
+            'acknowledged': False,  # Sequence frames and retransmit until the server acks
+            'ackTimeout': 5000,
+            'maxInFlight': 100,
+            'backfillRate': 20,  # Backlog frames per second after reconnect, 0 = unpaced
+            'backfillBurst': 20
         }
         if options:
             default_options.update(options)
@@ -41,9 +70,63 @@ class WSTransmitter:
 
         self.sio = None
         self.connected = False
-        self.buffer = queue.Queue(maxsize=100)
+        if self.options['spoolPath']:
+            # Survives restarts and long outages, drained oldest first
+            self.buffer = DiskSpool(
+                self.options['spoolPath'],
+                max_bytes=self.options['spoolMaxBytes'],
+                segment_bytes=self.options['spoolSegmentBytes'],
+                fsync=self.options['spoolFsync'],
+                fsync_interval=self.options['spoolFsyncInterval'] / 1000
+            )
+        else:
+            self.buffer = queue.Queue(maxsize=100)
         self.should_stop = False
 
+        # Keyframe/delta encoding of live frames (see transmitters.delta)
+        self.delta_encoder = None
+        if self.options['deltaEncoding']:
+            self.delta_encoder = DeltaEncoder(self.options['keyframeInterval'])
+
+        # Binary schema version accepted by the server in agent:registered
+        self.binary_schema = None
+
+        # Live frames are binary if negotiated, else delta, else batched
+        if self.options['batching'] and (self.options['deltaEncoding'] or self.options['binaryFormat']):
+            encoding = 'binary frames' if self.options['binaryFormat'] else 'delta frames'
+            logger.warning(f"batching does not apply to live samples sent as {encoding}, "
+                           f"only the backlog is replayed in batches")
+
+        # Live samples waiting to be sent as one metrics:batch frame
+        self._batch: List[Dict[str, Any]] = []
+        self._batch_bytes = 0
+        self._batch_started = 0.0
+        self._batch_lock = threading.Lock()
+
+        # At-least-once delivery: seq -> [event, payload, callback, samples, sent_at]
+        self._seq = 0
+        self._unacked: Dict[int, list] = {}
+        self._unacked_lock = threading.Lock()
+        # Notified when an ack frees a slot in the maxInFlight window
+        self._window = threading.Condition(self._unacked_lock)
+
+        # Paces backlog replay and retransmissions so live frames go first
+        self._backfill = None
+        if self.options['backfillRate'] > 0:
+            self._backfill = TokenBucket(self.options['backfillRate'], self.options['backfillBurst'])
+
+        # Transmit health, reported in the agent section
+        self.emit_timing = TimingRing()
+        self.ack_timing = TimingRing()
+        self.frames_sent = 0
+        self.emit_errors = 0
+        self.retransmits = 0
+        self.connects = 0
+        self.dropped = 0
+
+        # Non-metric events (alert transitions) held while disconnected, oldest dropped first
+        self._pending_events: deque = deque(maxlen=1000)
+
         # Event handlers
         self.event_handlers: Dict[str, Callable] = {}
 
@@ -59,8 +142,8 @@ class WSTransmitter:
         # Create Socket.IO client
         self.sio = socketio.Client(
             reconnection=self.options['reconnection'],
-            reconnection_delay=self.options['reconnectionDelay'],
-            reconnection_delay_max=self.options['reconnectionDelayMax'],
+            reconnection_delay=self.options['reconnectionDelay'] / 1000,
+            reconnection_delay_max=self.options['reconnectionDelayMax'] / 1000,
             reconnection_attempts=self.options['reconnectionAttempts']
         )
 
@@ -69,33 +152,60 @@ class WSTransmitter:
         self.sio.on('disconnect', self._on_disconnect)
         self.sio.on('connect_error', self._on_connect_error)
         self.sio.on('agent:registered', self._on_registered)
+        self.sio.on('agent:alertRules', self._on_alert_rules)
         self.sio.on('reconnect', self._on_reconnect)
 
         # Connect to server
         try:
-            self.sio.connect(self.server_url)
+            self.sio.connect(self.server_url, transports=self.options['transports'])
         except Exception as e:
             logger.error(f"Connection error: {e}")
 
     def _on_connect(self):
         """Handle connection event"""
+        self.sio.emit('agent:register', self._handle_connect())
+        for event, data in self._take_pending_events():
+            self.send_event(event, data)
+
+        # Start buffer flush thread
+        self._start_flush_thread()
+
+    def _handle_connect(self) -> Dict[str, Any]:
+        """Reset per-connection state and build the agent:register payload"""
         self.connected = True
+        self.connects += 1
         logger.info(f"Connected to server: {self.server_url}")
 
-        # Register as agent
-        self.sio.emit('agent:register', {
+        # The server lost our keyframe if it restarted, start over
+        if self.delta_encoder:
+            self.delta_encoder.reset()
+        self.binary_schema = None
+
+        # Frames sent on the previous connection may never have arrived
+        with self._unacked_lock:
+            for entry in self._unacked.values():
+                entry[4] = 0.0
+
+        self._trigger('connected', None)
+
+        registration = {
             'agentId': self.agent_id,
             'timestamp': int(time.time() * 1000)
-        })
-
-        # Start buffer flush thread
-        self._start_flush_thread()
+        }
+        if self.delta_encoder:
+            registration['encoding'] = 'delta'
+        if self.options['binaryFormat']:
+            registration['binarySchemas'] = list(SUPPORTED_VERSIONS)
+        return registration
 
     def _on_disconnect(self):
         """Handle disconnect event"""
         self.connected = False
         logger.info("Disconnected from server")
 
+        # Keep samples of the unsent batch for replay after reconnect
+        self._buffer_samples(self._take_batch())
+
     def _on_connect_error(self, error):
         """Handle connection error"""
         logger.error(f"Connection error: {error}")
@@ -103,8 +213,19 @@ class WSTransmitter:
     def _on_registered(self, data):
         """Handle agent registration confirmation"""
         logger.info(f"Agent registered: {data}")
+
+        # Switch to binary frames only if the server picked a schema we know
+        if self.options['binaryFormat'] and isinstance(data, dict):
+            schema = data.get('binarySchema')
+            if schema in SUPPORTED_VERSIONS:
+                self.binary_schema = schema
+                logger.info(f"Using binary metrics frames (schema {schema})")
         self._trigger('registered', data)
 
+    def _on_alert_rules(self, data):
+        """Handle an alert rule set pushed by the server"""
+        self._trigger('alertRules', data)
+
     def _on_reconnect(self):
         """Handle reconnection"""
         logger.info("Reconnected to server")
@@ -121,13 +242,26 @@ class WSTransmitter:
         """Background loop to flush buffered metrics"""
         while not self.should_stop:
             try:
-                if self.connected and not self.buffer.empty():
-                    data = self.buffer.get_nowait()
-                    self.sio.emit('metrics:data', data)
+                if self.options['batching'] and self.connected:
+                    samples = self._take_lingering_batch()
+                    if samples:
+                        self._send_frames([self._batch_frame(samples)])
+
+                if self.connected and self._has_backfill():
+                    wait = self._backfill_wait()
+                    if wait > 0:
+                        time.sleep(min(wait, 0.1))
+                        continue
+                    expired = self._take_expired_frame()
+                    if expired:
+                        self._resend_frame(expired)
+                    elif self._window_open():
+                        self._send_frames(self._backlog_frames())
+                    else:
+                        # Backlog waits for acks, this thread keeps retransmitting
+                        time.sleep(0.1)
                 else:
                     time.sleep(0.1)
-            except queue.Empty:
-                time.sleep(0.1)
             except Exception as e:
                 logger.error(f"Error flushing buffer: {e}")
                 time.sleep(0.5)
@@ -138,8 +272,15 @@ class WSTransmitter:
         if self.sio:
             self.sio.disconnect()
         self.connected = False
+        self._close_buffer()
         logger.info("Disconnected from server")
 
+    def _close_buffer(self):
+        """Move the pending batch to the buffer and persist the disk spool"""
+        self._buffer_samples(self._take_batch())
+        if isinstance(self.buffer, DiskSpool):
+            self.buffer.close()
+
     def transmit(self, metrics: Dict[str, Any]):
         """
         Transmit metrics to the server.
@@ -147,20 +288,278 @@ class WSTransmitter:
         Args:
             metrics: Dictionary containing metrics data
         """
+        if self.connected:
+            self._send_frames(self._build_frames(metrics))
+        else:
+            logger.warning("Not connected, buffering metrics")
+            self._buffer_data({'agentId': self.agent_id, **metrics})
+
+    def send_event(self, event: str, data: Dict[str, Any]):
+        """
+        Emit a non-metric event, such as an alert transition.
+
+        Events are not encoded or batched. While disconnected they are held
+        in memory and emitted after the next registration.
+
+        Args:
+            event: Event name
+            data: Event payload
+        """
+        if self.connected:
+            try:
+                self.sio.emit(event, data)
+                return
+            except Exception as e:
+                logger.error(f"Error sending {event}: {e}")
+        self._pending_events.append((event, data))
+
+    def _take_pending_events(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """Remove and return the events held while disconnected"""
+        events = []
+        while self._pending_events:
+            events.append(self._pending_events.popleft())
+        return events
+
+    def _send_frames(self, frames: List[Frame]):
+        """
+        Emit frames, re-buffering the samples of any frame that fails.
+
+        Never waits: in acknowledged mode a frame that finds the maxInFlight
+        window full has its samples buffered at once, for the flush thread to
+        replay once acks free the window.
+        """
+        for frame in frames:
+            if not self._window_open():
+                self._buffer_samples(frame[3])
+                continue
+            event, payload, callback, samples = self._sequence_frame(frame)
+            try:
+                start = time.perf_counter()
+                self.sio.emit(event, payload, callback=callback)
+                self._record_emit(start)
+            except Exception as e:
+                logger.error(f"Error transmitting metrics: {e}")
+                self.emit_errors += 1
+                self._forget_frame(payload)
+                self._buffer_samples(samples)
+
+    def _record_emit(self, start: float):
+        """Record a successful emit started at perf_counter() time start"""
+        self.emit_timing.add(time.perf_counter() - start)
+        self.frames_sent += 1
+
+    def _resend_frame(self, frame: Frame):
+        """Retransmit an unacknowledged frame, keeping its sequence number"""
+        event, payload, callback, _ = frame
+        try:
+            self.sio.emit(event, payload, callback=callback)
+            self.retransmits += 1
+        except Exception as e:
+            logger.error(f"Error retransmitting metrics: {e}")
+
+    def _window_open(self) -> bool:
+        """Check whether another frame may be sent (always true unless acknowledged)"""
+        return not self.options['acknowledged'] or len(self._unacked) < self.options['maxInFlight']
+
+    def _window_backoff(self) -> float:
+        """Seconds the backlog waits before checking a full window again"""
+        return min(0.5, self.options['ackTimeout'] / 4000)
+
+    def _wait_for_window(self) -> bool:
+        """Block until the maxInFlight window has room, for at most ackTimeout (backlog only)"""
+        if self._window_open():
+            return True
+        deadline = time.monotonic() + self.options['ackTimeout'] / 1000
+        with self._window:
+            while not self._window_open() and self.connected and not self.should_stop:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._window.wait(min(remaining, 0.1))
+        return self._window_open()
+
+    def _sequence_frame(self, frame: Frame) -> Frame:
+        """Number a frame and track it until acknowledged (acknowledged mode)"""
+        if not self.options['acknowledged']:
+            return frame
+
+        event, payload, callback, samples = frame
+        with self._unacked_lock:
+            self._seq += 1
+            seq = self._seq
+            payload = {**payload, 'seq': seq}
+            callback = self._make_ack_callback(seq, callback)
+            self._unacked[seq] = [event, payload, callback, samples, time.monotonic()]
+        return event, payload, callback, samples
+
+    def _make_ack_callback(self, seq: int, callback: Optional[Callable]) -> Callable:
+        """Wrap a frame's ack callback so the ack also retires the frame"""
+        def on_ack(*args):
+            with self._unacked_lock:
+                entry = self._unacked.pop(seq, None)
+                self._window.notify_all()
+            if entry is not None and entry[4] > 0:
+                self.ack_timing.add(time.monotonic() - entry[4])
+            if callback:
+                callback(*args)
+        return on_ack
+
+    def _forget_frame(self, payload: Dict[str, Any]):
+        """Stop tracking a frame whose samples are being re-buffered"""
+        seq = payload.get('seq')
+        if seq is not None:
+            with self._unacked_lock:
+                self._unacked.pop(seq, None)
+
+    def _take_expired_frame(self) -> Optional[Frame]:
+        """Get the oldest frame whose ack timed out, restarting its timer"""
+        if not self._unacked:
+            return None
+        deadline = time.monotonic() - self.options['ackTimeout'] / 1000
+        with self._unacked_lock:
+            for entry in self._unacked.values():
+                if entry[4] <= deadline:
+                    entry[4] = time.monotonic()
+                    return entry[0], entry[1], entry[2], entry[3]
+        return None
+
+    def _has_backfill(self) -> bool:
+        """Check for buffered samples or timed-out frames to send"""
+        if not self.buffer.empty():
+            return True
+        if not self._unacked:
+            return False
+        deadline = time.monotonic() - self.options['ackTimeout'] / 1000
+        with self._unacked_lock:
+            return any(entry[4] <= deadline for entry in self._unacked.values())
+
+    def _backfill_wait(self) -> float:
+        """Take a backfill token, or return how long to wait for one"""
+        if self._backfill is None or self._backfill.try_take():
+            return 0.0
+        return max(self._backfill.wait_time(), 0.001)
+
+    def _build_frames(self, metrics: Dict[str, Any]) -> List[Frame]:
+        """
+        Encode a live sample into the frames to emit.
+
+        Args:
+            metrics: Dictionary containing metrics data
+
+        Returns:
+            List of (event, payload, ack callback, samples) tuples, where
+            samples are the plain payloads to re-buffer if the emit fails.
+            Empty while a batch is still filling up.
+        """
         data = {
             'agentId': self.agent_id,
             **metrics
         }
 
-        if self.connected:
+        if self.binary_schema:
+            return [('metrics:binary', {
+                'agentId': self.agent_id,
+                'schema': self.binary_schema,
+                'frame': encode_frame(metrics)
+            }, None, [data])]
+
+        if self.delta_encoder:
+            is_keyframe, key_id, body = self.delta_encoder.encode(metrics)
+            if is_keyframe:
+                return [(
+                    'metrics:data',
+                    {'agentId': self.agent_id, 'keyId': key_id, **body},
+                    lambda *args: self.delta_encoder.acknowledge(key_id),
+                    [data]
+                )]
+            return [('metrics:delta', {
+                'agentId': self.agent_id,
+                'keyId': key_id,
+                'diff': body
+            }, None, [data])]
+
+        if self.options['batching']:
+            return [self._batch_frame(samples) for samples in self._add_to_batch(data)]
+
+        return [('metrics:data', data, None, [data])]
+
+    def _backlog_frames(self) -> List[Frame]:
+        """Take the next frame worth of buffered samples, oldest first"""
+        if self.options['batching']:
+            samples = self._drain_buffer()
+            return [self._batch_frame(samples)] if samples else []
+        try:
+            data = self.buffer.get_nowait()
+        except queue.Empty:
+            return []
+        return [('metrics:data', data, None, [data])]
+
+    @staticmethod
+    def _payload_size(data: Dict[str, Any]) -> int:
+        """Approximate serialized size of a sample in bytes"""
+        return len(json.dumps(data, separators=(',', ':'), default=str))
+
+    def _add_to_batch(self, data: Dict[str, Any]) -> List[List[Dict[str, Any]]]:
+        """Add a live sample to the pending batch and return any batches that are full"""
+        size = self._payload_size(data)
+        ready = []
+        with self._batch_lock:
+            # Send what we have first if this sample would overflow the batch
+            if self._batch and self._batch_bytes + size > self.options['batchMaxBytes']:
+                ready.append(self._take_batch_locked())
+            if not self._batch:
+                self._batch_started = time.monotonic()
+            self._batch.append(data)
+            self._batch_bytes += size
+            if (len(self._batch) >= self.options['batchMaxCount']
+                    or self._batch_bytes >= self.options['batchMaxBytes']):
+                ready.append(self._take_batch_locked())
+        return ready
+
+    def _take_batch_locked(self) -> List[Dict[str, Any]]:
+        """Detach the pending batch (caller holds _batch_lock)"""
+        samples = self._batch
+        self._batch = []
+        self._batch_bytes = 0
+        return samples
+
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        """Detach the pending batch"""
+        with self._batch_lock:
+            return self._take_batch_locked()
+
+    def _take_lingering_batch(self) -> List[Dict[str, Any]]:
+        """Detach the pending batch once its oldest sample exceeds the linger time"""
+        linger = self.options['batchLinger'] / 1000
+        with self._batch_lock:
+            if not self._batch or time.monotonic() - self._batch_started < linger:
+                return []
+            return self._take_batch_locked()
+
+    def _drain_buffer(self) -> List[Dict[str, Any]]:
+        """Take up to one batch worth of samples from the buffer, oldest first"""
+        samples = []
+        total = 0
+        while len(samples) < self.options['batchMaxCount']:
             try:
-                self.sio.emit('metrics:data', data)
-            except Exception as e:
-                logger.error(f"Error transmitting metrics: {e}")
-                self._buffer_data(data)
-        else:
-            logger.warning("Not connected, buffering metrics")
-            self._buffer_data(data)
+                data = self.buffer.get_nowait()
+            except queue.Empty:
+                break
+            samples.append(data)
+            total += self._payload_size(data)
+            if total >= self.options['batchMaxBytes']:
+                break
+        return samples
+
+    def _batch_frame(self, samples: List[Dict[str, Any]]) -> Frame:
+        """Build a metrics:batch frame from buffered or live samples"""
+        return ('metrics:batch', {
+            'agentId': self.agent_id,
+            'count': len(samples),
+            'samples': [
+                {k: v for k, v in data.items() if k != 'agentId'} for data in samples
+            ]
+        }, None, samples)
 
     def _buffer_data(self, data: Dict[str, Any]):
         """Add data to buffer, removing oldest if full"""
@@ -169,21 +568,35 @@ class WSTransmitter:
         except queue.Full:
             try:
                 self.buffer.get_nowait()  # Remove oldest
+                self.dropped += 1
                 self.buffer.put_nowait(data)
             except queue.Empty:
                 pass
 
+    def _buffer_samples(self, samples: List[Dict[str, Any]]):
+        """Add samples to the buffer, oldest first"""
+        for data in samples:
+            self._buffer_data(data)
+
     def flush_buffer(self):
-        """Flush all buffered metrics"""
+        """
+        Flush all buffered metrics, paced by the backfill rate.
+
+        Gives up when the maxInFlight window stays full for ackTimeout; the
+        flush thread replays the rest once acks free it.
+        """
+        self._buffer_samples(self._take_batch())
         while not self.buffer.empty() and self.connected:
-            try:
-                data = self.buffer.get_nowait()
-                self.sio.emit('metrics:data', data)
-            except queue.Empty:
-                break
-            except Exception as e:
-                logger.error(f"Error flushing buffer: {e}")
+            if not self._wait_for_window():
+                return
+            wait = self._backfill_wait()
+            if wait > 0:
+                time.sleep(wait)
+                continue
+            frames = self._backlog_frames()
+            if not frames:
                 break
+            self._send_frames(frames)
 
     def on(self, event: str, handler: Callable):
         """Register an event handler"""
@@ -202,3 +615,33 @@ class WSTransmitter:
     def get_buffer_size(self) -> int:
         """Get number of buffered metrics"""
         return self.buffer.qsize()
+
+    def get_unacked_count(self) -> int:
+        """Get number of frames awaiting server acknowledgement"""
+        return len(self._unacked)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get transmit health statistics.
+
+        Returns:
+            Dictionary with connection state, buffer depth, frame and error
+            counts, reconnects, dropped samples (buffer overflow or spool
+            eviction) and emit latency in ms; when acknowledged also frames
+            awaiting an ack, retransmissions and ack latency
+        """
+        stats = {
+            'connected': self.connected,
+            'bufferSize': self.get_buffer_size(),
+            'framesSent': self.frames_sent,
+            'emitErrors': self.emit_errors,
+            'reconnects': max(0, self.connects - 1),
+            'dropped': self.dropped + getattr(self.buffer, 'evicted', 0),
+            'emitLatency': self.emit_timing.summary(),
+            'pendingEvents': len(self._pending_events)
+        }
+        if self.options['acknowledged']:
+            stats['unacked'] = self.get_unacked_count()
+            stats['retransmits'] = self.retransmits
+            stats['ackLatency'] = self.ack_timing.summary()
+        return stats
@@ -35,9 +35,14 @@ setup(
         "psutil>=5.9.0",
         "nvidia-ml-py>=12.0.0",
     ],
+    extras_require={
+        "asyncio": ["aiohttp>=3.8.0"],
+    },
     entry_points={
         "console_scripts": [
             "servwatch-agent=servwatch_agent.agent:main",
+            "servwatch-agent-bench=servwatch_agent.bench.runner:main",
+            "servwatch-agent-swarm=servwatch_agent.bench.swarm:main",
         ],
     },
 )
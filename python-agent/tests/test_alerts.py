@@ -0,0 +1,62 @@
+"""
+Edge Alert Tests
+Checks rule state transitions, including instances that disappear
+"""
+
+from servwatch_agent.alerts import AlertEngine
+
+DISK_RULE = {'id': 'disk-full', 'field': 'disk.drives[*].usePercent', 'threshold': 90}
+
+
+def sample(*drives):
+    return {
+        'timestamp': 1,
+        'disk': {'drives': [{'mountpoint': mountpoint, 'usePercent': use} for mountpoint, use in drives]}
+    }
+
+
+def states(events):
+    return [(event['instance'], event['state']) for event in events]
+
+
+def test_fires_and_resolves_per_instance():
+    engine = AlertEngine([DISK_RULE])
+    assert states(engine.evaluate(sample(('/', 50), ('/data', 95)), now=0)) == [('/data', 'firing')]
+    assert engine.evaluate(sample(('/', 50), ('/data', 96)), now=1) == []
+    assert states(engine.evaluate(sample(('/', 50), ('/data', 40)), now=2)) == [('/data', 'resolved')]
+
+
+def test_duration_must_elapse_before_firing():
+    engine = AlertEngine([{**DISK_RULE, 'duration': 10}])
+    assert engine.evaluate(sample(('/data', 95)), now=0) == []
+    assert engine.breaching()
+    assert engine.evaluate(sample(('/data', 95)), now=5) == []
+    assert states(engine.evaluate(sample(('/data', 95)), now=10)) == [('/data', 'firing')]
+
+
+def test_vanished_firing_instance_goes_stale():
+    engine = AlertEngine([DISK_RULE])
+    engine.evaluate(sample(('/', 50), ('/data', 95)), now=0)
+
+    events = engine.evaluate(sample(('/', 50)), now=1)
+    assert states(events) == [('/data', 'stale')]
+    assert events[0]['value'] == 95
+    assert engine.firing() == []
+
+
+def test_vanished_instance_starts_over_when_it_returns():
+    engine = AlertEngine([{**DISK_RULE, 'duration': 10}])
+    engine.evaluate(sample(('/data', 95)), now=0)
+    assert engine.evaluate(sample(), now=5) == []
+    assert not engine.breaching()
+
+    # The breach that began before the disk vanished does not count
+    assert engine.evaluate(sample(('/data', 95)), now=11) == []
+    assert states(engine.evaluate(sample(('/data', 95)), now=21)) == [('/data', 'firing')]
+
+
+def test_removed_rule_resolves_firing_instances():
+    engine = AlertEngine([DISK_RULE])
+    engine.evaluate(sample(('/data', 95)), now=0)
+    engine.load([])
+    assert states(engine.evaluate(sample(('/data', 95)), now=1)) == [('/data', 'resolved')]
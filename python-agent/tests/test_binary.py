@@ -0,0 +1,136 @@
+"""
+Binary Wire Format Tests
+Round trips through encode_frame() and the reference decoder
+"""
+
+import json
+import math
+import struct
+
+import pytest
+
+from servwatch_agent.transmitters.binary import (
+    MAGIC, SCHEMA_VERSION, FrameError, decode_frame, encode_frame
+)
+
+
+def _gpu(index):
+    return {
+        'index': index, 'name': f'GPU {index}', 'usage': 40.0, 'memoryUsage': 25.0,
+        'vram': 24 * 1024 ** 3, 'vramUsed': 6 * 1024 ** 3, 'temperature': 61.0,
+        'powerUsage': 180.5, 'fanSpeed': 30.0, 'clockSpeed': 1980, 'memoryClockSpeed': 10501
+    }
+
+
+def _payload(gpus=0):
+    metrics = {
+        'timestamp': 1760000000123,
+        'cpu': {
+            'usage': 12.5, 'loadAverage': [0.5, 0.25, 0.125], 'speed': 3.5,
+            'perCore': [10.0, 15.0], 'cores': 2, 'brand': 'Test CPU'
+        },
+        'memory': {
+            'total': 16 * 1024 ** 3, 'used': 8 * 1024 ** 3, 'free': 8 * 1024 ** 3,
+            'swapTotal': 0, 'swapUsed': 0, 'percentage': 50.0
+        },
+        'disk': {
+            'drives': [{'fs': '/dev/sda1', 'mount': '/', 'usePercent': 42.0}],
+            'io': {'readBytes_sec': 1024.0, 'writeBytes_sec': 2048.0, 'readCount_sec': 4.0,
+                   'writeCount_sec': 8.0, 'devices': [{'name': 'sda', 'util': 3.0}]}
+        },
+        'network': {'interfaces': [{'iface': 'eth0'}], 'stats': [], 'totalRx': 512.0, 'totalTx': 256.0},
+        'processes': {'all': 120, 'list': [{'pid': 1, 'name': 'init'}]}
+    }
+    if gpus:
+        metrics['gpu'] = {'count': gpus, 'controllers': [_gpu(i) for i in range(gpus)]}
+    return metrics
+
+
+def test_round_trip_without_gpus():
+    metrics = _payload()
+    assert decode_frame(encode_frame(metrics)) == metrics
+
+
+def test_round_trip_with_gpus():
+    metrics = _payload(gpus=2)
+    assert decode_frame(encode_frame(metrics)) == metrics
+
+
+def test_more_than_255_gpus_are_kept():
+    metrics = _payload(gpus=300)
+    decoded = decode_frame(encode_frame(metrics))
+    assert len(decoded['gpu']['controllers']) == 300
+    assert decoded == metrics
+
+
+def test_encoding_does_not_modify_the_payload():
+    metrics = _payload(gpus=1)
+    before = json.dumps(metrics, sort_keys=True)
+    encode_frame(metrics)
+    assert json.dumps(metrics, sort_keys=True) == before
+
+
+def test_none_fields_round_trip():
+    metrics = _payload(gpus=1)
+    metrics['cpu']['speed'] = None
+    metrics['cpu']['loadAverage'] = [None, None, None]
+    metrics['memory']['swapTotal'] = None
+    metrics['gpu']['controllers'][0].update(temperature=None, vram=None, clockSpeed=None)
+    assert decode_frame(encode_frame(metrics)) == metrics
+
+
+def test_nan_fields_round_trip():
+    metrics = _payload(gpus=1)
+    metrics['cpu']['usage'] = math.nan
+    metrics['gpu']['controllers'][0]['vram'] = math.nan
+    decoded = decode_frame(encode_frame(metrics))
+    assert math.isnan(decoded['cpu']['usage'])
+    assert math.isnan(decoded['gpu']['controllers'][0]['vram'])
+
+
+def test_missing_core_fields_decode_as_zero():
+    decoded = decode_frame(encode_frame({'timestamp': 1, 'cpu': {'usage': 5.0}}))
+    assert decoded['cpu'] == {'usage': 5.0, 'loadAverage': [0, 0, 0], 'speed': 0, 'perCore': []}
+
+
+def _document(frame):
+    """Find the length-prefixed JSON document that ends a frame"""
+    for offset in range(len(frame) - 4):
+        (length,) = struct.unpack_from('<I', frame, offset)
+        if offset + 4 + length == len(frame) and frame[offset + 4:offset + 5] == b'{':
+            return json.loads(frame[offset + 4:])
+    raise AssertionError('no JSON document')
+
+
+def test_json_remainder_carries_non_core_fields():
+    metrics = _payload()
+    metrics['agent'] = {'cpuPercent': 0.5}
+    metrics['sectionAge'] = {'cpu': 0, 'processes': 2000}
+    frame = encode_frame(metrics)
+    document = _document(frame)
+    assert document['agent'] == {'cpuPercent': 0.5}
+    assert document['processes'] == metrics['processes']
+    assert 'usage' not in document['cpu']
+    assert 'totalRx' not in document['network']
+    assert decode_frame(frame) == metrics
+
+
+def test_unsupported_version_is_rejected():
+    frame = bytearray(encode_frame(_payload()))
+    assert frame[:2] == MAGIC and frame[2] == SCHEMA_VERSION
+    frame[2] = SCHEMA_VERSION + 1
+    with pytest.raises(FrameError, match='unsupported schema version'):
+        decode_frame(bytes(frame))
+
+
+def test_bad_magic_is_rejected():
+    with pytest.raises(FrameError, match='magic'):
+        decode_frame(b'XX' + encode_frame(_payload())[2:])
+
+
+def test_truncated_frame_is_rejected():
+    frame = encode_frame(_payload(gpus=1))
+    with pytest.raises(FrameError):
+        decode_frame(frame[:-5])
+    with pytest.raises(FrameError):
+        decode_frame(frame[:20])
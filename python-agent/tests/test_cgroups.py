@@ -0,0 +1,128 @@
+"""
+Cgroup Collector Tests
+CgroupCollector against a fake cgroup v2 hierarchy in a temporary directory
+"""
+
+import os
+
+import pytest
+
+from servwatch_agent.collectors import cgroups as cgroups_module
+from servwatch_agent.collectors.cgroups import CgroupCollector
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cgroups_module.time, 'monotonic', clock.monotonic)
+    return clock
+
+
+def _write(path, name, content):
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, name), 'w') as f:
+        f.write(content)
+
+
+def _cgroup(root, name, usage_usec, rbytes=0, memory_max='max', pgfault=0):
+    path = os.path.join(root, name)
+    _write(path, 'cpu.stat', f'usage_usec {usage_usec}\nuser_usec {usage_usec // 2}\n'
+                             f'system_usec {usage_usec // 2}\nnr_throttled 0\nthrottled_usec 0\n')
+    _write(path, 'memory.current', '1048576\n')
+    _write(path, 'memory.max', f'{memory_max}\n')
+    _write(path, 'memory.stat', f'anon 4096\nfile 8192\nkernel 512\nshmem 0\npgfault {pgfault}\n'
+                                f'pgmajfault 0\n')
+    _write(path, 'io.stat', f'8:0 rbytes={rbytes} wbytes=0 rios=1 wios=0\n'
+                            f'8:16 rbytes={rbytes} wbytes=0 rios=1 wios=0\n')
+    _write(path, 'pids.current', '3\n')
+    _write(path, 'cpu.pressure', 'some avg10=1.00 avg60=0.50 avg300=0.25 total=0\n'
+                                 'full avg10=0.00 avg60=0.00 avg300=0.00 total=0\n')
+    return path
+
+
+@pytest.fixture
+def root(tmp_path):
+    root = str(tmp_path)
+    _write(root, 'cgroup.controllers', 'cpu io memory pids\n')
+    return root
+
+
+def test_missing_hierarchy_disables_the_collector(tmp_path):
+    collector = CgroupCollector(root=str(tmp_path))
+    assert not collector.available
+    assert collector.collect() == {'count': 0, 'cgroups': []}
+
+
+def test_rates_and_ranking(root, clock):
+    _cgroup(root, 'idle.service', 1_000_000)
+    _cgroup(root, 'busy.service', 1_000_000, memory_max='2097152')
+    _cgroup(root, 'system.slice/nested.service', 1_000_000)
+
+    collector = CgroupCollector(root=root, max_cgroups=2)
+    first = collector.collect()
+    assert first['count'] == 4  # system.slice itself is a cgroup too
+    assert all(entry['cpu']['usage'] == 0 for entry in first['cgroups'])
+
+    clock.now += 2.0
+    _cgroup(root, 'busy.service', 2_000_000, memory_max='2097152')
+    _cgroup(root, 'system.slice/nested.service', 1_200_000)
+    second = collector.collect()
+
+    names = [entry['name'] for entry in second['cgroups']]
+    assert names == ['/busy.service', '/system.slice/nested.service']
+    busy_entry = second['cgroups'][0]
+    # 1s of CPU time over 2s
+    assert busy_entry['cpu']['usage'] == pytest.approx(50.0)
+    assert busy_entry['cpu']['user'] == pytest.approx(25.0)
+    assert busy_entry['memory']['max'] == 2097152
+    assert busy_entry['memory']['anon'] == 4096
+    assert busy_entry['pids'] == 3
+    assert busy_entry['pressure']['cpu']['some']['avg10'] == 1.0
+
+
+def test_io_and_memory_rates_need_a_previous_report(root, clock):
+    _cgroup(root, 'a.service', 0, rbytes=0)
+    collector = CgroupCollector(root=root)
+    collector.collect()
+    clock.now += 1.0
+    collector.collect()
+    clock.now += 1.0
+    _cgroup(root, 'a.service', 0, rbytes=1000, pgfault=50)
+    (entry,) = collector.collect()['cgroups']
+    # io.stat is summed across devices
+    assert entry['io']['readBytes_sec'] == pytest.approx(2000)
+    assert entry['memory']['pgfault_sec'] == pytest.approx(50)
+    assert entry['memory']['max'] is None
+
+
+def test_index_is_refreshed_only_after_the_rescan_interval(root, clock):
+    _cgroup(root, 'a.service', 0)
+    collector = CgroupCollector(root=root, rescan_interval=30)
+    assert collector.collect()['count'] == 1
+
+    _cgroup(root, 'b.service', 0)
+    clock.now += 10
+    assert collector.collect()['count'] == 1
+    clock.now += 30
+    assert collector.collect()['count'] == 2
+
+
+def test_removed_cgroup_is_skipped(root, clock):
+    _cgroup(root, 'a.service', 0)
+    gone = _cgroup(root, 'b.service', 0)
+    collector = CgroupCollector(root=root)
+    collector.collect()
+    for name in os.listdir(gone):
+        os.remove(os.path.join(gone, name))
+    os.rmdir(gone)
+
+    clock.now += 1
+    assert [e['name'] for e in collector.collect()['cgroups']] == ['/a.service']
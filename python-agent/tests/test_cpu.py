@@ -0,0 +1,50 @@
+"""
+CPU Sampler Tests
+Checks /proc/stat deltas, including CPUs going offline and online
+"""
+
+from servwatch_agent.collectors.cpu import CPUSampler
+
+
+def write_stat(path, cores):
+    """Write a /proc/stat with (user, idle) jiffies per core id"""
+    user = sum(u for u, _ in cores.values())
+    idle = sum(i for _, i in cores.values())
+    lines = [f'cpu  {user} 0 0 {idle} 0 0 0 0 0 0']
+    lines += [f'cpu{core} {u} 0 0 {i} 0 0 0 0 0 0' for core, (u, i) in sorted(cores.items())]
+    lines.append('intr 0')
+    path.write_text('\n'.join(lines) + '\n')
+
+
+def test_usage_from_deltas(tmp_path):
+    stat = tmp_path / 'stat'
+    write_stat(stat, {0: (0, 0), 1: (0, 0)})
+    sampler = CPUSampler(str(stat))
+    assert sampler.sample()['perCore'] == [0.0, 0.0]
+
+    write_stat(stat, {0: (100, 0), 1: (0, 100)})
+    sample = sampler.sample()
+    assert sample['usage'] == 50.0
+    assert sample['perCore'] == [100.0, 0.0]
+    assert sample['breakdown']['user'] == 50.0
+
+
+def test_cores_are_matched_by_id_when_one_goes_offline(tmp_path):
+    stat = tmp_path / 'stat'
+    write_stat(stat, {0: (0, 0), 1: (500, 0), 2: (0, 1000)})
+    sampler = CPUSampler(str(stat))
+    sampler.sample()
+
+    # cpu1 went offline: cpu2 is now second in the file but must be compared with cpu2
+    write_stat(stat, {0: (50, 50), 2: (100, 1000)})
+    assert sampler.sample()['perCore'] == [50.0, 100.0]
+
+
+def test_core_coming_online_starts_at_zero(tmp_path):
+    stat = tmp_path / 'stat'
+    write_stat(stat, {0: (0, 0), 2: (0, 0)})
+    sampler = CPUSampler(str(stat))
+    sampler.sample()
+
+    write_stat(stat, {0: (10, 10), 1: (900, 0), 2: (0, 20)})
+    assert sampler.sample()['perCore'] == [50.0, 0.0, 0.0]
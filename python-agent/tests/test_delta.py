@@ -0,0 +1,132 @@
+"""
+Delta Encoding Tests
+make_diff()/apply_diff() round trips and DeltaEncoder keyframe handling
+"""
+
+import copy
+
+import pytest
+
+from servwatch_agent.transmitters.delta import (
+    DELETE_MARKER, LIST_MARKER, UNCHANGED, DeltaEncoder, apply_diff, make_diff
+)
+
+BASE = {
+    'timestamp': 1000,
+    'cpu': {'usage': 10.0, 'perCore': [5.0, 15.0], 'brand': 'Test CPU'},
+    'memory': {'used': 100, 'free': 900},
+    'network': {'interfaces': [{'iface': 'eth0', 'mtu': 1500}, {'iface': 'lo', 'mtu': 65536}]},
+    'processes': {'list': [{'pid': 1, 'cpu': 0.1}, {'pid': 2, 'cpu': 0.2}]}
+}
+
+
+def _changed(**updates):
+    value = copy.deepcopy(BASE)
+    for path, item in updates.items():
+        *parents, key = path.split('__')
+        target = value
+        for parent in parents:
+            target = target[parent]
+        target[key] = item
+    return value
+
+
+@pytest.mark.parametrize('value', [
+    _changed(timestamp=2000),
+    _changed(cpu__usage=55.5),
+    _changed(cpu__perCore=[5.0, 15.0, 25.0, 35.0]),
+    _changed(cpu__perCore=[5.0]),
+    _changed(cpu__perCore=[]),
+    _changed(processes__list=[{'pid': 2, 'cpu': 0.2}]),
+    _changed(memory={'used': 100}),
+    _changed(memory=None),
+    _changed(memory=[1, 2]),
+    _changed(network__interfaces=[{'iface': 'eth0', 'mtu': 9000, 'speed': 1000}]),
+    _changed(gpu={'count': 0, 'controllers': []}),
+])
+def test_round_trip(value):
+    diff = make_diff(BASE, value)
+    assert apply_diff(BASE, diff) == value
+
+
+def test_removed_keys_are_listed():
+    value = copy.deepcopy(BASE)
+    del value['memory']
+    del value['cpu']['brand']
+    diff = make_diff(BASE, value)
+    assert diff[DELETE_MARKER] == ['memory']
+    assert diff['cpu'] == {DELETE_MARKER: ['brand']}
+    assert apply_diff(BASE, diff) == value
+
+
+def test_unchanged_value_has_no_diff():
+    assert make_diff(BASE, copy.deepcopy(BASE)) is UNCHANGED
+
+
+def test_diff_only_carries_changes():
+    diff = make_diff(BASE, _changed(cpu__usage=20.0, timestamp=2000))
+    assert diff == {'timestamp': 2000, 'cpu': {'usage': 20.0}}
+
+
+def test_list_diff_is_indexed():
+    diff = make_diff(BASE, _changed(cpu__perCore=[5.0, 16.0, 25.0]))
+    assert diff['cpu']['perCore'] == {'1': 16.0, '2': 25.0, LIST_MARKER: 3}
+
+
+def test_type_changes_replace_the_value():
+    assert make_diff({'a': 1}, {'a': 1.0}) == {'a': 1.0}
+    assert make_diff([1], {'0': 1}) == {'0': 1}
+
+
+def test_apply_does_not_modify_the_base():
+    before = copy.deepcopy(BASE)
+    value = _changed(cpu__perCore=[1.0], network__interfaces=[])
+    result = apply_diff(BASE, make_diff(BASE, value))
+    result['cpu']['brand'] = 'changed'
+    assert BASE == before
+
+
+def test_encoder_sends_keyframe_until_acknowledged():
+    encoder = DeltaEncoder(keyframe_interval=10)
+    is_key, key_id, body = encoder.encode(BASE)
+    assert is_key and body == BASE
+    is_key, second_id, _ = encoder.encode(BASE)
+    assert is_key and second_id != key_id
+
+    encoder.acknowledge(second_id)
+    value = _changed(cpu__usage=30.0)
+    is_key, base_id, diff = encoder.encode(value)
+    assert not is_key and base_id == second_id
+    assert apply_diff(BASE, diff) == value
+
+
+def test_encoder_diffs_against_the_keyframe():
+    encoder = DeltaEncoder(keyframe_interval=10)
+    _, key_id, _ = encoder.encode(BASE)
+    encoder.acknowledge(key_id)
+    encoder.encode(_changed(cpu__usage=30.0))
+    _, _, diff = encoder.encode(_changed(timestamp=3000))
+    # A lost delta does not matter, every delta is relative to the keyframe
+    assert diff == {'timestamp': 3000}
+
+
+def test_encoder_keyframe_interval_and_reset():
+    encoder = DeltaEncoder(keyframe_interval=2)
+    _, key_id, _ = encoder.encode(BASE)
+    encoder.acknowledge(key_id)
+    assert [encoder.encode(BASE)[0] for _ in range(3)] == [False, False, True]
+
+    encoder.acknowledge(encoder.encode(BASE)[1])
+    encoder.reset()
+    assert encoder.encode(BASE)[0]
+
+
+def test_stale_acknowledgement_is_ignored():
+    encoder = DeltaEncoder()
+    _, first, _ = encoder.encode(BASE)
+    _, second, _ = encoder.encode(_changed(timestamp=2000))
+    # Only the newest keyframe is kept pending
+    encoder.acknowledge(first)
+    encoder.acknowledge(second)
+    is_key, base_id, diff = encoder.encode(_changed(timestamp=2000))
+    assert not is_key and base_id == second and diff == {}
@@ -0,0 +1,112 @@
+"""
+Disk Statistics Tests
+Checks totals and per-device rates against a fake /proc/diskstats and /sys/block
+"""
+
+import pytest
+
+from servwatch_agent.collectors.diskstats import DiskStatsSampler
+
+
+def diskstats_line(major, minor, name, reads=0, read_sectors=0, writes=0, write_sectors=0):
+    fields = [major, minor, name, reads, 0, read_sectors, 0, writes, 0, write_sectors, 0, 0, 0, 0]
+    return ' '.join(str(f) for f in fields)
+
+
+ZERO = {'sda': (0, 0, 0, 0), 'sdb': (0, 0, 0, 0), 'loop0': (0, 0, 0, 0), 'nvme0n1': (0, 0, 0, 0)}
+
+
+def write(proc, counts):
+    lines = [
+        diskstats_line(8, 0, 'sda', *counts['sda']),
+        diskstats_line(8, 1, 'sda1', *counts['sda']),
+        diskstats_line(8, 16, 'sdb', *counts['sdb']),
+        diskstats_line(253, 0, 'dm-0', *counts['sda']),
+        diskstats_line(9, 0, 'md0', *counts['sdb']),
+        diskstats_line(7, 0, 'loop0', *counts['loop0']),
+        diskstats_line(259, 0, 'nvme0n1', *counts['nvme0n1']),
+    ]
+    (proc / 'diskstats').write_text('\n'.join(lines) + '\n')
+
+
+@pytest.fixture
+def tree(tmp_path):
+    proc = tmp_path / 'proc'
+    sys_block = tmp_path / 'block'
+    proc.mkdir()
+    for name in ('sda', 'sdb', 'dm-0', 'md0', 'loop0', 'nvme0n1'):
+        (sys_block / name / 'slaves').mkdir(parents=True)
+    (sys_block / 'dm-0' / 'slaves' / 'sda1').touch()
+    (sys_block / 'md0' / 'slaves' / 'sdb').touch()
+    (sys_block / 'loop0' / 'loop').mkdir()
+    (sys_block / 'loop0' / 'loop' / 'backing_file').write_text('/var/lib/image\n')
+    write(proc, ZERO)
+    return proc, sys_block
+
+
+def sample_twice(sampler, proc):
+    assert sampler.sample() is None
+    write(proc, {'sda': (10, 80, 5, 40), 'sdb': (20, 160, 0, 0),
+                 'loop0': (4, 32, 0, 0), 'nvme0n1': (1, 8, 1, 8)})
+    return sampler.sample()
+
+
+def test_stacked_devices_are_left_out_of_totals(tree):
+    proc, sys_block = tree
+    sampler = DiskStatsSampler(exclude=[], proc_root=str(proc), sys_block=str(sys_block))
+    result = sample_twice(sampler, proc)
+
+    # sda + sdb + nvme0n1; dm-0, md0 and loop0 pass their I/O to the disks below
+    assert result['readCount'] == 31
+    assert result['readBytes'] == (80 + 160 + 8) * 512
+    assert result['writeCount'] == 6
+
+
+def test_stacked_devices_are_still_reported(tree):
+    proc, sys_block = tree
+    sampler = DiskStatsSampler(exclude=[], proc_root=str(proc), sys_block=str(sys_block))
+    result = sample_twice(sampler, proc)
+
+    devices = {d['name']: d for d in result['devices']}
+    assert sorted(devices) == ['dm-0', 'loop0', 'md0', 'nvme0n1', 'sda', 'sdb']
+    assert devices['dm-0']['readBytes_sec'] > 0
+
+
+def test_excluded_disks_still_count_towards_totals(tree):
+    proc, sys_block = tree
+    sampler = DiskStatsSampler(exclude=['nvme*'], proc_root=str(proc), sys_block=str(sys_block))
+    result = sample_twice(sampler, proc)
+
+    assert 'nvme0n1' not in {d['name'] for d in result['devices']}
+    assert result['readCount'] == 31
+
+
+
+
+def test_reused_name_is_classified_again(tree):
+    proc, sys_block = tree
+    sampler = DiskStatsSampler(exclude=[], proc_root=str(proc), sys_block=str(sys_block))
+    sampler.sample()
+    assert sampler._kinds['dm-0'][1] is False
+
+    # dm-0 removed and the name reused for a device with nothing below it
+    (sys_block / 'dm-0' / 'slaves' / 'sda1').unlink()
+    text = (proc / 'diskstats').read_text().replace('253 0 dm-0', '253 5 dm-0')
+    (proc / 'diskstats').write_text(text)
+    sampler.sample()
+    assert sampler._kinds['dm-0'][1] is True
+
+
+def test_classification_is_refreshed_periodically(tree):
+    proc, sys_block = tree
+    sampler = DiskStatsSampler(exclude=[], proc_root=str(proc), sys_block=str(sys_block))
+    sampler.sample()
+    assert sampler._kinds['md0'][1] is False
+
+    # Same device list, but the array lost its members
+    (sys_block / 'md0' / 'slaves' / 'sdb').unlink()
+    sampler.sample()
+    assert sampler._kinds['md0'][1] is False
+    sampler._kinds_time -= 61
+    sampler.sample()
+    assert sampler._kinds['md0'][1] is True
@@ -0,0 +1,241 @@
+"""
+GPU Engine Tests
+GPUEngine against a fake NVML module
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from servwatch_agent.collectors.gpu import GPUEngine
+
+NOT_SUPPORTED = 3
+
+
+class NVMLError(Exception):
+    def __init__(self, value):
+        super().__init__(f'NVML error {value}')
+        self.value = value
+
+
+class FakeNVML:
+    """Minimal stand-in for the pynvml module, recording every call"""
+
+    NVML_ERROR_NOT_SUPPORTED = NOT_SUPPORTED
+    NVML_CLOCK_GRAPHICS = 0
+    NVML_CLOCK_MEM = 2
+    NVML_TEMPERATURE_GPU = 0
+    NVML_FI_DEV_POWER_INSTANT = 186
+    NVML_FI_DEV_MEMORY_TEMP = 82
+    NVML_FI_DEV_TOTAL_ENERGY_CONSUMPTION = 83
+
+    def __init__(self, count=1, fields=(186, 82, 83), fan=True, field_values=True):
+        self.count = count
+        self.supported_fields = set(fields)
+        self.fan = fan
+        self.calls = []
+        self.field_values = field_values
+
+    def __getattribute__(self, name):
+        if name.startswith('nvml'):
+            if name == 'nvmlDeviceGetFieldValues' and not object.__getattribute__(self, 'field_values'):
+                raise AttributeError(name)
+            object.__getattribute__(self, 'calls').append(name)
+        return object.__getattribute__(self, name)
+
+    def nvmlInit(self):
+        pass
+
+    def nvmlShutdown(self):
+        pass
+
+    def nvmlDeviceGetCount(self):
+        return self.count
+
+    def nvmlDeviceGetHandleByIndex(self, index):
+        return f'handle{index}'
+
+    def nvmlDeviceGetName(self, handle):
+        return b'Fake GPU'
+
+    def nvmlDeviceGetUUID(self, handle):
+        return f'GPU-{handle}'
+
+    def nvmlDeviceGetMemoryInfo(self, handle):
+        return SimpleNamespace(total=8000, used=2000, free=6000)
+
+    def nvmlDeviceGetMaxClockInfo(self, handle, clock):
+        return 2000 if clock == self.NVML_CLOCK_GRAPHICS else 9000
+
+    def nvmlDeviceGetUtilizationRates(self, handle):
+        return SimpleNamespace(gpu=55, memory=20)
+
+    def nvmlDeviceGetTemperature(self, handle, sensor):
+        return 65
+
+    def nvmlDeviceGetPowerUsage(self, handle):
+        return 150000
+
+    def nvmlDeviceGetFanSpeed(self, handle):
+        if not self.fan:
+            raise NVMLError(NOT_SUPPORTED)
+        return 40
+
+    def nvmlDeviceGetClockInfo(self, handle, clock):
+        return 1500 if clock == self.NVML_CLOCK_GRAPHICS else 8000
+
+    def nvmlDeviceGetFieldValues(self, handle, field_ids):
+        values = {186: (1, SimpleNamespace(uiVal=120500)),
+                  82: (1, SimpleNamespace(uiVal=70)),
+                  83: (3, SimpleNamespace(ullVal=5000000))}
+        result = []
+        for fid in field_ids:
+            if fid in self.supported_fields:
+                value_type, value = values[fid]
+                result.append(SimpleNamespace(nvmlReturn=0, valueType=value_type, value=value))
+            else:
+                result.append(SimpleNamespace(nvmlReturn=NOT_SUPPORTED, valueType=0, value=None))
+        return result
+
+
+def _count(nvml, name):
+    return sum(1 for call in nvml.calls if call == name)
+
+
+def test_static_information_is_read_once():
+    nvml = FakeNVML(count=2)
+    engine = GPUEngine(nvml, max_age=0)
+    engine.read()
+    engine.read()
+    assert _count(nvml, 'nvmlDeviceGetHandleByIndex') == 2
+    assert _count(nvml, 'nvmlDeviceGetName') == 2
+    assert [d.name for d in engine.devices] == ['Fake GPU', 'Fake GPU']
+    assert engine.devices[1].uuid == 'GPU-handle1'
+    assert engine.devices[0].clock_max == 2000 and engine.devices[0].memory_clock_max == 9000
+
+
+def test_reading():
+    engine = GPUEngine(FakeNVML(), max_age=0)
+    (reading,) = engine.read()
+    assert reading == {
+        'usage': 55, 'memoryUsage': 20, 'vramUsed': 2000, 'vramFree': 6000, 'temperature': 65,
+        'powerUsage': pytest.approx(120.5), 'fanSpeed': 40, 'clockSpeed': 1500,
+        'memoryClockSpeed': 8000, 'memoryTemperature': 70, 'energy': pytest.approx(5000)
+    }
+
+
+def test_fields_are_fetched_in_one_call_per_device():
+    nvml = FakeNVML(count=3)
+    engine = GPUEngine(nvml, max_age=0)
+    nvml.calls.clear()
+    engine.read()
+    assert _count(nvml, 'nvmlDeviceGetFieldValues') == 3
+    assert _count(nvml, 'nvmlDeviceGetPowerUsage') == 0
+
+
+def test_unsupported_fields_are_dropped_at_probe():
+    nvml = FakeNVML(fields=(82,))
+    engine = GPUEngine(nvml, max_age=0)
+    assert engine.devices[0].field_ids == [82]
+    (reading,) = engine.read()
+    # Power falls back to the individual call
+    assert reading['powerUsage'] == 150
+    assert reading['memoryTemperature'] == 70 and 'energy' not in reading
+
+
+def test_driver_without_field_values():
+    nvml = FakeNVML(field_values=False)
+    engine = GPUEngine(nvml, max_age=0)
+    (reading,) = engine.read()
+    assert reading['powerUsage'] == 150
+    assert 'memoryTemperature' not in reading
+
+
+def test_unsupported_fan_is_not_queried_again():
+    nvml = FakeNVML(fan=False)
+    engine = GPUEngine(nvml, max_age=0)
+    for _ in range(3):
+        (reading,) = engine.read()
+    assert reading['fanSpeed'] == 0
+    assert _count(nvml, 'nvmlDeviceGetFanSpeed') == 1
+
+
+def test_reading_is_shared_within_max_age():
+    nvml = FakeNVML()
+    engine = GPUEngine(nvml, max_age=60)
+    first = engine.read()
+    assert engine.read() is first
+    assert _count(nvml, 'nvmlDeviceGetUtilizationRates') == 1
+    assert engine.read(max_age=0) is not first
+
+
+def test_missing_nvml_disables_the_engine():
+    class Broken(FakeNVML):
+        def nvmlInit(self):
+            raise NVMLError(9)
+
+    engine = GPUEngine(Broken())
+    assert not engine.available
+    assert engine.read() == [] and engine.read_processes() == {}
+
+
+class FakeProcessNVML(FakeNVML):
+    """Fake NVML with running compute processes and utilization samples per device"""
+
+    def __init__(self, running, samples, **kwargs):
+        super().__init__(count=len(running), **kwargs)
+        self.running = running
+        self.samples = samples
+        self.last_seen_args = []
+
+    def nvmlDeviceGetComputeRunningProcesses(self, handle):
+        return self.running[int(handle[len('handle'):])]
+
+    def nvmlDeviceGetProcessUtilization(self, handle, last_seen):
+        self.last_seen_args.append(last_seen)
+        samples = self.samples[int(handle[len('handle'):])]
+        if samples is None:
+            raise NVMLError(NOT_SUPPORTED)
+        return [s for s in samples if s.timeStamp > last_seen]
+
+
+def _running(pid, memory):
+    return SimpleNamespace(pid=pid, usedGpuMemory=memory)
+
+
+def _sample(pid, timestamp, sm, mem):
+    return SimpleNamespace(pid=pid, timeStamp=timestamp, smUtil=sm, memUtil=mem)
+
+
+def test_processes_are_merged_across_devices():
+    nvml = FakeProcessNVML(
+        running=[[_running(10, 1000), _running(11, None)], [_running(10, 500)]],
+        samples=[[_sample(10, 5, 30, 10)], [_sample(10, 6, 50, 5), _sample(12, 6, 7, 1)]]
+    )
+    processes = GPUEngine(nvml).read_processes()
+    assert processes[10] == {'pid': 10, 'gpus': [0, 1], 'gpuMemory': 1500, 'smUtil': 50, 'memUtil': 10}
+    # usedGpuMemory is None when the driver cannot tell
+    assert processes[11]['gpuMemory'] == 0
+    # Utilization without a running compute context (e.g. graphics)
+    assert processes[12] == {'pid': 12, 'gpus': [1], 'gpuMemory': 0, 'smUtil': 7, 'memUtil': 1}
+
+
+def test_only_new_process_samples_are_used():
+    nvml = FakeProcessNVML(
+        running=[[_running(10, 1000)]],
+        samples=[[_sample(10, 5, 30, 10), _sample(10, 9, 40, 20)]]
+    )
+    engine = GPUEngine(nvml)
+    assert engine.read_processes()[10]['smUtil'] == 40
+    # No samples newer than the last call: the process was idle
+    assert engine.read_processes()[10]['smUtil'] == 0
+    assert nvml.last_seen_args == [0, 9]
+
+
+def test_unsupported_process_utilization_is_not_queried_again():
+    nvml = FakeProcessNVML(running=[[_running(10, 1000)]], samples=[None])
+    engine = GPUEngine(nvml)
+    engine.read_processes()
+    processes = engine.read_processes()
+    assert processes[10]['gpuMemory'] == 1000
+    assert len(nvml.last_seen_args) == 1
@@ -0,0 +1,116 @@
+"""
+Mount Table Tests
+Checks per-call statvfs deadlines and pool growth against a fake mountinfo
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+import pytest
+
+from servwatch_agent.collectors import mounts as mounts_module
+from servwatch_agent.collectors.mounts import MountTable
+
+Usage = namedtuple('Usage', 'total used free percent')
+
+
+@pytest.fixture
+def proc_root(tmp_path):
+    (tmp_path / 'self').mkdir()
+    lines = [
+        f'{20 + i} 1 8:{i} / /mnt/{name} rw - ext4 /dev/sd{name} rw'
+        for i, name in enumerate(['a', 'b', 'c'])
+    ]
+    (tmp_path / 'self' / 'mountinfo').write_text('\n'.join(lines) + '\n')
+    (tmp_path / 'filesystems').write_text('\text4\nnodev\tproc\n')
+    return tmp_path
+
+
+@pytest.fixture
+def hung(monkeypatch):
+    """Make statvfs on the mountpoints in the returned set block until released"""
+    blocked = set()
+    release = threading.Event()
+
+    def disk_usage(mountpoint):
+        if mountpoint in blocked:
+            release.wait(5)
+        return Usage(100, 40, 60, 40.0)
+
+    monkeypatch.setattr(mounts_module.psutil, 'disk_usage', disk_usage)
+    yield blocked
+    release.set()
+
+
+def by_mountpoint(partitions):
+    return {p['mountpoint']: p for p in partitions}
+
+
+def test_collects_every_mount(proc_root, hung):
+    table = MountTable(timeout=1.0, workers=2, proc_root=str(proc_root))
+    partitions = by_mountpoint(table.collect())
+
+    assert sorted(partitions) == ['/mnt/a', '/mnt/b', '/mnt/c']
+    assert partitions['/mnt/a']['usePercent'] == 40.0
+    assert 'stale' not in partitions['/mnt/a']
+
+
+def test_hung_mount_is_stale_and_not_resubmitted(proc_root, hung):
+    table = MountTable(timeout=1.0, workers=2, proc_root=str(proc_root))
+    table.collect()
+
+    hung.add('/mnt/b')
+    table.timeout = 0.1
+    partitions = by_mountpoint(table.collect())
+    assert partitions['/mnt/b']['stale'] is True
+    assert partitions['/mnt/b']['usePercent'] == 40.0
+    assert 'stale' not in partitions['/mnt/a']
+
+    pending = table._pending['/mnt/b']
+    table.collect()
+    assert table._pending['/mnt/b'] is pending
+
+
+def test_outstanding_call_is_not_waited_for_again(proc_root, hung):
+    hung.add('/mnt/b')
+    table = MountTable(timeout=0.2, workers=2, proc_root=str(proc_root))
+    table.collect()
+
+    start = time.monotonic()
+    partitions = by_mountpoint(table.collect())
+    assert time.monotonic() - start < 0.15
+    assert partitions['/mnt/b']['stale'] is True
+    assert partitions['/mnt/b']['staleAge'] is None
+
+
+def test_pool_grows_past_hung_mounts(proc_root, hung):
+    hung.update({'/mnt/a', '/mnt/b'})
+    table = MountTable(timeout=0.1, workers=1, proc_root=str(proc_root))
+    partitions = by_mountpoint(table.collect())
+    # The single worker is held by /mnt/a, so the others missed their deadline
+    assert all(p.get('stale') for p in partitions.values())
+
+    # The next tick adds a worker per outstanding call, which picks up /mnt/c
+    table.collect()
+    assert table._pool.size == 4
+    time.sleep(0.05)
+    partitions = by_mountpoint(table.collect())
+    assert 'stale' not in partitions['/mnt/c']
+    assert partitions['/mnt/a']['stale'] and partitions['/mnt/b']['stale']
+
+
+def test_call_hung_on_a_detached_mount_still_holds_a_worker(proc_root, hung):
+    hung.add('/mnt/b')
+    table = MountTable(timeout=0.1, workers=2, proc_root=str(proc_root))
+    table.collect()
+
+    # umount -l of the dead share while its statvfs is still outstanding
+    mountinfo = proc_root / 'self' / 'mountinfo'
+    mountinfo.write_text(''.join(line + '\n' for line in mountinfo.read_text().splitlines()
+                                 if '/mnt/b' not in line))
+    table._mounts = None
+    partitions = by_mountpoint(table.collect())
+    assert sorted(partitions) == ['/mnt/a', '/mnt/c']
+    assert '/mnt/b' not in table._pending and len(table._orphaned) == 1
+    assert table._pool.size == 3
@@ -0,0 +1,68 @@
+"""
+Process Scanner Tests
+Checks the /proc fast path against a fake proc tree
+"""
+
+import pytest
+
+from servwatch_agent.collectors.processes import ProcessScanner
+
+
+def write_stat(root, pid, comm, state='S', ticks=0, starttime=100, rss=10):
+    """Write a /proc/<pid>/stat line with the fields the scanner reads"""
+    fields = [state] + ['0'] * 10 + [str(ticks), '0'] + ['0'] * 6 + [str(starttime), '0', str(rss)]
+    directory = root / str(pid)
+    directory.mkdir(exist_ok=True)
+    (directory / 'stat').write_text(f'{pid} ({comm}) ' + ' '.join(fields) + ' 0 0\n')
+
+
+@pytest.fixture
+def proc_root(tmp_path):
+    (tmp_path / 'self').mkdir()
+    (tmp_path / 'self' / 'stat').write_text('1 (self) S\n')
+    return tmp_path
+
+
+def test_top_k_by_memory_and_status_counts(proc_root):
+    for pid in range(1, 21):
+        write_stat(proc_root, pid, f'proc {pid}', state='R' if pid % 2 else 'S', rss=pid)
+    scanner = ProcessScanner(top_k=3, proc_root=str(proc_root))
+    result = scanner.scan()
+
+    assert result['total'] == 20
+    assert result['running'] == 10 and result['sleeping'] == 10
+    assert [p['pid'] for p in result['topByMemory']] == [20, 19, 18]
+    assert result['topByMemory'][0]['name'] == 'proc 20'
+
+
+def test_cpu_from_tick_deltas(proc_root):
+    write_stat(proc_root, 10, 'busy', ticks=0)
+    write_stat(proc_root, 11, 'idle', ticks=0)
+    scanner = ProcessScanner(top_k=2, proc_root=str(proc_root))
+    scanner.scan()
+
+    write_stat(proc_root, 10, 'busy', ticks=50)
+    result = scanner.scan()
+    assert result['topByCPU'][0]['pid'] == 10
+    assert result['topByCPU'][0]['cpu'] > 0
+    assert result['topByCPU'][1]['cpu'] == 0
+
+
+def test_describe_reuses_names_from_the_last_scan(proc_root):
+    write_stat(proc_root, 10, 'worker (1)')
+    scanner = ProcessScanner(proc_root=str(proc_root))
+    scanner.scan()
+
+    # No comm file: the name must come from the parsed stat line
+    assert scanner.describe([10])[10]['name'] == 'worker (1)'
+
+
+def test_describe_reads_comm_for_unseen_processes(proc_root):
+    scanner = ProcessScanner(proc_root=str(proc_root))
+    scanner.scan()
+    write_stat(proc_root, 12, 'late')
+    (proc_root / '12' / 'comm').write_text('late\n')
+
+    described = scanner.describe([12, 13])
+    assert described[12]['name'] == 'late'
+    assert 13 not in described
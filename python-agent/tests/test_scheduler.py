@@ -0,0 +1,224 @@
+"""
+Collector Scheduler Tests
+Intervals, error handling, deadlines and quarantine
+"""
+
+import threading
+import time
+
+import pytest
+
+from servwatch_agent.scheduler import ERROR, QUARANTINED, TIMEOUT, CollectorScheduler
+
+
+class Counter:
+    """Collector returning how often it was called"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.calls
+
+
+class Hanging:
+    """Collector that blocks until released"""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.release.wait(10)
+        return 'late'
+
+
+def _boom():
+    raise RuntimeError('sensor gone')
+
+
+def test_sections_run_on_their_intervals():
+    fast, slow = Counter(), Counter()
+    scheduler = CollectorScheduler({'fast': fast, 'slow': slow}, {'slow': 5.0}, default_interval=1.0)
+    for now in (0.0, 1.0, 2.0, 3.0, 4.0, 5.0):
+        values, ages = scheduler.run(now)
+    assert fast.calls == 6 and slow.calls == 2
+    assert values == {'fast': 6, 'slow': 2}
+    assert ages == {'fast': 0, 'slow': 0}
+
+    values, ages = scheduler.run(6.5)
+    assert ages['slow'] == 1500
+
+
+def test_invalidate_forces_a_run():
+    slow = Counter()
+    scheduler = CollectorScheduler({'slow': slow}, {'slow': 60.0})
+    scheduler.run(0.0)
+    scheduler.invalidate('slow')
+    scheduler.run(1.0)
+    assert slow.calls == 2
+
+
+@pytest.mark.parametrize('workers', [0, 2])
+def test_failing_collector_keeps_the_tick(workers):
+    state = {'fail': False}
+
+    def flaky():
+        if state['fail']:
+            raise RuntimeError('sensor gone')
+        return 'ok'
+
+    scheduler = CollectorScheduler({'ok': lambda: 1, 'flaky': flaky, 'broken': _boom},
+                                   default_interval=10.0, workers=workers)
+    values, _ = scheduler.run(0.0)
+    assert values == {'ok': 1, 'flaky': 'ok'}
+    assert scheduler.status == {'broken': ERROR}
+
+    # A failure keeps the last value and is retried on the next tick
+    state['fail'] = True
+    scheduler.invalidate('flaky')
+    values, ages = scheduler.run(1.0)
+    assert values['flaky'] == 'ok' and ages['flaky'] == 1000
+    assert scheduler.status == {'broken': ERROR, 'flaky': ERROR}
+
+    state['fail'] = False
+    values, ages = scheduler.run(2.0)
+    assert ages['flaky'] == 0
+    assert scheduler.status == {'broken': ERROR}
+
+
+def test_deadline_miss_returns_last_value_and_harvests_late_result():
+    hanging = Hanging()
+    hanging.release.set()
+    scheduler = CollectorScheduler({'fast': lambda: 1, 'hang': hanging}, default_interval=0.0,
+                                   workers=2, default_deadline=0.05)
+    values, _ = scheduler.run(0.0)
+    assert values['hang'] == 'late'
+
+    hanging.release.clear()
+    start = time.perf_counter()
+    values, ages = scheduler.run(1.0)
+    assert time.perf_counter() - start < 1.0
+    assert values == {'fast': 1, 'hang': 'late'} and ages['hang'] == 1000
+    assert scheduler.status == {'hang': TIMEOUT}
+
+    # Not restarted while the previous run is still going
+    scheduler.run(2.0)
+    assert hanging.calls == 2
+
+    hanging.release.set()
+    time.sleep(0.05)
+    values, ages = scheduler.run(3.0)
+    assert ages['hang'] == 0 and 'hang' not in scheduler.status
+
+
+def test_late_result_is_dated_by_when_it_finished():
+    hanging = Hanging()
+    scheduler = CollectorScheduler({'hang': hanging}, default_interval=10.0, workers=1,
+                                   default_deadline=0.02)
+    scheduler.run(0.0)
+    hanging.release.set()
+    time.sleep(0.3)
+    values, ages = scheduler.run(1.0)
+    assert values == {'hang': 'late'} and 250 <= ages['hang'] < 1000
+
+
+def test_hung_collectors_do_not_starve_the_others():
+    hung = [Hanging(), Hanging()]
+    ok = Counter()
+    scheduler = CollectorScheduler({'hang0': hung[0], 'hang1': hung[1], 'ok': ok},
+                                   default_interval=0.0, workers=2, default_deadline=0.05,
+                                   quarantine_after=2)
+    # Queued behind the hung runs on the first tick, started once they miss
+    scheduler.run(0.0)
+    assert scheduler._pool.size == 5
+    time.sleep(0.05)
+    for tick in range(1, 6):
+        values, _ = scheduler.run(float(tick))
+        assert values['ok'] == tick + 1 and 'ok' not in scheduler.status
+    assert scheduler.status == {'hang0': QUARANTINED, 'hang1': QUARANTINED}
+    assert scheduler._pool.size == 5
+    for hanging in hung:
+        hanging.release.set()
+
+
+def test_never_collected_section_is_left_out():
+    hanging = Hanging()
+    scheduler = CollectorScheduler({'hang': hanging}, workers=1, default_deadline=0.02)
+    values, ages = scheduler.run(0.0)
+    assert values == {} and ages == {}
+    assert scheduler.status == {'hang': TIMEOUT}
+    hanging.release.set()
+
+
+def test_quarantine_after_consecutive_misses_with_doubling_backoff():
+    hanging = Hanging()
+    scheduler = CollectorScheduler({'hang': hanging}, default_interval=0.0, workers=1,
+                                   default_deadline=0.02, quarantine_after=2,
+                                   quarantine_backoff=10.0, quarantine_max=25.0)
+    scheduler.run(0.0)
+    assert scheduler.status['hang'] == TIMEOUT
+    scheduler.run(1.0)
+    assert scheduler.status['hang'] == QUARANTINED
+    task = scheduler.tasks[0]
+    assert task.quarantined_until == pytest.approx(11.0)
+
+    scheduler.run(5.0)
+    assert scheduler.status['hang'] == QUARANTINED
+
+    # Still hung when the quarantine ends: one more miss doubles it
+    scheduler.run(11.0)
+    assert task.quarantined_until == pytest.approx(31.0)
+    scheduler.run(31.0)
+    assert task.quarantined_until == pytest.approx(56.0)
+    assert hanging.calls == 1
+
+    # The late result is used, and a rerun finishing in time clears the record
+    hanging.release.set()
+    time.sleep(0.05)
+    values, ages = scheduler.run(56.0)
+    assert values == {'hang': 'late'} and hanging.calls == 2
+    assert task.quarantines == 0 and scheduler.status == {}
+
+
+def test_invalidate_lifts_quarantine():
+    hanging = Hanging()
+    scheduler = CollectorScheduler({'hang': hanging}, default_interval=0.0, workers=1,
+                                   default_deadline=0.02, quarantine_after=1, quarantine_backoff=60.0)
+    scheduler.run(0.0)
+    assert scheduler.status['hang'] == QUARANTINED
+    hanging.release.set()
+    time.sleep(0.05)
+    scheduler.invalidate()
+    values, _ = scheduler.run(1.0)
+    assert values == {'hang': 'late'}
+
+
+def test_observer_receives_run_times():
+    observed = []
+    scheduler = CollectorScheduler({'a': lambda: 1}, observer=lambda name, elapsed: observed.append(name))
+    scheduler.run(0.0)
+    assert observed == ['a']
+
+
+@pytest.mark.parametrize('workers', [0, 1])
+def test_on_error_receives_failures(workers):
+    failed = []
+    scheduler = CollectorScheduler({'ok': lambda: 1, 'broken': _boom}, workers=workers,
+                                   on_error=failed.append)
+    scheduler.run(0.0)
+    scheduler.run(1.0)
+    assert failed == ['broken', 'broken']
+
+
+def test_on_error_receives_deadline_misses():
+    hanging = Hanging()
+    failed = []
+    scheduler = CollectorScheduler({'hang': hanging}, default_interval=0.0, workers=1,
+                                   default_deadline=0.02, quarantine_after=2, on_error=failed.append)
+    scheduler.run(0.0)
+    scheduler.run(1.0)
+    assert failed == ['hang', 'hang'] and scheduler.status == {'hang': QUARANTINED}
+    hanging.release.set()
@@ -0,0 +1,64 @@
+"""
+Agent Self-Instrumentation Tests
+Checks the read-only stats view and collection error counting
+"""
+
+import logging
+
+from servwatch_agent.collectors import system as system_module
+from servwatch_agent.collectors.system import SystemCollector
+from servwatch_agent.scheduler import CollectorScheduler
+from servwatch_agent.selfstats import AgentStats
+from servwatch_agent.transmitters.openmetrics import build_families, render
+
+
+def test_view_does_not_move_the_cpu_reference():
+    stats = AgentStats()
+    stats.snapshot()
+    reference = (stats._last_cpu, stats._last_time)
+
+    section = stats.view()
+    assert (stats._last_cpu, stats._last_time) == reference
+    assert set(section) == set(stats.snapshot())
+    assert (stats._last_cpu, stats._last_time) != reference
+
+
+def test_record_error_counts_per_section():
+    stats = AgentStats()
+    stats.record_error('cpu')
+    stats.record_error('cpu')
+    stats.record_error('highres')
+    assert stats.view()['collectionErrors'] == {'cpu': 2, 'highres': 1}
+
+
+def test_collection_failure_is_logged_and_counted(monkeypatch, caplog):
+    stats = AgentStats()
+    collector = SystemCollector(enable_gpu=False, on_error=stats.record_error)
+
+    def broken():
+        raise RuntimeError('boom')
+
+    monkeypatch.setattr(system_module.psutil, 'virtual_memory', broken)
+    with caplog.at_level(logging.ERROR, logger=system_module.__name__):
+        assert collector.collect_memory()['total'] == 0
+
+    assert 'Error collecting memory metrics: boom' in caplog.text
+    assert stats.errors == {'memory': 1}
+
+
+def test_collection_errors_are_exported():
+    stats = AgentStats()
+    stats.record_error('temperatures')
+    text = render(build_families({}, stats.view()), True)
+    assert 'agent_collection_errors_total{collector="temperatures"} 1' in text
+
+
+def test_scheduler_failures_are_counted():
+    stats = AgentStats()
+
+    def broken():
+        raise RuntimeError('driver gone')
+
+    scheduler = CollectorScheduler({'gpu': broken}, workers=1, on_error=stats.record_error)
+    scheduler.run(0.0)
+    assert stats.view()['collectionErrors'] == {'gpu': 1}
@@ -0,0 +1,179 @@
+"""
+Disk Spool Tests
+FIFO order, CRC and torn-write recovery, cursor persistence and eviction
+"""
+
+import os
+import queue
+import struct
+
+import pytest
+
+from servwatch_agent.transmitters import spool as spool_module
+from servwatch_agent.transmitters.spool import DiskSpool
+
+
+def _sample(i):
+    return {'agentId': 'test', 'timestamp': i, 'cpu': {'usage': float(i)}}
+
+
+def _segments(path):
+    return sorted(name for name in os.listdir(path) if name.endswith('.seg'))
+
+
+def _drain(spool):
+    samples = []
+    while True:
+        try:
+            samples.append(spool.get_nowait()['timestamp'])
+        except queue.Empty:
+            return samples
+
+
+def test_fifo_order(tmp_path):
+    spool = DiskSpool(str(tmp_path))
+    assert spool.empty()
+    for i in range(5):
+        spool.put_nowait(_sample(i))
+    assert spool.qsize() == 5
+    assert _drain(spool) == [0, 1, 2, 3, 4]
+    assert spool.empty()
+    with pytest.raises(queue.Empty):
+        spool.get_nowait()
+
+
+def test_reopen_resumes_at_cursor(tmp_path):
+    spool = DiskSpool(str(tmp_path))
+    for i in range(5):
+        spool.put_nowait(_sample(i))
+    assert spool.get_nowait()['timestamp'] == 0
+    assert spool.get_nowait()['timestamp'] == 1
+    spool.close()
+
+    reopened = DiskSpool(str(tmp_path))
+    assert reopened.qsize() == 3
+    assert _drain(reopened) == [2, 3, 4]
+
+
+def test_crash_replays_reads_since_last_cursor_write(tmp_path):
+    spool = DiskSpool(str(tmp_path), fsync_interval=3600)
+    for i in range(5):
+        spool.put_nowait(_sample(i))
+    spool.get_nowait()
+    spool.get_nowait()
+    spool._writer.flush()
+    # No close(): the cursor was never written, so delivery is at-least-once
+    assert _drain(DiskSpool(str(tmp_path))) == [0, 1, 2, 3, 4]
+
+
+def test_cursor_is_written_once_drained(tmp_path):
+    spool = DiskSpool(str(tmp_path), fsync_interval=3600)
+    for i in range(3):
+        spool.put_nowait(_sample(i))
+    assert _drain(spool) == [0, 1, 2]
+    spool._writer.flush()
+    assert DiskSpool(str(tmp_path)).empty()
+
+
+def test_reads_do_not_sync_per_record(tmp_path, monkeypatch):
+    spool = DiskSpool(str(tmp_path), fsync='always', fsync_interval=3600)
+    for i in range(100):
+        spool.put_nowait(_sample(i))
+
+    syncs = []
+    monkeypatch.setattr(spool_module.os, 'fsync', lambda fd: syncs.append(fd))
+    assert len(_drain(spool)) == 100
+    # Only the final cursor write once the spool drained
+    assert len(syncs) == 1
+
+
+def test_writes_sync_per_record_with_fsync_always(tmp_path, monkeypatch):
+    spool = DiskSpool(str(tmp_path), fsync='always')
+    syncs = []
+    monkeypatch.setattr(spool_module.os, 'fsync', lambda fd: syncs.append(fd))
+    for i in range(10):
+        spool.put_nowait(_sample(i))
+    assert len(syncs) == 10
+
+
+def test_torn_tail_is_truncated(tmp_path):
+    spool = DiskSpool(str(tmp_path))
+    for i in range(3):
+        spool.put_nowait(_sample(i))
+    spool.close()
+    segment = os.path.join(str(tmp_path), _segments(str(tmp_path))[-1])
+    size = os.path.getsize(segment)
+    with open(segment, 'ab') as f:
+        f.write(struct.pack('<II', 100, 0) + b'{"partial')
+
+    reopened = DiskSpool(str(tmp_path))
+    assert os.path.getsize(segment) == size
+    assert _drain(reopened) == [0, 1, 2]
+    # The repaired segment accepts new records
+    reopened.put_nowait(_sample(3))
+    assert _drain(reopened) == [3]
+
+
+def test_corrupt_record_truncates_newest_segment(tmp_path):
+    spool = DiskSpool(str(tmp_path))
+    for i in range(3):
+        spool.put_nowait(_sample(i))
+    spool.close()
+    segment = os.path.join(str(tmp_path), _segments(str(tmp_path))[-1])
+    with open(segment, 'r+b') as f:
+        data = bytearray(f.read())
+        # Flip a payload byte of the second record
+        length = struct.unpack_from('<I', data, 0)[0]
+        data[8 + length + 8 + 2] ^= 0xFF
+        f.seek(0)
+        f.write(data)
+
+    assert _drain(DiskSpool(str(tmp_path))) == [0]
+
+
+def test_corrupt_cursor_starts_from_oldest_segment(tmp_path):
+    spool = DiskSpool(str(tmp_path))
+    for i in range(3):
+        spool.put_nowait(_sample(i))
+    spool.get_nowait()
+    spool.close()
+    with open(os.path.join(str(tmp_path), 'cursor'), 'w') as f:
+        f.write('{not json')
+    assert _drain(DiskSpool(str(tmp_path))) == [0, 1, 2]
+
+
+def test_segments_roll_and_are_deleted_once_read(tmp_path):
+    spool = DiskSpool(str(tmp_path), segment_bytes=256)
+    for i in range(20):
+        spool.put_nowait(_sample(i))
+    assert len(_segments(str(tmp_path))) > 1
+    assert _drain(spool) == list(range(20))
+    assert len(_segments(str(tmp_path))) == 1
+
+
+def test_oldest_segments_are_evicted_over_the_size_limit(tmp_path):
+    spool = DiskSpool(str(tmp_path), max_bytes=1024, segment_bytes=256)
+    for i in range(100):
+        spool.put_nowait(_sample(i))
+    assert spool.size_bytes() <= 1024
+    assert spool.evicted > 0
+    samples = _drain(spool)
+    assert len(samples) + spool.evicted == 100
+    assert samples == list(range(100 - len(samples), 100))
+
+
+def test_eviction_survives_reopen(tmp_path):
+    spool = DiskSpool(str(tmp_path), max_bytes=1024, segment_bytes=256)
+    for i in range(10):
+        spool.put_nowait(_sample(i))
+    spool.get_nowait()
+    for i in range(10, 100):
+        spool.put_nowait(_sample(i))
+    spool.close()
+    samples = _drain(DiskSpool(str(tmp_path), max_bytes=1024, segment_bytes=256))
+    assert samples == list(range(100 - len(samples), 100))
+
+
+def test_invalid_fsync_policy(tmp_path):
+    with pytest.raises(ValueError):
+        DiskSpool(str(tmp_path), fsync='sometimes')
@@ -0,0 +1,72 @@
+"""
+Ring Store Tests
+Checks writes, rollups and lazy slot clearing of the in-memory series store
+"""
+
+import time
+
+import pytest
+
+from servwatch_agent.store import RingStore, series_bytes
+
+TIERS = ((1, 10), (5, 30))
+
+
+@pytest.fixture
+def base():
+    """A recent time aligned to the 5 s tier, queries pick tiers relative to now"""
+    return int(time.time()) // 5 * 5
+
+
+def values(store, key, start, end, tier_step=1, aggregate='avg'):
+    result = store.query(key, start=start, end=end, step=tier_step, aggregate=aggregate)
+    return result['series'].get(key, [])
+
+
+def test_raw_values_and_rollups(base):
+    store = RingStore(tiers=TIERS)
+    for t in range(base, base + 5):
+        store.add(t, [('cpu', float(t - base))])
+
+    assert values(store, 'cpu', base, base + 4) == [[t, float(t - base)] for t in range(base, base + 5)]
+    rollup = store.query('cpu', start=base, end=base + 4, step=5, aggregate='max')
+    assert rollup['tier'] == 5
+    assert rollup['series']['cpu'] == [[base, 4.0]]
+
+
+def test_unwritten_series_does_not_show_old_values_after_wrap(base):
+    store = RingStore(tiers=TIERS)
+    store.add(base, [('a', 1.0), ('b', 1.0)])
+    # Ten seconds later the first raw slot is reused, only b is written
+    store.add(base + 10, [('b', 2.0)])
+
+    assert values(store, 'a', base + 1, base + 10) == []
+    assert values(store, 'b', base + 1, base + 10) == [[base + 10, 2.0]]
+
+
+def test_skipped_buckets_are_cleared_on_next_write(base):
+    store = RingStore(tiers=TIERS)
+    for t in range(base, base + 10):
+        store.add(t, [('a', 1.0), ('b', 1.0)])
+    for t in range(base + 10, base + 13):
+        store.add(t, [('b', 2.0)])
+    store.add(base + 13, [('a', 3.0), ('b', 2.0)])
+
+    # a skipped three seconds; the slots it held ten seconds earlier must not resurface
+    expected = [[t, 1.0] for t in range(base + 4, base + 10)] + [[base + 13, 3.0]]
+    assert values(store, 'a', base + 4, base + 13) == expected
+
+
+def test_rollup_bucket_is_not_mixed_with_its_previous_turn(base):
+    store = RingStore(tiers=TIERS)
+    store.add(base, [('a', 10.0)])
+    store.add(base + 30, [('a', 1.0)])  # Same 5 s slot, one ring later
+    rollup = store.query('a', start=base + 30, end=base + 34, step=5, aggregate='count')
+    assert rollup['series']['a'] == [[base + 30, 1]]
+
+
+def test_budget_limits_series(base):
+    store = RingStore(tiers=TIERS, max_bytes=series_bytes(TIERS) * 2)
+    store.add(base, [('a', 1.0), ('b', 1.0), ('c', 1.0)])
+    assert store.keys() == ['a', 'b']
+    assert store.stats()['rejected'] == 1
@@ -0,0 +1,167 @@
+"""
+Transmitter Tests
+Acknowledged delivery, the maxInFlight window and backlog replay against a fake Socket.IO client
+"""
+
+import asyncio
+import threading
+import time
+
+from servwatch_agent.transmitters.async_websocket import AsyncWSTransmitter
+from servwatch_agent.transmitters.websocket import WSTransmitter
+
+ACKED = {'acknowledged': True, 'ackTimeout': 200, 'maxInFlight': 2, 'backfillRate': 0}
+
+
+class FakeClient:
+    """Records emits; optionally fails them"""
+
+    def __init__(self):
+        self.emitted = []
+        self.fail = False
+
+    def emit(self, event, data=None, callback=None):
+        if self.fail:
+            raise ConnectionError('transport closed')
+        self.emitted.append((event, data, callback))
+
+    def ack(self, index):
+        self.emitted[index][2](True)
+
+    def seqs(self):
+        return [data.get('seq') for _, data, _ in self.emitted]
+
+
+class FakeAsyncClient(FakeClient):
+    async def emit(self, event, data=None, callback=None):
+        FakeClient.emit(self, event, data, callback)
+
+
+def _connected(transmitter_class=WSTransmitter, client_class=FakeClient, **options):
+    transmitter = transmitter_class('http://server', 'agent-1', options)
+    transmitter.sio = client_class()
+    transmitter.connected = True
+    return transmitter
+
+
+def test_frames_are_sequenced_until_acked():
+    transmitter = _connected(**ACKED)
+    transmitter.transmit({'timestamp': 1})
+    transmitter.transmit({'timestamp': 2})
+    assert transmitter.sio.seqs() == [1, 2]
+    assert transmitter.get_unacked_count() == 2
+
+    transmitter.sio.ack(0)
+    assert transmitter.get_unacked_count() == 1
+    assert transmitter.get_stats()['unacked'] == 1
+
+
+def test_transmit_returns_at_once_with_a_full_window():
+    transmitter = _connected(**dict(ACKED, ackTimeout=5000))
+    transmitter.transmit({'timestamp': 1})
+    transmitter.transmit({'timestamp': 2})
+
+    start = time.monotonic()
+    transmitter.transmit({'timestamp': 3})
+    assert time.monotonic() - start < 0.1
+    assert transmitter.sio.seqs() == [1, 2]
+    assert transmitter.get_buffer_size() == 1
+
+
+def test_expired_frames_are_retransmitted_and_counted():
+    transmitter = _connected(**ACKED)
+    transmitter.transmit({'timestamp': 1})
+    assert transmitter._take_expired_frame() is None
+    time.sleep(0.25)
+    frame = transmitter._take_expired_frame()
+    transmitter._resend_frame(frame)
+    assert transmitter.sio.seqs() == [1, 1]
+    assert transmitter.get_stats()['retransmits'] == 1
+
+    # An ack of either copy retires the frame
+    transmitter.sio.ack(1)
+    assert transmitter.get_unacked_count() == 0
+
+
+def test_reconnect_retransmits_in_flight_frames_at_once():
+    transmitter = _connected(**ACKED)
+    transmitter.transmit({'timestamp': 1})
+    transmitter._handle_connect()
+    assert transmitter._take_expired_frame() is not None
+
+
+def test_failed_emit_is_buffered_and_forgotten():
+    transmitter = _connected(**ACKED)
+    transmitter.sio.fail = True
+    transmitter.transmit({'timestamp': 1})
+    assert transmitter.get_buffer_size() == 1
+    assert transmitter.get_unacked_count() == 0
+    assert transmitter.get_stats()['emitErrors'] == 1
+
+
+def test_backlog_waits_for_the_window():
+    transmitter = _connected(**ACKED)
+    transmitter.transmit({'timestamp': 1})
+    transmitter.transmit({'timestamp': 2})
+    transmitter._buffer_data({'agentId': 'agent-1', 'timestamp': 0})
+
+    threading.Timer(0.05, transmitter.sio.ack, (0,)).start()
+    transmitter.flush_buffer()
+    assert transmitter.sio.seqs() == [1, 2, 3]
+    assert transmitter.get_buffer_size() == 0
+
+
+def test_backlog_gives_up_while_the_window_stays_full():
+    transmitter = _connected(**ACKED)
+    transmitter.transmit({'timestamp': 1})
+    transmitter.transmit({'timestamp': 2})
+    transmitter._buffer_data({'agentId': 'agent-1', 'timestamp': 0})
+
+    start = time.monotonic()
+    transmitter.flush_buffer()
+    assert time.monotonic() - start < 0.5
+    assert transmitter.get_buffer_size() == 1
+
+
+def test_async_failed_emit_is_replayed_while_connected():
+    async def run():
+        transmitter = _connected(AsyncWSTransmitter, FakeAsyncClient, backfillRate=0)
+        transmitter.sio.fail = True
+        await transmitter.transmit({'timestamp': 1})
+        assert transmitter.get_buffer_size() == 1
+
+        transmitter.sio.fail = False
+        await transmitter.transmit({'timestamp': 2})
+        await asyncio.sleep(0.05)
+        return transmitter
+
+    transmitter = asyncio.run(run())
+    timestamps = [data['timestamp'] for _, data, _ in transmitter.sio.emitted]
+    assert sorted(timestamps) == [1, 2]
+    assert transmitter.get_buffer_size() == 0
+
+
+def test_async_transmit_returns_at_once_and_replays_after_an_ack():
+    async def run():
+        transmitter = _connected(AsyncWSTransmitter, FakeAsyncClient, **dict(ACKED, ackTimeout=400))
+        await transmitter.transmit({'timestamp': 1})
+        await transmitter.transmit({'timestamp': 2})
+
+        start = time.monotonic()
+        await transmitter.transmit({'timestamp': 3})
+        assert time.monotonic() - start < 0.05
+        assert transmitter.get_buffer_size() == 1
+
+        transmitter.sio.ack(0)
+        await asyncio.sleep(0.3)
+        transmitter.should_stop = True
+        return transmitter
+
+    transmitter = asyncio.run(run())
+    assert transmitter.sio.seqs() == [1, 2, 3]
+    assert transmitter.get_buffer_size() == 0
+
+
+def test_batching_with_delta_encoding_warns(caplog):
+    WSTransmitter('http://server', 'agent-1', {'batching': True, 'deltaEncoding': True})
+    assert 'batching does not apply' in caplog.text